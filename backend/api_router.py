@@ -1,9 +1,65 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+
+import anyio
+import requests
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from src import map_handler, news_handler
-from src.data_models import NewsCreate, NewsUpdate
+from fastapi.responses import StreamingResponse
+from src import events_handler, hazard_handler, map_handler, news_handler
+from src.data_models import HazardCreate, HazardUpdate, NewsBulkCreate, NewsCreate, NewsUpdate, RouteBatchRequest
+from src.utils import async_db_utils, db_pool, metrics
+from src.utils.db_routing import ReadYourWritesMiddleware
+from src.utils.here_client import RoutingUnavailable, describe_error
+from src.utils.http_cache import is_not_modified, validator_headers
+from src.utils.responses import FastJSONResponse, json_response
+
+# Fill pools and load lookup data during startup. Uvicorn only starts serving
+# a worker once startup returns, so its first requests do not pay for it.
+WARM_UP = os.getenv('WARM_UP', '1') == '1'
+WARM_UP_TIMEOUT = float(os.getenv('WARM_UP_TIMEOUT', '30'))
+
+
+async def _warm_up():
+    try:
+        await async_db_utils.wait_pool(WARM_UP_TIMEOUT)
+    except Exception:
+        logging.exception('Database pool not ready after warm-up; connecting on demand')
+    try:
+        await asyncio.to_thread(map_handler.load_road_graph)
+    except Exception:
+        logging.exception('Could not load the road graph; offline routing is unavailable')
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await async_db_utils.open_pool()
+    if WARM_UP:
+        await _warm_up()
+    try:
+        await hazard_handler.load_hazard_index()
+    except Exception:
+        logging.exception('Could not load hazard areas; routing starts without them')
+    news_handler.start_view_counter()
+    events_handler.start_listener()
+    yield
+    await events_handler.stop_listener()
+    try:
+        await news_handler.stop_view_counter()
+    except Exception:
+        logging.exception('Could not flush buffered news views on shutdown')
+    await async_db_utils.close_pool()
+    db_pool.close_pool()
+    metrics.mark_process_dead()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
+app.add_middleware(metrics.MetricsMiddleware)
 
-app = FastAPI()
+app.add_middleware(ReadYourWritesMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -48,57 +104,174 @@ app.add_middleware(
 
 
 @app.post('/news')
-def api_create_news(news: NewsCreate):
+async def api_create_news(news: NewsCreate):
     try:
-        new_id = news_handler.create_news(
+        new_id = await news_handler.create_news_async(
             news.author_id,
             news.cover_link,
             news.title,
             news.subtitle,
             news.location,
             news.views,
+            news.latitude,
+            news.longitude,
         )
         return {'message': 'News added successfully', 'news_id': new_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f'Error adding news: {e}')
 
 
+@app.post('/news/bulk')
+async def api_create_news_bulk(batch: NewsBulkCreate):
+    try:
+        news_ids = await news_handler.create_news_bulk_async([(
+            news.author_id,
+            news.cover_link,
+            news.title,
+            news.subtitle,
+            news.location,
+            news.views,
+            news.latitude,
+            news.longitude,
+        ) for news in batch.news])
+        return {'message': f'{len(news_ids)} news added successfully', 'news_ids': news_ids}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f'Error adding news: {e}')
+
+
 @app.get('/news')
-def api_list_news():
+async def api_list_news(
+    request: Request,
+    limit: int = Query(news_handler.DEFAULT_PAGE_SIZE, ge=1, le=news_handler.MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    fields: str | None = None,
+):
     try:
-        news_list = news_handler.get_news_list()
-        return {'news': news_list}
+        # Validators are read before the page, so a write in between can only
+        # make the ETag older than the body, never a stale body look current.
+        validators = await news_handler.get_news_page_validators_async(limit, cursor, fields)
+        headers = None
+        if validators is not None:
+            headers = validator_headers(*validators)
+            if is_not_modified(request.headers, *validators):
+                return Response(status_code=304, headers=headers)
+        page = await news_handler.get_news_page_async(limit, cursor, fields)
+        return json_response(request, page, headers=headers)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f'Error fetching news: {e}')
 
 
+@app.get('/news/export')
+async def api_export_news():
+    # Declared before /news/{news_id} so "export" is not taken for an ID.
+    return StreamingResponse(news_handler.export_news_ndjson(), media_type='application/x-ndjson')
+
+
+@app.get('/news/batch')
+async def api_get_news_batch(request: Request, ids: str, include: str | None = None):
+    # Declared before /news/{news_id} so "batch" is not taken for an ID.
+    try:
+        return json_response(request, await news_handler.get_news_batch_async(ids, include))
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f'Error fetching news: {e}')
+
+
+@app.get('/news/search')
+async def api_search_news(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(news_handler.DEFAULT_PAGE_SIZE, ge=1, le=news_handler.MAX_PAGE_SIZE),
+    cursor: str | None = None,
+):
+    try:
+        return json_response(request, await news_handler.search_news_async(q, limit, cursor))
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f'Error searching news: {e}')
+
+
+@app.get('/news/nearby')
+async def api_news_nearby(
+    request: Request,
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius: float = Query(2000, gt=0, le=news_handler.MAX_NEARBY_RADIUS_M),
+    limit: int = Query(news_handler.DEFAULT_PAGE_SIZE, ge=1, le=news_handler.MAX_PAGE_SIZE),
+    cursor: str | None = None,
+):
+    try:
+        return json_response(request, await news_handler.get_news_nearby_async(lat, lon, radius, limit, cursor))
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f'Error fetching nearby news: {e}')
+
+
 @app.get('/news/{news_id}')
-def api_read_news(news_id: str):
+async def api_read_news(news_id: str, request: Request):
     try:
-        news_item = news_handler.get_news(news_id)
-        return news_item
+        news_item, etag, last_modified = await news_handler.get_news_with_validators_async(news_id)
+        headers = validator_headers(etag, last_modified)
+        if is_not_modified(request.headers, etag, last_modified):
+            return Response(status_code=304, headers=headers)
+        return json_response(request, news_item, headers=headers)
     except ValueError as ve:
         raise HTTPException(status_code=404, detail=str(ve))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f'Error retrieving news: {e}')
 
 
+@app.post('/news/{news_id}/views', status_code=202)
+async def api_record_news_view(news_id: str):
+    try:
+        news_handler.record_view(news_id)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    return {'message': 'View recorded', 'news_id': news_id}
+
+
 @app.get('/route_map')
-def get_route_map(start: str, end: str):
-    print('start:', start, 'end:', end)
-    return map_handler.get_evacuate_map(start, end)
+def get_route_map(request: Request,
+                  start: str,
+                  end: str,
+                  zoom: int | None = Query(None, ge=0, le=22),
+                  polyline: bool = False):
+    logging.debug('Route requested from %s to %s', start, end)
+    try:
+        return json_response(request, map_handler.get_evacuate_map(start, end, zoom=zoom, encoded=polyline))
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except RoutingUnavailable as e:
+        raise HTTPException(status_code=503, detail=f'Routing unavailable: {e}', headers={'Retry-After': '5'})
+    except requests.RequestException as e:
+        # The messages of requests' exceptions contain the HERE API key.
+        logging.warning('Route from %s to %s failed upstream: %s', start, end, describe_error(e))
+        raise HTTPException(status_code=502, detail=f'Routing failed: {describe_error(e)}')
+
+
+@app.post('/route_map/batch')
+def get_route_map_batch(request: Request, batch: RouteBatchRequest):
+    results = map_handler.get_evacuate_maps([(route.start, route.end) for route in batch.routes])
+    return json_response(request, {'routes': results})
 
 
 @app.put('/news/{news_id}')
-def api_update_news(news_id: str, news: NewsUpdate):
+async def api_update_news(news_id: str, news: NewsUpdate):
     try:
-        updated = news_handler.update_news(
+        updated = await news_handler.update_news_async(
             news_id,
             news.cover_link,
             news.title,
             news.subtitle,
             news.location,
             news.views,
+            news.latitude,
+            news.longitude,
         )
         return {'message': 'News updated successfully', 'news': updated}
     except ValueError as ve:
@@ -108,11 +281,117 @@ def api_update_news(news_id: str, news: NewsUpdate):
 
 
 @app.delete('/news/{news_id}')
-def api_delete_news(news_id: str):
+async def api_delete_news(news_id: str):
     try:
-        result = news_handler.delete_news(news_id)
+        result = await news_handler.delete_news_async(news_id)
         return result
     except ValueError as ve:
         raise HTTPException(status_code=404, detail=str(ve))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f'Error deleting news: {e}')
+
+
+@app.get('/cache/stats')
+def api_cache_stats():
+    return {'news': news_handler.news_cache_stats(), 'routes': map_handler.route_cache_stats()}
+
+
+# ------------------ PUSH ENDPOINTS ------------------ #
+
+
+@app.get('/events')
+async def api_events(topics: str | None = None):
+    # Server-Sent Events: one message per news/hazard change.
+    return StreamingResponse(events_handler.sse_stream(events_handler.subscribe(topics)),
+                             media_type='text/event-stream',
+                             headers={
+                                 'Cache-Control': 'no-cache',
+                                 'X-Accel-Buffering': 'no'
+                             })
+
+
+@app.get('/events/stats')
+def api_events_stats():
+    return events_handler.events_stats()
+
+
+@app.websocket('/connect')
+async def api_connect(websocket: WebSocket, topics: str | None = None):
+    await websocket.accept()
+    await events_handler.websocket_session(websocket, events_handler.subscribe(topics))
+
+
+# ------------------ METRICS ------------------ #
+
+
+def _threadpool_saturation():
+    # Sync endpoints (e.g. /route_map) run on AnyIO's default thread limiter.
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return {
+        'busy': limiter.borrowed_tokens,
+        'size': limiter.total_tokens,
+        'waiting': limiter.statistics().tasks_waiting,
+    }
+
+
+metrics.register_saturation('threadpool', _threadpool_saturation)
+
+
+@app.get('/metrics')
+async def api_metrics():
+    # Async so the threadpool gauge is sampled on the event loop.
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
+
+
+# ------------------ HAZARD ENDPOINTS ------------------ #
+
+
+@app.post('/hazards')
+async def api_create_hazard(hazard: HazardCreate):
+    try:
+        hazard_id = await hazard_handler.create_hazard(hazard.name, hazard.polygon)
+        return {'message': 'Hazard area added successfully', 'hazard_id': hazard_id}
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f'Error adding hazard area: {e}')
+
+
+@app.get('/hazards')
+async def api_list_hazards():
+    try:
+        return {'hazards': await hazard_handler.get_hazard_list()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f'Error fetching hazard areas: {e}')
+
+
+@app.get('/hazards/{hazard_id}')
+async def api_read_hazard(hazard_id: str):
+    try:
+        return await hazard_handler.get_hazard(hazard_id)
+    except ValueError as ve:
+        raise HTTPException(status_code=404, detail=str(ve))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f'Error retrieving hazard area: {e}')
+
+
+@app.put('/hazards/{hazard_id}')
+async def api_update_hazard(hazard_id: str, hazard: HazardUpdate):
+    try:
+        updated = await hazard_handler.update_hazard(hazard_id, hazard.name, hazard.polygon)
+        return {'message': 'Hazard area updated successfully', 'hazard': updated}
+    except ValueError as ve:
+        raise HTTPException(status_code=404, detail=str(ve))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f'Error updating hazard area: {e}')
+
+
+@app.delete('/hazards/{hazard_id}')
+async def api_delete_hazard(hazard_id: str):
+    try:
+        return await hazard_handler.delete_hazard(hazard_id)
+    except ValueError as ve:
+        raise HTTPException(status_code=404, detail=str(ve))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f'Error deleting hazard area: {e}')
@@ -0,0 +1,99 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import flexpolyline as fp
+
+# Vertices of the straight-line route returned for every request.
+ROUTE_POINTS = 50
+
+
+def _straight_route(origin, destination, points=ROUTE_POINTS):
+    (lat1, lng1), (lat2, lng2) = origin, destination
+    return [(lat1 + (lat2 - lat1) * i / (points - 1), lng1 + (lng2 - lng1) * i / (points - 1)) for i in range(points)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        if server.latency:
+            time.sleep(max(0.0, random.gauss(server.latency, server.jitter)))
+
+        query = parse_qs(urlparse(self.path).query)
+        try:
+            origin, destination = (
+                tuple(float(value) for value in query[name][0].split(',')) for name in ('origin', 'destination'))
+        except (KeyError, ValueError):
+            self._reply(400, {'title': 'Malformed request', 'status': 400})
+            return
+
+        polyline = fp.encode(_straight_route(origin, destination))
+        self._reply(200, {'routes': [{'id': 'fake', 'sections': [{'type': 'vehicle', 'polyline': polyline}]}]})
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeHereServer:
+    """A local stand-in for the HERE routes endpoint with configurable latency.
+
+    Answers `GET /v8/routes?origin=lat,lng&destination=lat,lng` with a
+    straight-line route in HERE's response shape, after sleeping a normally
+    distributed delay. Runs on a background thread.
+
+    Args:
+        latency (float): Mean response delay, in seconds.
+        jitter (float): Standard deviation of the delay, in seconds.
+        host (str): Interface to bind.
+        port (int): Port to bind; 0 picks a free one.
+    """
+
+    def __init__(self, latency=0.05, jitter=0.0, host='127.0.0.1', port=0):
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.latency = latency
+        self._server.jitter = jitter
+        self._server.requests = 0
+        self._thread = None
+
+    @property
+    def url(self):
+        """The routes URL to set as `HERE_ROUTES_URL`."""
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/v8/routes'
+
+    @property
+    def requests(self):
+        """Number of requests received so far."""
+        return self._server.requests
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-here', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -0,0 +1,204 @@
+"""Load-test the API against a seeded local Postgres and a fake HERE server.
+
+Run from the backend directory with the usual POSTGRES_* variables pointing
+at a disposable database:
+
+    python -m benchmarks.run --users=1000 --news=100000 --concurrency=64 --output=bench.json
+
+The report is JSON: the commit, the configuration and, per operation, the
+request and error counts, RPS and p50/p95/p99 latency in milliseconds, so
+runs on different commits can be diffed directly.
+"""
+import asyncio
+import json
+import os
+import platform
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+import psycopg
+from absl import app, flags, logging
+from benchmarks import seed as seeding
+from benchmarks.fake_here import FakeHereServer
+from benchmarks.workload import Workload, parse_mix
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_integer('users', 100, 'Users to seed.')
+flags.DEFINE_integer('news', 10000, 'News rows to seed.')
+flags.DEFINE_bool('seed', True, 'Truncate and reseed users and news; otherwise benchmark the existing rows.')
+flags.DEFINE_bool('reset_schema', False, 'Drop and recreate every table from database/create_tables.sql first.')
+flags.DEFINE_integer('random_seed', 0, 'Seed of generated data and of the request sequence.')
+flags.DEFINE_float('here_latency_ms', 50, 'Mean latency of the fake HERE server.')
+flags.DEFINE_float('here_jitter_ms', 0, 'Standard deviation of the fake HERE latency.')
+flags.DEFINE_string('mix', 'list=40,item=40,create=5,update=5,route=10',
+                    'Comma-separated operation=weight pairs; operations: list, item, create, update, route.')
+flags.DEFINE_integer('concurrency', 32, 'Clients sending requests at once.')
+flags.DEFINE_float('duration', 30, 'Seconds to measure.')
+flags.DEFINE_float('warm_up', 5, 'Seconds of load before measuring.')
+flags.DEFINE_integer('page_size', 20, 'limit of list requests.')
+flags.DEFINE_integer('route_pairs', 100, 'Distinct start/end pairs of route requests.')
+flags.DEFINE_integer('workers', 1, 'Server worker processes.')
+flags.DEFINE_integer('port', 8091, 'Port of the server started for the run.')
+flags.DEFINE_string(
+    'base_url', None, 'Benchmark an already running server instead of starting one; '
+    'routes then go to whatever HERE_ROUTES_URL that server has.')
+flags.DEFINE_float('startup_timeout', 60, 'Seconds to wait for the server to answer.')
+flags.DEFINE_string('server_log', None, 'File receiving the server output; discarded when unset.')
+flags.DEFINE_string('output', None, 'File to write the JSON report to; stdout when unset.')
+
+
+def _git_revision():
+    """Return `(commit, dirty)` of the working tree, or `(None, None)` outside git."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'],
+                                cwd=BACKEND_DIR,
+                                capture_output=True,
+                                text=True,
+                                check=True).stdout.strip()
+        dirty = bool(
+            subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                           cwd=BACKEND_DIR,
+                           capture_output=True,
+                           text=True,
+                           check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def _existing_ids(conninfo):
+    with psycopg.connect(conninfo) as conn:
+        user_ids = [row[0] for row in conn.execute('SELECT user_id FROM users')]
+        news_ids = [row[0] for row in conn.execute('SELECT news_id FROM news')]
+    return user_ids, news_ids
+
+
+def _start_server(here_url, log):
+    env = {
+        **os.environ,
+        'HERE_ROUTES_URL': here_url,
+        'API_KEY': os.getenv('API_KEY', 'benchmark'),
+        'ROUTING_BACKEND': 'here',
+        'ENABLE_FORMATTER': 'False',
+    }
+    command = [
+        sys.executable, 'main.py', '--mode=prod', '--host=127.0.0.1', f'--port={FLAGS.port}',
+        f'--workers={FLAGS.workers}'
+    ]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def _wait_until_ready(base_url, server):
+    deadline = time.monotonic() + FLAGS.startup_timeout
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f'Server exited with status {server.returncode} before becoming ready')
+        try:
+            if httpx.get(f'{base_url}/news?limit=1', timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f'Server at {base_url} not ready after {FLAGS.startup_timeout} s')
+
+
+def _stop_server(server):
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def main(argv):
+    del argv  # Unused.
+    mix = parse_mix(FLAGS.mix)
+    conninfo = seeding.conninfo_from_env()
+
+    if FLAGS.seed:
+        logging.info(f'Seeding {FLAGS.users} users and {FLAGS.news} news')
+        user_ids, news_ids = seeding.seed(conninfo,
+                                          FLAGS.users,
+                                          FLAGS.news,
+                                          reset=FLAGS.reset_schema,
+                                          random_seed=FLAGS.random_seed)
+    else:
+        user_ids, news_ids = _existing_ids(conninfo)
+    if ('item' in mix or 'update' in mix) and not news_ids:
+        raise app.UsageError('item and update operations need seeded news')
+    if 'create' in mix and not (user_ids and all(user_id.isdigit() for user_id in user_ids)):
+        # NewsCreate.author_id is an int, so only numeric user IDs can author news.
+        raise app.UsageError('create needs numeric user IDs, as seeded by --seed')
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    here = FakeHereServer(latency=FLAGS.here_latency_ms / 1000, jitter=FLAGS.here_jitter_ms / 1000).start()
+    server = None
+    log = open(FLAGS.server_log, 'ab') if FLAGS.server_log else subprocess.DEVNULL
+    try:
+        base_url = FLAGS.base_url
+        if base_url is None:
+            server = _start_server(here.url, log)
+            base_url = f'http://127.0.0.1:{FLAGS.port}'
+        _wait_until_ready(base_url, server)
+
+        logging.info(f'Running {FLAGS.mix} at concurrency {FLAGS.concurrency} for {FLAGS.duration} s')
+        workload = Workload(base_url,
+                            mix,
+                            user_ids,
+                            news_ids,
+                            route_pairs=FLAGS.route_pairs,
+                            page_size=FLAGS.page_size,
+                            random_seed=FLAGS.random_seed)
+        results = asyncio.run(workload.run(FLAGS.concurrency, FLAGS.duration, warm_up=FLAGS.warm_up))
+        for operation, result in results.items():
+            if operation != 'total' and result['errors']:
+                logging.warning(f'{result["errors"]} of {result["requests"]} {operation} requests failed, '
+                                f'by status: {result["statuses"]}')
+    finally:
+        if server is not None:
+            _stop_server(server)
+        here.stop()
+        if FLAGS.server_log:
+            log.close()
+
+    commit, dirty = _git_revision()
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'started_at': started_at,
+        'python': platform.python_version(),
+        'config': {
+            'users': len(user_ids),
+            'news': len(news_ids),
+            'mix': mix,
+            'concurrency': FLAGS.concurrency,
+            'duration_s': FLAGS.duration,
+            'warm_up_s': FLAGS.warm_up,
+            'workers': FLAGS.workers if FLAGS.base_url is None else None,
+            'here_latency_ms': FLAGS.here_latency_ms,
+            'here_jitter_ms': FLAGS.here_jitter_ms,
+            'page_size': FLAGS.page_size,
+            'route_pairs': FLAGS.route_pairs,
+            'random_seed': FLAGS.random_seed,
+        },
+        'here_requests': here.requests,
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if FLAGS.output:
+        with open(FLAGS.output, 'w') as out:
+            out.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    app.run(main)
@@ -0,0 +1,99 @@
+import os
+import random
+from datetime import datetime, timedelta
+
+import psycopg
+from psycopg.conninfo import make_conninfo
+from src.utils.db_utils import _generate_id
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'create_tables.sql')
+
+# Bounding box of Dublin; seeded news and route endpoints fall inside it.
+DUBLIN_BBOX = (53.28, -6.40, 53.42, -6.10)
+
+LOCATIONS = ('Dublin City Centre', 'Temple Bar', 'Rathmines', 'Ballsbridge', 'Drumcondra', 'Phibsborough', 'Ringsend',
+             'Smithfield', 'Clontarf', 'Stoneybatter')
+TOPICS = ('flooding', 'road closure', 'power outage', 'fire', 'storm damage', 'gas leak', 'evacuation',
+          'traffic collision')
+
+_DROP_SCHEMA = """
+DROP TABLE IF EXISTS news_details, news, users, table_versions, hazard_areas CASCADE;
+DROP FUNCTION IF EXISTS bump_row_version() CASCADE;
+DROP FUNCTION IF EXISTS bump_table_version() CASCADE;
+"""
+
+
+def conninfo_from_env():
+    """Build the libpq connection string from the same variables the app reads."""
+    return make_conninfo(
+        dbname=os.getenv('POSTGRES_DB'),
+        user=os.getenv('POSTGRES_USER'),
+        password=os.getenv('POSTGRES_PASSWORD'),
+        host=os.getenv('POSTGRES_HOST'),
+        port=os.getenv('POSTGRES_PORT'),
+    )
+
+
+def random_point(rng):
+    """Return a random (lat, lng) inside `DUBLIN_BBOX`."""
+    min_lat, min_lng, max_lat, max_lng = DUBLIN_BBOX
+    return round(rng.uniform(min_lat, max_lat), 6), round(rng.uniform(min_lng, max_lng), 6)
+
+
+def random_news(rng, author_id):
+    """Return the column values of a plausible news row, without ID or timestamps."""
+    topic, location = rng.choice(TOPICS), rng.choice(LOCATIONS)
+    lat, lng = random_point(rng)
+    return {
+        'author_id': author_id,
+        'cover_link': f'https://example.com/covers/{rng.randrange(10**6)}.jpg',
+        'title': f'{topic.capitalize()} reported in {location}',
+        'subtitle': f'Residents near {location} are advised to follow updates on the {topic}.',
+        'location': location,
+        'latitude': lat,
+        'longitude': lng,
+    }
+
+
+def seed(conninfo, users, news, reset=False, random_seed=0):
+    """Fill the database with `users` users and `news` news rows.
+
+    Existing users and news are truncated first. User IDs are the decimal
+    strings '1'..'<users>', because `NewsCreate.author_id` is an int and
+    created news must reference an existing user.
+
+    Args:
+        conninfo (str): libpq connection string.
+        users (int): Number of users.
+        news (int): Number of news rows, spread over the last year.
+        reset (bool): Drop and recreate the schema from database/create_tables.sql.
+        random_seed (int): Random seed, so runs with the same arguments load the same data.
+
+    Returns:
+        tuple: `(user_ids, news_ids)` as lists.
+    """
+    rng = random.Random(random_seed)
+    user_ids = [str(i) for i in range(1, users + 1)]
+    news_ids = [_generate_id('news') for _ in range(news)]
+    now = datetime.now()
+
+    with psycopg.connect(conninfo) as conn:
+        if reset:
+            with open(SCHEMA_PATH) as schema:
+                conn.execute(_DROP_SCHEMA)
+                conn.execute(schema.read())
+        conn.execute('TRUNCATE news_details, news, users CASCADE')
+        with conn.cursor() as cursor:
+            with cursor.copy('COPY users (user_id, username, email) FROM STDIN') as copy:
+                for user_id in user_ids:
+                    copy.write_row((user_id, f'bench_user_{user_id}', f'bench_user_{user_id}@example.com'))
+            with cursor.copy('COPY news (news_id, author_id, cover_link, title, subtitle, published_at, location, '
+                             'views, latitude, longitude) FROM STDIN') as copy:
+                for news_id in news_ids:
+                    row = random_news(rng, rng.choice(user_ids))
+                    copy.write_row((news_id, row['author_id'], row['cover_link'], row['title'], row['subtitle'],
+                                    now - timedelta(seconds=rng.randrange(365 * 24 * 3600)), row['location'],
+                                    rng.randrange(10000), row['latitude'], row['longitude']))
+        conn.execute('ANALYZE users')
+        conn.execute('ANALYZE news')
+    return user_ids, news_ids
@@ -0,0 +1,170 @@
+import asyncio
+import math
+import random
+import time
+
+import httpx
+from benchmarks.seed import random_news, random_point
+
+# Operations a workload can mix, each mapped to the endpoint it exercises.
+OPERATIONS = {
+    'list': 'GET /news',
+    'item': 'GET /news/{news_id}',
+    'create': 'POST /news',
+    'update': 'PUT /news/{news_id}',
+    'route': 'GET /route_map',
+}
+
+
+def parse_mix(mix):
+    """Parse a mix such as 'list=50,item=30,route=20' into {operation: weight}.
+
+    Raises:
+        ValueError: On unknown operations or weights that are not positive numbers.
+    """
+    weights = {}
+    for item in mix.split(','):
+        name, _, weight = item.strip().partition('=')
+        if name not in OPERATIONS:
+            raise ValueError(f'Unknown operation "{name}", expected one of {", ".join(OPERATIONS)}')
+        try:
+            weights[name] = float(weight or 1)
+        except ValueError:
+            raise ValueError(f'Invalid weight "{weight}" for operation "{name}"')
+        if weights[name] <= 0:
+            raise ValueError(f'Weight of operation "{name}" must be positive')
+    return weights
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list; None when it is empty."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples, elapsed):
+    """Aggregate per-operation samples into throughput and latency figures.
+
+    Args:
+        samples (dict): Operation -> list of `(latency in seconds, status)`
+            tuples, where `status` is the HTTP status code, or None when no
+            response arrived.
+        elapsed (float): Length of the measured window, in seconds.
+
+    Returns:
+        dict: Operation -> {'endpoint', 'requests', 'errors', 'statuses', 'rps',
+        'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'}, plus a 'total' entry over all
+        of them. Every response outside 2xx counts as an error, and
+        'statuses' counts responses per status code ('none' without one).
+    """
+
+    def stats(endpoint, entries):
+        latencies = sorted(latency * 1000 for latency, _ in entries)
+        statuses = {}
+        for _, status in entries:
+            statuses[str(status).lower()] = statuses.get(str(status).lower(), 0) + 1
+
+        def ms(value):
+            return None if value is None else round(value, 3)
+
+        return {
+            'endpoint': endpoint,
+            'requests': len(entries),
+            'errors': sum(1 for _, status in entries if not _is_success(status)),
+            'statuses': dict(sorted(statuses.items())),
+            'rps': round(len(entries) / elapsed, 2) if elapsed > 0 else 0.0,
+            'p50_ms': ms(percentile(latencies, 0.50)),
+            'p95_ms': ms(percentile(latencies, 0.95)),
+            'p99_ms': ms(percentile(latencies, 0.99)),
+            'max_ms': ms(latencies[-1] if latencies else None),
+        }
+
+    report = {name: stats(OPERATIONS[name], entries) for name, entries in sorted(samples.items())}
+    report['total'] = stats('*', [entry for entries in samples.values() for entry in entries])
+    return report
+
+
+def _is_success(status):
+    return status is not None and 200 <= status < 300
+
+
+class Workload:
+    """A closed-loop mix of API calls against a running server.
+
+    Each of `concurrency` clients picks an operation by weight, sends it,
+    waits for the response and repeats, so the offered load adapts to the
+    server instead of piling up. Latencies of requests started during the
+    warm-up are discarded.
+
+    Args:
+        base_url (str): Server root, e.g. 'http://127.0.0.1:8001'.
+        mix (dict): Operation -> weight, see `parse_mix`.
+        user_ids (list): Seeded user IDs, used as authors of created news.
+        news_ids (list): Seeded news IDs, read and updated at random; created
+            news join the list.
+        route_pairs (int): Distinct (start, end) pairs routes are drawn from,
+            which sets the route cache hit ratio once they have all been seen.
+        page_size (int): `limit` of list requests.
+        random_seed (int): Seed of the operation and payload choices.
+    """
+
+    def __init__(self, base_url, mix, user_ids, news_ids, route_pairs=100, page_size=20, random_seed=0):
+        self.base_url = base_url
+        self.operations = list(mix)
+        self.weights = [mix[name] for name in self.operations]
+        self.user_ids = list(user_ids)
+        self.news_ids = list(news_ids)
+        self.page_size = page_size
+        self._rng = random.Random(random_seed)
+        self.route_pairs = [(random_point(self._rng), random_point(self._rng)) for _ in range(route_pairs)]
+
+    def _request(self, operation):
+        """Return `(method, url, json body)` of one request of `operation`."""
+        rng = self._rng
+        if operation == 'list':
+            return 'GET', f'/news?limit={self.page_size}', None
+        if operation == 'item':
+            return 'GET', f'/news/{rng.choice(self.news_ids)}', None
+        if operation == 'create':
+            return 'POST', '/news', random_news(rng, int(rng.choice(self.user_ids)))
+        if operation == 'update':
+            # A full NewsUpdate: every field but the author, which cannot change.
+            news = {field: value for field, value in random_news(rng, None).items() if field != 'author_id'}
+            return 'PUT', f'/news/{rng.choice(self.news_ids)}', {**news, 'views': rng.randrange(10000)}
+        (start_lat, start_lng), (end_lat, end_lng) = rng.choice(self.route_pairs)
+        return 'GET', f'/route_map?start={start_lat},{start_lng}&end={end_lat},{end_lng}', None
+
+    async def _client(self, http, samples, warm_up_until, stop_at):
+        while time.perf_counter() < stop_at:
+            operation = self._rng.choices(self.operations, self.weights)[0]
+            method, url, body = self._request(operation)
+            started = time.perf_counter()
+            try:
+                response = await http.request(method, url, json=body)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = None
+            latency = time.perf_counter() - started
+            if operation == 'create' and _is_success(status):
+                self.news_ids.append(response.json()['news_id'])
+            if started >= warm_up_until:
+                samples.setdefault(operation, []).append((latency, status))
+
+    async def run(self, concurrency, duration, warm_up=0.0, timeout=30.0):
+        """Drive the workload and return the `summarize` report of the measured window.
+
+        Args:
+            concurrency (int): Number of clients in flight at once.
+            duration (float): Seconds to measure, after the warm-up.
+            warm_up (float): Seconds of load whose latencies are discarded.
+            timeout (float): Per-request timeout, in seconds; timeouts count as errors.
+        """
+        samples = {}
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=timeout) as http:
+            warm_up_until = time.perf_counter() + warm_up
+            stop_at = warm_up_until + duration
+            await asyncio.gather(*(self._client(http, samples, warm_up_until, stop_at) for _ in range(concurrency)))
+        return summarize(samples, duration)
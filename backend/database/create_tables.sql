@@ -1,11 +1,20 @@
--- SQL file for initial DB setup
+-- SQL file for initial DB setup. To upgrade a database created from an
+-- earlier version of this file, apply database/migrations/*.sql in order.
+
+-- Great-circle distances and a GiST-indexable earth point type for the
+-- "news near me" query.
+CREATE EXTENSION IF NOT EXISTS cube;
+CREATE EXTENSION IF NOT EXISTS earthdistance;
 
 -- =====================================
 -- NEWS TABLE (News Page)
 -- =====================================
 
+-- IDs are a type prefix plus a time-ordered key (see db_utils._generate_id).
+-- ID columns use the "C" collation: bytewise comparison keeps those keys in
+-- creation order and is cheaper than locale-aware comparison.
 CREATE TABLE users (
-    user_id VARCHAR(50) PRIMARY KEY,
+    user_id VARCHAR(50) COLLATE "C" PRIMARY KEY,
     username VARCHAR(50) UNIQUE NOT NULL,
     email VARCHAR(100) UNIQUE NOT NULL
 );
@@ -15,14 +24,24 @@ CREATE TABLE users (
 -- =====================================
 
 CREATE TABLE news (
-    news_id VARCHAR(50) PRIMARY KEY,
-    author_id VARCHAR(50) NOT NULL,
+    news_id VARCHAR(50) COLLATE "C" PRIMARY KEY,
+    author_id VARCHAR(50) COLLATE "C" NOT NULL,
     cover_link TEXT NOT NULL,
     title VARCHAR(255) NOT NULL,
     subtitle VARCHAR(255),
     published_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
     location VARCHAR(100) NOT NULL,
     views INT DEFAULT 0 CHECK (views >= 0),
+    latitude DOUBLE PRECISION CHECK (latitude BETWEEN -90 AND 90),
+    longitude DOUBLE PRECISION CHECK (longitude BETWEEN -180 AND 180),
+    version BIGINT DEFAULT 1 NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(location, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(subtitle, '')), 'B')
+    ) STORED,
+    CONSTRAINT news_coordinates_pair CHECK ((latitude IS NULL) = (longitude IS NULL)),
     CONSTRAINT fk_news_author FOREIGN KEY (author_id) REFERENCES users(user_id) ON DELETE CASCADE
 );
 
@@ -32,7 +51,78 @@ CREATE TABLE news (
 -- =====================================
 
 CREATE TABLE news_details (
-    news_id VARCHAR(50) PRIMARY KEY,
+    news_id VARCHAR(50) COLLATE "C" PRIMARY KEY,
     summary TEXT NOT NULL,
     CONSTRAINT fk_news_details FOREIGN KEY (news_id) REFERENCES news(news_id) ON DELETE CASCADE
 );
+
+-- Keyset pagination of the news feed (newest first) walks this index.
+CREATE INDEX idx_news_published_at_news_id ON news (published_at, news_id);
+
+-- Full-text search over title, subtitle and location.
+CREATE INDEX idx_news_search_vector ON news USING GIN (search_vector);
+
+-- Radius queries prefilter with earth_box(...) @> ll_to_earth(...) on this index.
+CREATE INDEX idx_news_earth_location ON news USING GIST (ll_to_earth(latitude, longitude));
+
+-- Every change to a news row bumps its version, which is its HTTP validator.
+CREATE FUNCTION bump_row_version() RETURNS trigger AS $$
+BEGIN
+    NEW.version := OLD.version + 1;
+    NEW.updated_at := CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER news_row_version
+    BEFORE UPDATE ON news
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+-- =====================================
+-- TABLE_VERSIONS (HTTP validators)
+-- =====================================
+
+-- One change counter per table, bumped once per writing statement, so a list
+-- endpoint can tell whether anything changed with a primary-key lookup.
+-- Updates that only add views (the write-behind view counter) leave it
+-- alone: they are frequent, and list ETags would otherwise change with every
+-- flush. The counter row is locked by an AFTER STATEMENT trigger, so it is
+-- the last lock a writing statement takes and is held only until commit.
+CREATE TABLE table_versions (
+    table_name VARCHAR(50) PRIMARY KEY,
+    version BIGINT DEFAULT 0 NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+INSERT INTO table_versions (table_name) VALUES ('news');
+
+CREATE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE table_versions
+    SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+    WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER news_table_version
+    AFTER INSERT OR DELETE ON news
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+CREATE TRIGGER news_table_version_update
+    AFTER UPDATE OF author_id, cover_link, title, subtitle, published_at, location, latitude, longitude ON news
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+-- =====================================
+-- HAZARD_AREAS TABLE (Map Page)
+-- =====================================
+
+-- Restricted areas routes must avoid. `polygon` is a closed ring of
+-- [lat, lng] pairs.
+CREATE TABLE hazard_areas (
+    hazard_id VARCHAR(50) COLLATE "C" PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    polygon JSONB NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
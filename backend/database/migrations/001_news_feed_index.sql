@@ -0,0 +1,11 @@
+-- Index walked by the keyset-paginated news feed (GET /news).
+--
+-- Migrations bring a database created from an older create_tables.sql up to
+-- the current schema. Apply them in order; each is safe to run again:
+--
+--     for f in database/migrations/*.sql; do psql "$DATABASE_URL" -f "$f"; done
+--
+-- CONCURRENTLY keeps news writable while the index builds; it cannot run in
+-- a transaction block.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_news_published_at_news_id ON news (published_at, news_id);
@@ -0,0 +1,12 @@
+-- Restricted areas routes must avoid; replaces the mocked ones of the map
+-- page. `polygon` is a closed ring of [lat, lng] pairs. Safe to run again:
+--
+--     psql "$DATABASE_URL" -f database/migrations/002_hazard_areas.sql
+
+CREATE TABLE IF NOT EXISTS hazard_areas (
+    hazard_id VARCHAR(50) PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    polygon JSONB NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
@@ -0,0 +1,61 @@
+-- Row and table versions backing the HTTP validators of /news and
+-- /news/{news_id}.
+--
+-- Adds news.version and news.updated_at, bumped on every update of a row,
+-- and the table_versions change counter, bumped by every statement that
+-- changes news content. It also replaces the earlier news_table_version
+-- trigger, which fired on view-count updates as well. Like every migration
+-- here, it is safe to run again along with the ones after it. Adding the
+-- columns rewrites no rows (their defaults are not volatile), but still
+-- takes a brief ACCESS EXCLUSIVE lock on news:
+--
+--     psql "$DATABASE_URL" -f database/migrations/003_news_versions.sql
+
+BEGIN;
+
+ALTER TABLE news ADD COLUMN IF NOT EXISTS version BIGINT DEFAULT 1 NOT NULL,
+                 ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL;
+
+CREATE OR REPLACE FUNCTION bump_row_version() RETURNS trigger AS $$
+BEGIN
+    NEW.version := OLD.version + 1;
+    NEW.updated_at := CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS news_row_version ON news;
+CREATE TRIGGER news_row_version
+    BEFORE UPDATE ON news
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name VARCHAR(50) PRIMARY KEY,
+    version BIGINT DEFAULT 0 NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+INSERT INTO table_versions (table_name) VALUES ('news') ON CONFLICT (table_name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE table_versions
+    SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+    WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS news_table_version ON news;
+CREATE TRIGGER news_table_version
+    AFTER INSERT OR DELETE ON news
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+-- View-count-only updates do not change the table version. The coordinates
+-- migration adds latitude and longitude to these columns.
+DROP TRIGGER IF EXISTS news_table_version_update ON news;
+CREATE TRIGGER news_table_version_update
+    AFTER UPDATE OF author_id, cover_link, title, subtitle, published_at, location ON news
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+COMMIT;
@@ -0,0 +1,22 @@
+-- Full-text search over news for GET /news/search.
+--
+-- Adds the generated news.search_vector column and its GIN index. Safe to run
+-- again. Adding a stored generated column rewrites the news table, and the
+-- index is built under a lock blocking writes, so apply during a maintenance
+-- window:
+--
+--     psql "$DATABASE_URL" -f database/migrations/004_news_search.sql
+
+BEGIN;
+
+ALTER TABLE news ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(location, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(subtitle, '')), 'B')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_news_search_vector ON news USING GIN (search_vector);
+
+COMMIT;
+
+ANALYZE news;
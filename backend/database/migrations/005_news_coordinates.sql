@@ -0,0 +1,31 @@
+-- Coordinates of news entries for GET /news/nearby.
+--
+-- Adds news.latitude and news.longitude, NULL for existing entries, and the
+-- earthdistance GiST index radius queries use. Coordinate changes now also
+-- bump the news table version (see 003_news_versions.sql). Safe to run
+-- again. The new columns have no default, so no rows are rewritten, but the
+-- index is built under a lock blocking writes:
+--
+--     psql "$DATABASE_URL" -f database/migrations/005_news_coordinates.sql
+
+CREATE EXTENSION IF NOT EXISTS cube;
+CREATE EXTENSION IF NOT EXISTS earthdistance;
+
+BEGIN;
+
+ALTER TABLE news ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION CHECK (latitude BETWEEN -90 AND 90),
+                 ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION CHECK (longitude BETWEEN -180 AND 180);
+
+ALTER TABLE news DROP CONSTRAINT IF EXISTS news_coordinates_pair,
+                 ADD CONSTRAINT news_coordinates_pair CHECK ((latitude IS NULL) = (longitude IS NULL));
+
+CREATE INDEX IF NOT EXISTS idx_news_earth_location ON news USING GIST (ll_to_earth(latitude, longitude));
+
+DROP TRIGGER IF EXISTS news_table_version_update ON news;
+CREATE TRIGGER news_table_version_update
+    AFTER UPDATE OF author_id, cover_link, title, subtitle, published_at, location, latitude, longitude ON news
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+COMMIT;
+
+ANALYZE news;
@@ -0,0 +1,38 @@
+-- Switch ID columns to the "C" collation for time-ordered keys.
+--
+-- New IDs are a prefix plus a UUIDv7 in base32 (db_utils._generate_id), which
+-- sort in creation order byte by byte. Under "C", new rows append at the right
+-- edge of each primary key index, and comparisons become a plain memcmp.
+-- Existing IDs are not rewritten, so every ID clients already hold stays
+-- valid.
+--
+-- Runs after 001-005, which create hazard_areas and
+-- idx_news_published_at_news_id. The ALTERs rewrite the affected indexes,
+-- including the foreign keys and idx_news_published_at_news_id, and take
+-- ACCESS EXCLUSIVE locks while they run. Apply during a maintenance window:
+--
+--     psql "$DATABASE_URL" -f database/migrations/006_time_ordered_ids.sql
+
+BEGIN;
+
+ALTER TABLE news_details DROP CONSTRAINT IF EXISTS fk_news_details;
+ALTER TABLE news DROP CONSTRAINT IF EXISTS fk_news_author;
+
+ALTER TABLE users ALTER COLUMN user_id TYPE VARCHAR(50) COLLATE "C";
+ALTER TABLE news ALTER COLUMN news_id TYPE VARCHAR(50) COLLATE "C",
+                 ALTER COLUMN author_id TYPE VARCHAR(50) COLLATE "C";
+ALTER TABLE news_details ALTER COLUMN news_id TYPE VARCHAR(50) COLLATE "C";
+ALTER TABLE hazard_areas ALTER COLUMN hazard_id TYPE VARCHAR(50) COLLATE "C";
+
+ALTER TABLE news ADD CONSTRAINT fk_news_author
+    FOREIGN KEY (author_id) REFERENCES users(user_id) ON DELETE CASCADE;
+ALTER TABLE news_details ADD CONSTRAINT fk_news_details
+    FOREIGN KEY (news_id) REFERENCES news(news_id) ON DELETE CASCADE;
+
+COMMIT;
+
+-- Refresh planner statistics for the rebuilt indexes.
+ANALYZE users;
+ANALYZE news;
+ANALYZE news_details;
+ANALYZE hazard_areas;
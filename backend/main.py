@@ -2,7 +2,25 @@ import logging as basic_log
 import os
 
 import uvicorn
-from absl import app, logging
+from absl import app, flags, logging
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_enum('mode', os.getenv('SERVER_MODE', 'prod'), ['dev', 'prod'],
+                  'dev: one process with auto-reload and debug logs. prod: multiple workers, no reload.')
+flags.DEFINE_string('host', '0.0.0.0', 'Interface to bind.')
+flags.DEFINE_integer('port', 8001, 'Port to bind.')
+flags.DEFINE_integer('workers', int(os.getenv('WEB_CONCURRENCY', '0')),
+                     'Worker processes in prod mode; 0 starts one per available CPU core.')
+flags.DEFINE_enum('loop', 'auto', ['auto', 'asyncio', 'uvloop'],
+                  'Event loop implementation; auto uses uvloop when it is installed.')
+flags.DEFINE_enum('http', 'auto', ['auto', 'h11', 'httptools'],
+                  'HTTP parser; auto uses httptools when it is installed.')
+flags.DEFINE_integer('max_requests', int(os.getenv('MAX_REQUESTS', '0')),
+                     'Restart a worker after it served this many requests; 0 never restarts.')
+flags.DEFINE_integer('graceful_timeout', int(os.getenv('GRACEFUL_TIMEOUT', '30')),
+                     'Seconds in-flight requests may take to finish after SIGTERM before workers are stopped.')
+flags.DEFINE_bool('access_log', False, 'Log every request in prod mode (always on in dev mode).')
 
 
 class CustomFormatter(basic_log.Formatter):
@@ -36,6 +54,14 @@ class CustomFormatter(basic_log.Formatter):
         return output
 
 
+def _available_cores():
+    """Number of CPU cores this process may run on, honoring CPU affinity."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
 def main(argv):
     del argv  # Unused.
     enable_formatter = os.environ.get('ENABLE_FORMATTER', 'False')
@@ -43,13 +69,36 @@ def main(argv):
     if enable_formatter and enable_formatter == 'True':
         logging.get_absl_handler().setFormatter(CustomFormatter())
 
+    if FLAGS.mode == 'dev':
+        uvicorn.run(
+            'api_router:app',
+            host=FLAGS.host,
+            port=FLAGS.port,
+            log_level='debug',
+            reload=True,
+            # To pass client real ip through proxies (AWS app runner and/or nginx)
+            proxy_headers=True,
+            forwarded_allow_ips='*',
+        )
+        return
+
+    workers = FLAGS.workers or _available_cores()
+    logging.info(f'Starting {workers} workers on {FLAGS.host}:{FLAGS.port}')
+    # On SIGTERM uvicorn stops accepting connections and lets in-flight
+    # requests finish (up to `graceful_timeout`) before running the shutdown
+    # lifespan, which flushes buffered views and closes the pools. Workers
+    # that exit after `max_requests` are replaced by the supervisor.
     uvicorn.run(
         'api_router:app',
-        host='0.0.0.0',
-        port=8001,
-        log_level='debug',
-        reload=True,
-        # To pass client real ip through proxies (AWS app runner and/or nginx)
+        host=FLAGS.host,
+        port=FLAGS.port,
+        workers=workers,
+        loop=FLAGS.loop,
+        http=FLAGS.http,
+        log_level='info',
+        access_log=FLAGS.access_log,
+        limit_max_requests=FLAGS.max_requests or None,
+        timeout_graceful_shutdown=FLAGS.graceful_timeout,
         proxy_headers=True,
         forwarded_allow_ips='*',
     )
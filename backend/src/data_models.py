@@ -1,8 +1,19 @@
 # datamodels.py
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 
 
-class NewsCreate(BaseModel):
+class _Coordinates(BaseModel):
+    latitude: float | None = Field(None, ge=-90, le=90)
+    longitude: float | None = Field(None, ge=-180, le=180)
+
+    @model_validator(mode='after')
+    def _both_or_neither(self):
+        if (self.latitude is None) != (self.longitude is None):
+            raise ValueError('latitude and longitude must be given together')
+        return self
+
+
+class NewsCreate(_Coordinates):
     author_id: int
     cover_link: str
     title: str
@@ -11,9 +22,32 @@ class NewsCreate(BaseModel):
     views: int = 0
 
 
-class NewsUpdate(BaseModel):
+class NewsBulkCreate(BaseModel):
+    news: list[NewsCreate] = Field(..., min_length=1, max_length=10000)
+
+
+class NewsUpdate(_Coordinates):
     cover_link: str
     title: str
     subtitle: str
     location: str
     views: int
+
+
+class RoutePair(BaseModel):
+    start: str
+    end: str
+
+
+class RouteBatchRequest(BaseModel):
+    routes: list[RoutePair] = Field(..., min_length=1, max_length=500)
+
+
+class HazardCreate(BaseModel):
+    name: str
+    polygon: list[tuple[float, float]] = Field(..., min_length=3)
+
+
+class HazardUpdate(BaseModel):
+    name: str
+    polygon: list[tuple[float, float]] = Field(..., min_length=3)
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timezone
+
+from src.utils import async_db_utils
+from src.utils.broker import Broker, SubscriptionClosed
+from src.utils.responses import dumps
+
+# Postgres channel that carries events between workers.
+EVENTS_CHANNEL = os.getenv('EVENTS_CHANNEL', 'sabhailte_events')
+
+# Relay events through LISTEN/NOTIFY so subscribers connected to any worker
+# see changes made on every worker. Set to 0 for a single-process deployment.
+EVENTS_CROSS_WORKER = os.getenv('EVENTS_CROSS_WORKER', '1') == '1'
+
+# Seconds between reconnection attempts of the LISTEN connection.
+EVENTS_LISTEN_RETRY = float(os.getenv('EVENTS_LISTEN_RETRY', '2'))
+
+# Seconds of silence after which a keep-alive is sent to push clients.
+EVENTS_HEARTBEAT = float(os.getenv('EVENTS_HEARTBEAT', '15'))
+
+_broker = Broker(max_queue=int(os.getenv('EVENTS_QUEUE_SIZE', '100')),
+                 policy=os.getenv('EVENTS_DROP_POLICY', 'drop_oldest'))
+_listener = None
+
+# Topic -> [(handler, resync)] keeping per-worker state, such as the hazard
+# index, in line with changes made on other workers; see `add_handler`.
+_handlers = {}
+
+
+def _parse_topics(topics):
+    """Split a comma-separated `topics=` value; None subscribes to everything."""
+    if not topics:
+        return None
+    return [topic.strip() for topic in topics.split(',') if topic.strip()] or None
+
+
+async def publish(event_type, **data):
+    """Announce a change to push subscribers.
+
+    With cross-worker delivery on, the event goes out through NOTIFY and every
+    worker, this one included, hands it to its local subscribers when it comes
+    back on LISTEN. Otherwise, or if NOTIFY fails, it is delivered locally.
+    Failures are logged and never propagate to the write that caused them.
+
+    Args:
+        event_type (str): '<topic>.<action>', e.g. 'news.created'.
+        **data: Small JSON-serializable fields, such as the changed ID.
+    """
+    event = {'type': event_type, **data, 'at': datetime.now(timezone.utc).isoformat()}
+    if _listener is not None:
+        try:
+            await async_db_utils.notify(EVENTS_CHANNEL, dumps(event).decode())
+            return
+        except Exception:
+            logging.exception('Could not relay %s through NOTIFY; delivering locally only', event_type)
+    _broker.publish(event)
+
+
+def add_handler(topic, handler, resync=None):
+    """Apply the changes of one topic that other workers announce to this worker's state.
+
+    Only events received over LISTEN reach the handlers, so they run on every
+    worker, the publishing one included; handlers must tolerate changes they
+    already applied. Notifications sent while the LISTEN connection was down
+    are lost, so `resync` runs every time it is (re)established.
+
+    Args:
+        topic (str): Topic whose events are handled, e.g. 'hazards'.
+        handler: Async callable taking the event dict.
+        resync: Optional async callable rebuilding the state from the database.
+    """
+    _handlers.setdefault(topic, []).append((handler, resync))
+
+
+async def _dispatch(event):
+    for handler, _ in _handlers.get(event['type'].split('.', 1)[0], ()):
+        try:
+            await handler(event)
+        except Exception:
+            logging.exception('Could not apply %s %s to this worker', event['type'], event.get('id'))
+
+
+async def _resync():
+    for topic, handlers in _handlers.items():
+        for _, resync in handlers:
+            if resync is None:
+                continue
+            try:
+                await resync()
+            except Exception:
+                logging.exception('Could not resynchronize %s after reconnecting to LISTEN', topic)
+
+
+def subscribe(topics=None):
+    """Subscribe to events, optionally only those of a comma-separated list of topics.
+
+    Returns:
+        Subscription: Iterate it for events and close it when the client leaves.
+    """
+    return _broker.subscribe(_parse_topics(topics))
+
+
+async def sse_stream(subscription):
+    """Render a subscription as a Server-Sent Events stream.
+
+    Yields:
+        bytes: One `event:`/`data:` message per event, or a comment line as a
+        keep-alive after `EVENTS_HEARTBEAT` seconds without events.
+    """
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), EVENTS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield b': keep-alive\n\n'
+                continue
+            except SubscriptionClosed:
+                return
+            yield b'event: ' + event['type'].encode() + b'\ndata: ' + dumps(event) + b'\n\n'
+    finally:
+        subscription.close()
+
+
+async def websocket_session(websocket, subscription):
+    """Send a subscription's events to an accepted WebSocket until either side closes.
+
+    Messages from the client are ignored; reading them is how a disconnect is
+    noticed while no events arrive.
+    """
+    received = asyncio.ensure_future(websocket.receive())
+    next_event = None
+    try:
+        while True:
+            next_event = next_event or asyncio.ensure_future(subscription.get())
+            await asyncio.wait((next_event, received), return_when=asyncio.FIRST_COMPLETED)
+            if received.done():
+                if received.result()['type'] == 'websocket.disconnect':
+                    return
+                received = asyncio.ensure_future(websocket.receive())
+            if next_event.done():
+                event, next_event = next_event.result(), None
+                await websocket.send_text(dumps(event).decode())
+    except SubscriptionClosed:
+        await websocket.close(code=1013)  # Try again later: the client fell too far behind.
+    finally:
+        for task in (received, next_event):
+            if task is not None:
+                task.cancel()
+        subscription.close()
+
+
+async def _listen():
+    while True:
+        try:
+            async for payload in async_db_utils.listen(EVENTS_CHANNEL):
+                if payload is None:
+                    await _resync()
+                    continue
+                event = json.loads(payload)
+                _broker.publish(event)
+                await _dispatch(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logging.exception('Event listener lost its connection; retrying in %s s', EVENTS_LISTEN_RETRY)
+        await asyncio.sleep(EVENTS_LISTEN_RETRY)
+
+
+def start_listener():
+    """Start relaying NOTIFY events to local subscribers, if cross-worker delivery is on."""
+    global _listener
+    if EVENTS_CROSS_WORKER and _listener is None:
+        _listener = asyncio.get_running_loop().create_task(_listen())
+
+
+async def stop_listener():
+    """Stop the LISTEN relay and close every open subscription."""
+    global _listener
+    if _listener is not None:
+        _listener.cancel()
+        try:
+            await _listener
+        except asyncio.CancelledError:
+            pass
+        _listener = None
+    _broker.close()
+
+
+def events_stats():
+    """Return subscriber, delivery and drop counters of the event broker."""
+    return _broker.stats()
@@ -0,0 +1,139 @@
+import os
+
+from src import events_handler
+from src.utils import async_db_utils
+from src.utils.spatial_index import GridIndex
+
+# Margin, in degrees, added around a trip's start/end bounding box when
+# looking up hazards that could affect its route (~1 km).
+HAZARD_SEARCH_MARGIN_DEG = float(os.getenv('HAZARD_SEARCH_MARGIN_DEG', '0.01'))
+
+_index = GridIndex()
+
+
+def _close_ring(polygon):
+    """Return the polygon as a list of [lat, lng] with the first point repeated at the end."""
+    ring = [[float(lat), float(lng)] for lat, lng in polygon]
+    if len(ring) < 3:
+        raise ValueError('A hazard polygon needs at least three points')
+    if any(not -90 <= lat <= 90 or not -180 <= lng <= 180 for lat, lng in ring):
+        raise ValueError('Hazard polygon coordinates must be within [-90, 90] latitude and [-180, 180] longitude')
+    if ring[0] != ring[-1]:
+        ring.append(ring[0])
+    return ring
+
+
+async def load_hazard_index():
+    """Rebuild the in-memory hazard index from the database.
+
+    Returns:
+        int: The number of indexed hazard areas.
+    """
+    rows = await async_db_utils.get_hazard_list()
+    _index.rebuild((hazard_id, polygon) for hazard_id, _, polygon, _, _ in rows)
+    return len(_index)
+
+
+def _index_polygon(hazard_id, polygon):
+    """Index a polygon unless it is already indexed, which would only bump its revision."""
+    area = _index.get(hazard_id)
+    if area is None or area.polygon != [(float(lat), float(lng)) for lat, lng in polygon]:
+        _index.insert(hazard_id, polygon)
+
+
+async def _apply_hazard_event(event):
+    """Apply a hazard change announced by any worker to this worker's index."""
+    hazard_id = event['id']
+    if event['type'] == 'hazards.deleted':
+        _index.remove(hazard_id)
+        return
+    try:
+        _, _, polygon, _, _ = await async_db_utils.get_hazard_by_id(hazard_id)
+    except ValueError:
+        _index.remove(hazard_id)  # Deleted before this event was handled.
+        return
+    _index_polygon(hazard_id, polygon)
+
+
+# Every worker keeps its own index; hazards.* events keep them all current.
+events_handler.add_handler('hazards', _apply_hazard_event, resync=load_hazard_index)
+
+
+async def create_hazard(name, polygon):
+    """Create a hazard area and add it to the index.
+
+    Returns:
+        hazard_id (str): The ID of the new hazard area.
+    """
+    ring = _close_ring(polygon)
+    hazard_id = await async_db_utils.add_hazard_to_db(name, ring)
+    _index_polygon(hazard_id, ring)
+    await events_handler.publish('hazards.created', id=hazard_id)
+    return hazard_id
+
+
+async def get_hazard_list():
+    """Retrieve all hazard areas.
+
+    Returns:
+        list: A list of hazard records.
+    """
+    return await async_db_utils.get_hazard_list()
+
+
+async def get_hazard(hazard_id):
+    """Retrieve a single hazard area by its ID.
+
+    Returns:
+        tuple: The hazard record.
+    """
+    return await async_db_utils.get_hazard_by_id(hazard_id)
+
+
+async def update_hazard(hazard_id, name, polygon):
+    """Update a hazard area and re-index its polygon.
+
+    Returns:
+        tuple: The updated hazard record.
+    """
+    ring = _close_ring(polygon)
+    updated = await async_db_utils.update_hazard(hazard_id, name, ring)
+    _index_polygon(hazard_id, ring)
+    await events_handler.publish('hazards.updated', id=hazard_id)
+    return updated
+
+
+async def delete_hazard(hazard_id):
+    """Delete a hazard area and drop it from the index.
+
+    Returns:
+        dict: A message confirming deletion.
+    """
+    result = await async_db_utils.delete_hazard(hazard_id)
+    _index.remove(hazard_id)
+    await events_handler.publish('hazards.deleted', id=hazard_id)
+    return result
+
+
+def hazards_near(start, end, margin=HAZARD_SEARCH_MARGIN_DEG):
+    """Return indexed hazards overlapping the area around a trip.
+
+    Args:
+        start: (lat, lng) of the origin.
+        end: (lat, lng) of the destination.
+        margin (float): Degrees added on every side of the trip's bounding box.
+
+    Returns:
+        list: IndexedArea entries.
+    """
+    return _index.query_bbox(
+        min(start[0], end[0]) - margin,
+        min(start[1], end[1]) - margin,
+        max(start[0], end[0]) + margin,
+        max(start[1], end[1]) + margin,
+    )
+
+
+def hazards_on_route(route):
+    """Return indexed hazards that a route of (lat, lng) points enters or crosses."""
+    return _index.query_path(route)
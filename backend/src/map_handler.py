@@ -1,52 +1,409 @@
+import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import flexpolyline as fp
 import requests
+from src import hazard_handler
+from src.utils import metrics
+from src.utils.cache import LRUCache, SingleFlight
+from src.utils.circuit_breaker import CircuitBreaker
+from src.utils.geometry import meters_per_pixel, simplify_path
+from src.utils.here_client import HereRoutingClient, RoutingUnavailable, describe_error
+from src.utils.road_graph import RoadGraph
 
+# HERE accepts at most 20 `avoid[areas]` entries per request.
+MAX_AVOID_AREAS = 20
 
-def fetch_route_from_api(origin='53.3441,-6.2573', destination='53.3430,-6.2672'):
-    """Fetches the route from the HERE API."""
-    API_KEY = os.getenv('API_KEY'),
+# Decimal places kept when quantizing coordinates for the route cache.
+# 4 places is roughly 10 m in Dublin, well within GPS noise.
+ROUTE_CACHE_PRECISION = int(os.getenv('ROUTE_CACHE_PRECISION', '4'))
+
+# Simplification tolerance, in screen pixels, for routes requested at a zoom.
+ROUTE_SIMPLIFY_PIXELS = float(os.getenv('ROUTE_SIMPLIFY_PIXELS', '1.0'))
+
+# Local road graph for offline routing; see RoadGraph.load for the format.
+ROAD_GRAPH_PATH = os.getenv('ROAD_GRAPH_PATH')
+
+# 'here' asks the HERE API and falls back to the local graph when HERE is
+# unreachable; 'local' always routes in-process.
+ROUTING_BACKEND = os.getenv('ROUTING_BACKEND', 'here')
+
+# Overridable so benchmarks can point routing at a local fake server.
+HERE_ROUTES_URL = os.getenv('HERE_ROUTES_URL', 'https://router.hereapi.com/v8/routes')
+
+# (connect, read) timeouts of one HERE attempt, in seconds.
+HERE_TIMEOUT = (float(os.getenv('HERE_CONNECT_TIMEOUT', '3')), float(os.getenv('HERE_READ_TIMEOUT', '10')))
+
+# Total seconds a route request may spend on HERE, retries included.
+HERE_LATENCY_BUDGET = float(os.getenv('HERE_LATENCY_BUDGET', '8'))
+HERE_RETRIES = int(os.getenv('HERE_RETRIES', '2'))
+HERE_RETRY_BACKOFF = float(os.getenv('HERE_RETRY_BACKOFF', '0.2'))
+
+# Consecutive HERE failures that open the circuit, and seconds it then stays
+# open before a single probe request is let through.
+HERE_BREAKER_FAILURES = int(os.getenv('HERE_BREAKER_FAILURES', '5'))
+HERE_BREAKER_RESET = float(os.getenv('HERE_BREAKER_RESET', '30'))
+
+# How long the last good route between two points is kept to be served,
+# marked stale, while HERE is unavailable.
+ROUTE_STALE_TTL = float(os.getenv('ROUTE_STALE_TTL', str(24 * 3600)))
+
+# Largest latitude or longitude span, in degrees, of a routed trip; well
+# beyond any evacuation, and it bounds the hazard lookup around the trip.
+MAX_TRIP_SPAN_DEG = float(os.getenv('MAX_TRIP_SPAN_DEG', '2'))
+
+# Upper bound of HERE requests in flight for batch routing; also the size of
+# the keep-alive connection pool.
+ROUTE_BATCH_CONCURRENCY = int(os.getenv('ROUTE_BATCH_CONCURRENCY', '64'))
+
+
+def _route_sizeof(route):
+    # A decoded route is a list of (lat, lng) float tuples: ~56 bytes per
+    # tuple, 24 per float and 8 per list slot.
+    return 112 * len(route) + 56
+
+
+_route_cache = LRUCache(
+    max_entries=int(os.getenv('ROUTE_CACHE_MAX_ENTRIES', '4096')),
+    ttl=float(os.getenv('ROUTE_CACHE_TTL', '600')),
+    max_bytes=int(os.getenv('ROUTE_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+    sizeof=_route_sizeof,
+)
+
+# Simplified and/or encoded variants of cached routes, keyed by
+# (route cache key, zoom, encoded).
+_shape_cache = LRUCache(
+    max_entries=int(os.getenv('ROUTE_CACHE_MAX_ENTRIES', '4096')),
+    ttl=float(os.getenv('ROUTE_CACHE_TTL', '600')),
+    max_bytes=int(os.getenv('ROUTE_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+    sizeof=lambda shape: len(shape) if isinstance(shape, str) else _route_sizeof(shape),
+)
+
+# Concurrent requests for the same uncached route, e.g. everyone heading to
+# the same shelter right after an alert, share one HERE call.
+_route_flight = SingleFlight()
+
+_road_graph = None
+_road_graph_lock = threading.Lock()
+
+_http_session = requests.Session()
+_http_adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=ROUTE_BATCH_CONCURRENCY)
+_http_session.mount('https://', _http_adapter)
+_http_session.mount('http://', _http_adapter)
+
+_here_client = HereRoutingClient(
+    HERE_ROUTES_URL,
+    _http_session,
+    connect_timeout=HERE_TIMEOUT[0],
+    read_timeout=HERE_TIMEOUT[1],
+    budget=HERE_LATENCY_BUDGET,
+    retries=HERE_RETRIES,
+    backoff=HERE_RETRY_BACKOFF,
+    breaker=CircuitBreaker(HERE_BREAKER_FAILURES, HERE_BREAKER_RESET),
+)
+
+# Last good route per quantized (start, end), whatever hazards it avoided.
+_last_good_routes = LRUCache(
+    max_entries=int(os.getenv('ROUTE_CACHE_MAX_ENTRIES', '4096')),
+    ttl=ROUTE_STALE_TTL,
+    max_bytes=int(os.getenv('ROUTE_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+    sizeof=_route_sizeof,
+)
+
+metrics.register_saturation(
+    'here_circuit', lambda: {
+        'open': int(_here_client.breaker.state != 'closed'),
+        'consecutive_failures': _here_client.breaker.stats()['failures'],
+    })
+
+_route_executor = ThreadPoolExecutor(max_workers=ROUTE_BATCH_CONCURRENCY, thread_name_prefix='route-batch')
+
+metrics.register_saturation(
+    'route_executor', lambda: {
+        'threads': len(_route_executor._threads),
+        'max_threads': _route_executor._max_workers,
+        'queued': _route_executor._work_queue.qsize(),
+    })
+
+
+def _parse_point(point):
+    """Parse a "lat,lng" string into a pair of floats.
+
+    Raises:
+        ValueError: If the point is not a "lat,lng" pair of numbers within
+            [-90, 90] and [-180, 180].
+    """
+    try:
+        lat, lng = (float(value) for value in point.split(','))
+    except (AttributeError, ValueError):
+        raise ValueError(f'Invalid coordinate "{point}", expected "lat,lng"')
+    if not -90 <= lat <= 90 or not -180 <= lng <= 180:
+        raise ValueError(f'Invalid coordinate "{point}", latitude must be in [-90, 90] and longitude in [-180, 180]')
+    return lat, lng
+
+
+def _quantize(point):
+    """Round a "lat,lng" string to `ROUTE_CACHE_PRECISION` decimal places."""
+    lat, lng = _parse_point(point)
+    return round(lat, ROUTE_CACHE_PRECISION), round(lng, ROUTE_CACHE_PRECISION)
+
+
+def _here_avoid_areas(hazards, start, end):
+    """Format hazards as a HERE `avoid[areas]` value of bounding boxes.
+
+    When there are more hazards than HERE accepts, the ones closest to the
+    middle of the trip are kept.
+    """
+    if len(hazards) > MAX_AVOID_AREAS:
+        mid_lat, mid_lng = (start[0] + end[0]) / 2, (start[1] + end[1]) / 2
+
+        def distance(hazard):
+            min_lat, min_lng, max_lat, max_lng = hazard.bbox
+            return ((min_lat + max_lat) / 2 - mid_lat)**2 + ((min_lng + max_lng) / 2 - mid_lng)**2
+
+        hazards = sorted(hazards, key=distance)[:MAX_AVOID_AREAS]
+    return '|'.join(f'bbox:{min_lng},{min_lat},{max_lng},{max_lat}'
+                    for min_lat, min_lng, max_lat, max_lng in (hazard.bbox for hazard in hazards))
+
+
+def _route_cache_key(start, end, hazards):
+    return _quantize(start), _quantize(end), tuple((hazard.key, hazard.revision) for hazard in hazards)
+
+
+def route_cache_stats():
+    """Return hit/miss/eviction counters of the route cache, plus coalescing, HERE client and fallback counters."""
+    return {
+        **_route_cache.stats(),
+        'coalescing': _route_flight.stats(),
+        'here': _here_client.stats(),
+        'stale_routes': len(_last_good_routes),
+    }
+
+
+def fetch_route_from_api(origin='53.3441,-6.2573', destination='53.3430,-6.2672', hazards=()):
+    """Fetches the route from the HERE API, avoiding the given hazard areas."""
+    API_KEY = os.getenv('API_KEY')
 
     # Parameters for API request
     # origin = '53.3441,-6.2573'
     # destination = '53.3430,-6.2672'
-    avoid_areas = 'bbox:-6.2700,53.3420,-6.2500,53.3460'
-    url = 'https://router.hereapi.com/v8/routes'
     params = {
         'origin': origin,
         'destination': destination,
         'transportMode': 'car',
-        'avoid[areas]': avoid_areas,
         'return': 'polyline',
         'apiKey': API_KEY
     }
+    if hazards:
+        params['avoid[areas]'] = _here_avoid_areas(hazards, _parse_point(origin), _parse_point(destination))
 
-    # Send Get Request
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-
-    data = response.json()
+    # Bounded by the latency budget, retried and guarded by the circuit breaker
+    data = _here_client.get_route(params)
     route_map = data['routes'][0]['sections'][0]['polyline']
-    print('-->', route_map)
+    logging.debug('HERE route polyline: %s', route_map)
     decode_route_map = fp.decode(route_map)
 
     return decode_route_map
 
 
-def get_evacuate_map(start, end):
+def load_road_graph():
+    """Load the local road graph on first use.
+
+    Returns:
+        RoadGraph: The graph, or None when `ROAD_GRAPH_PATH` is not set.
+    """
+    global _road_graph
+    if _road_graph is None and ROAD_GRAPH_PATH:
+        with _road_graph_lock:
+            if _road_graph is None:
+                _road_graph = RoadGraph.load(ROAD_GRAPH_PATH)
+    return _road_graph
+
+
+def fetch_route_offline(origin, destination, hazards=()):
+    """Compute a route on the local road graph, treating hazard areas as impassable.
+
+    Returns:
+        list: (lat, lng) tuples, the same shape `fetch_route_from_api` returns.
+
+    Raises:
+        RuntimeError: If no local road graph is configured.
+        ValueError: If no route avoids the restricted areas.
+    """
+    graph = load_road_graph()
+    if graph is None:
+        raise RuntimeError('Offline routing requires ROAD_GRAPH_PATH to be set')
+
+    route = graph.shortest_path(_parse_point(origin), _parse_point(destination), [hazard.polygon for hazard in hazards])
+    if route is None:
+        raise ValueError(f'No route from {origin} to {destination} avoids the restricted areas')
+    return route
+
+
+def _compute_route(start, end, hazards):
+    """Route with the configured backend, falling back when HERE is unavailable.
+
+    The local road graph is tried first; without one, the last good route
+    between the same points is served, even if it was computed for other
+    hazards. HERE rejecting the request itself, e.g. with a 4xx, is not a
+    reason to fall back and is raised as is.
+
+    Returns:
+        tuple: `(route, stale)`, where `stale` tells a last good route was used.
+    """
+    if ROUTING_BACKEND == 'local':
+        return fetch_route_offline(start, end, hazards), False
+    try:
+        return fetch_route_from_api(start, end, hazards), False
+    except RoutingUnavailable as e:
+        if load_road_graph() is not None:
+            metrics.ROUTE_FALLBACKS.labels('offline').inc()
+            return fetch_route_offline(start, end, hazards), False
+        route = _last_good_routes.get((_quantize(start), _quantize(end)))
+        if route is None:
+            raise
+        metrics.ROUTE_FALLBACKS.labels('stale').inc()
+        logging.warning('HERE unavailable (%s); serving the last good route from %s to %s', describe_error(e), start,
+                        end)
+        return route, True
+
+
+def _get_route(start, end, hazards):
+    """Return `(route, stale)`, see `get_cached_route` and `_compute_route`."""
+    key = _route_cache_key(start, end, hazards)
+    route = _route_cache.get(key)
+    if route is not None:
+        return route, False
+    return _route_flight.do(key, _load_route, key, start, end, hazards)
+
+
+def _load_route(key, start, end, hazards):
+    route, stale = _compute_route(start, end, hazards)
+    if not stale:
+        # Stale routes are not cached, so HERE is asked again once it is back.
+        _route_cache.set(key, route)
+        _last_good_routes.set(key[:2], route)
+    return route, stale
+
+
+def get_cached_route(start, end, hazards=()):
+    """Return the route between two points, served from the route cache when possible.
+
+    Requests whose endpoints quantize to the same grid cell and that avoid the
+    same versions of the same hazard areas share one cached route, and
+    concurrent misses for it share one computation.
+    """
+    return _get_route(start, end, hazards)[0]
+
+
+def _trip_hazards(start, end):
+    """Look up the indexed hazard areas around a trip.
+
+    Raises:
+        ValueError: If an endpoint is invalid or the trip spans more than
+            `MAX_TRIP_SPAN_DEG` degrees.
+    """
+    start, end = _parse_point(start), _parse_point(end)
+    if abs(start[0] - end[0]) > MAX_TRIP_SPAN_DEG or abs(start[1] - end[1]) > MAX_TRIP_SPAN_DEG:
+        raise ValueError(f'Trips may span at most {MAX_TRIP_SPAN_DEG} degrees of latitude and longitude')
+    return hazard_handler.hazards_near(start, end)
+
+
+def _route_shape(key, route, zoom=None, encoded=False):
+    """Return the route simplified for `zoom` and/or flexpolyline-encoded, cached per variant.
+
+    Nothing is cached when `key` is None.
+    """
+    if zoom is None and not encoded:
+        return route
+
+    shape_key = (key, zoom, encoded)
+    shape = _shape_cache.get(shape_key) if key is not None else None
+    if shape is None:
+        shape = route
+        if zoom is not None:
+            tolerance = meters_per_pixel(zoom, route[0][0]) * ROUTE_SIMPLIFY_PIXELS if route else 0
+            shape = simplify_path(route, tolerance)
+        if encoded:
+            shape = fp.encode(shape)
+        if key is not None:
+            _shape_cache.set(shape_key, shape)
+    return shape
+
+
+def get_evacuate_map(start, end, zoom=None, encoded=False):
     """Generates the evacuation map with route and restricted areas.
 
-    :return: A dictionary containing 'route_map' and 'restrict_areas'.
+    Args:
+        start (str): Origin as "lat,lng".
+        end (str): Destination as "lat,lng".
+        zoom (int): Optional map zoom level; the route is simplified to about
+            `ROUTE_SIMPLIFY_PIXELS` pixels of error at that zoom.
+        encoded (bool): Return the route as a flexpolyline string under
+            'route_polyline' instead of a point list under 'route_map'.
+
+    :return: A dictionary containing 'route_map' (or 'route_polyline'),
+        'restrict_areas' (the ring of the first hazard near the trip, for
+        clients that draw a single area), 'hazard_areas' (every hazard near
+        the trip) and 'route_hazards' (IDs of hazards the returned route still
+        passes through) and 'stale' (True when HERE was unavailable and the
+        last good route between these points was served instead; it may cross
+        hazards reported since, which 'route_hazards' lists).
     """
+    hazards = _trip_hazards(start, end)
+    route, stale = _get_route(start, end, hazards)
+    shape = _route_shape(None if stale else _route_cache_key(start, end, hazards), route, zoom, encoded)
+
+    return {
+        'route_polyline' if encoded else 'route_map': shape,
+        'restrict_areas': hazards[0].polygon if hazards else [],
+        'hazard_areas': [{
+            'hazard_id': hazard.key,
+            'polygon': hazard.polygon
+        } for hazard in hazards],
+        'route_hazards': [hazard.key for hazard in hazard_handler.hazards_on_route(route)],
+        'stale': stale,
+    }
 
-    # Mock restricted areas
-    mock_restrict_areas = [
-        (53.3460, -6.2700),  # Top left corner
-        (53.3460, -6.2500),  # Top right corner
-        (53.3420, -6.2500),  # Bottom right corner
-        (53.3420, -6.2700),  # Bottom left corner
-        (53.3460, -6.2700),  # Back to starting point
-    ]
 
-    return {'route_map': fetch_route_from_api(start, end), 'restrict_areas': mock_restrict_areas}
+def get_evacuate_maps(pairs):
+    """Generate evacuation maps for many start/end pairs at once.
+
+    Identical pairs (after coordinate quantization) are computed once, and the
+    distinct ones run concurrently, at most `ROUTE_BATCH_CONCURRENCY` at a time.
+
+    Args:
+        pairs: Sequence of (start, end) "lat,lng" strings.
+
+    Returns:
+        list: One entry per input pair, in input order: the same dictionary
+        `get_evacuate_map` returns, or `{'error': message}` if that pair failed.
+        Messages of upstream failures only name the HTTP status or error type;
+        the details are logged.
+    """
+    keys = [None] * len(pairs)
+    results = [None] * len(pairs)
+    unique = {}
+    for index, (start, end) in enumerate(pairs):
+        try:
+            keys[index] = _route_cache_key(start, end, _trip_hazards(start, end))
+        except ValueError as e:
+            results[index] = {'error': str(e)}
+            continue
+        unique.setdefault(keys[index], (start, end))
+
+    futures = {key: _route_executor.submit(get_evacuate_map, start, end) for key, (start, end) in unique.items()}
+    for index, key in enumerate(keys):
+        if key is None:
+            continue
+        try:
+            results[index] = futures[key].result()
+        except ValueError as e:
+            results[index] = {'error': str(e)}
+        except Exception as e:
+            # Upstream errors embed the HERE request URL, API key included.
+            logging.warning('Batch route from %s to %s failed: %s', *unique[key], describe_error(e))
+            results[index] = {'error': describe_error(e)}
+    return results
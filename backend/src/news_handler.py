@@ -1,13 +1,95 @@
-from src.utils import db_utils
+import base64
+import json
+import os
+import re
+from datetime import datetime
 
+from src import events_handler
+from src.utils import async_db_utils, db_routing, db_utils, metrics, responses
+from src.utils.cache import AsyncReadThroughCache, AsyncSingleFlight, LRUCache, RedisBackend
+from src.utils.http_cache import make_etag
+from src.utils.view_counter import ViewCounter
 
-def create_news(author_id, cover_link, title, subtitle, location, views=0):
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+EXPORT_BATCH_SIZE = 1000
+MAX_NEARBY_RADIUS_M = 50000
+MAX_BATCH_IDS = 100
+
+# Related data `include=` can add to batch results.
+BATCH_INCLUDES = ('details',)
+
+# View increments are buffered in memory and written to the database in one
+# bulk UPDATE every VIEW_FLUSH_INTERVAL seconds.
+_view_counter = ViewCounter(lambda deltas: async_db_utils.increment_news_views(deltas),
+                            interval=float(os.getenv('VIEW_FLUSH_INTERVAL', '5')),
+                            max_pending=int(os.getenv('VIEW_MAX_PENDING', '100000')))
+
+metrics.register_saturation('view_counter', lambda: {
+    'pending': _view_counter.pending(),
+    'dropped': _view_counter.dropped,
+})
+
+# Shape of the IDs `db_utils._generate_id` hands out, old and time-ordered
+# alike; anything else cannot be a news entry.
+NEWS_ID_PATTERN = re.compile(r'news_[0-9a-z]{1,45}')
+
+# Read-through cache of single news items, stored as (row, version, updated_at)
+# so conditional requests are answered without touching the database. Set
+# NEWS_CACHE_REDIS_URL to share entries between workers. Without it, each
+# worker drops its copy when another worker announces a change over
+# LISTEN/NOTIFY; with EVENTS_CROSS_WORKER=0 as well, other workers serve
+# the old item for up to NEWS_CACHE_TTL seconds.
+_news_cache = AsyncReadThroughCache(
+    LRUCache(max_entries=int(os.getenv('NEWS_CACHE_MAX_ENTRIES', '10000')),
+             ttl=float(os.getenv('NEWS_CACHE_TTL', '30'))),
+    shared=RedisBackend(os.environ['NEWS_CACHE_REDIS_URL'], prefix='news:')
+    if os.getenv('NEWS_CACHE_REDIS_URL') else None,
+)
+
+# Identical list and page queries running at the same time share one
+# database round trip, so a burst of clients opening the feed costs one
+# query per distinct page. Writes detach the queries in flight, so a client
+# never reads a list that started before its own write finished.
+_list_flight = AsyncSingleFlight()
+
+
+async def _apply_news_event(event):
+    """Drop a news item another worker changed from this worker's cache."""
+    if event['type'] in ('news.updated', 'news.deleted'):
+        _news_cache.invalidate_local(event['id'])
+
+
+async def _clear_news_cache():
+    """Drop every cached news item; changes announced while LISTEN was down are lost."""
+    _news_cache.clear_local()
+
+
+# Without a shared backend every worker caches on its own; news.* events keep
+# them all current.
+events_handler.add_handler('news', _apply_news_event, resync=_clear_news_cache)
+
+
+def create_news(author_id, cover_link, title, subtitle, location, views=0, latitude=None, longitude=None):
     """Create a new news entry by adding it to the database.
 
     Returns:
         news_id (str): The ID of the newly created news entry.
     """
-    return db_utils.add_news_to_db(author_id, cover_link, title, subtitle, location, views)
+    return db_utils.add_news_to_db(author_id, cover_link, title, subtitle, location, views, latitude, longitude)
+
+
+def create_news_bulk(news_items):
+    """Create many news entries in a single transaction.
+
+    Args:
+        news_items: Sequence of (author_id, cover_link, title, subtitle, location, views[, latitude, longitude])
+            tuples.
+
+    Returns:
+        list: The IDs of the new entries, in input order.
+    """
+    return db_utils.add_news_bulk_to_db(news_items)
 
 
 def get_news_list():
@@ -19,6 +101,79 @@ def get_news_list():
     return db_utils.get_news_list()
 
 
+def _encode_cursor(sort_key, news_id):
+    """Encode a page keyset, its sort key then the news ID, as an opaque, URL-safe cursor string.
+
+    The sort key is a publication datetime or a number, such as a search rank
+    or a distance.
+    """
+    if isinstance(sort_key, datetime):
+        sort_key = sort_key.isoformat()
+    payload = json.dumps([sort_key, news_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor, parse_key=datetime.fromisoformat):
+    """Decode a cursor produced by `_encode_cursor`.
+
+    Args:
+        cursor (str): The cursor string.
+        parse_key: Converts the decoded sort key back; `float` for numbers.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_key, news_id = json.loads(base64.urlsafe_b64decode(padded))
+        return parse_key(sort_key), str(news_id)
+    except Exception:
+        raise ValueError('Invalid pagination cursor')
+
+
+def _parse_fields(fields):
+    """Split a comma-separated `fields=` value into a list of column names."""
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(',') if field.strip()] or None
+
+
+def _build_news_page(columns, rows, limit, fields):
+    """Trim the look-ahead row and shape a page for the API response."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = dict(zip(columns, rows[-1]))
+        next_cursor = _encode_cursor(last['published_at'], last['news_id'])
+
+    if fields:
+        rows = [{field: row[columns.index(field)] for field in fields} for row in rows]
+    return {'news': rows, 'next_cursor': next_cursor}
+
+
+def get_news_page(limit=DEFAULT_PAGE_SIZE, cursor=None, fields=None):
+    """Retrieve one page of news entries, newest first.
+
+    Args:
+        limit (int): Page size, capped at `MAX_PAGE_SIZE`.
+        cursor (str): Opaque `next_cursor` returned with the previous page.
+        fields (str): Optional comma-separated list of columns to return. When
+            given, rows are returned as objects keyed by field name; otherwise
+            they are full rows in table column order.
+
+    Returns:
+        dict: `news` (the rows) and `next_cursor` (None on the last page).
+
+    Raises:
+        ValueError: If the cursor or a field name is invalid.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = _decode_cursor(cursor) if cursor else None
+    fields = _parse_fields(fields)
+    columns, rows = db_utils.get_news_page(limit, after, fields)
+    return _build_news_page(columns, rows, limit, fields)
+
+
 def get_news(news_id: str):
     """Retrieve a single news entry by its ID.
 
@@ -31,19 +186,275 @@ def get_news(news_id: str):
     return db_utils.get_news_by_id(news_id)
 
 
-def update_news(news_id, cover_link, title, subtitle, location, views):
-    """Update an existing news entry.
+def _parse_batch_ids(ids):
+    """Split a comma-separated `ids=` value into distinct IDs, in request order.
+
+    Raises:
+        ValueError: If there are no IDs or more than `MAX_BATCH_IDS`.
+    """
+    news_ids = list(dict.fromkeys(news_id.strip() for news_id in (ids or '').split(',') if news_id.strip()))
+    if not news_ids:
+        raise ValueError('At least one news ID is required')
+    if len(news_ids) > MAX_BATCH_IDS:
+        raise ValueError(f'At most {MAX_BATCH_IDS} news IDs can be fetched at once')
+    return news_ids
+
+
+def _parse_include(include):
+    """Split a comma-separated `include=` value, checking it against `BATCH_INCLUDES`."""
+    includes = {item.strip() for item in (include or '').split(',') if item.strip()}
+    unknown = includes.difference(BATCH_INCLUDES)
+    if unknown:
+        raise ValueError(f'Unknown include: {", ".join(sorted(unknown))}')
+    return includes
+
+
+def _build_news_batch(columns, rows, news_ids):
+    """Key rows by news ID and list the requested IDs that matched no row."""
+    found = {row[0]: dict(zip(columns, row)) for row in rows}
+    return {'news': found, 'missing': [news_id for news_id in news_ids if news_id not in found]}
+
+
+def get_news_batch(ids, include=None):
+    """Retrieve many news entries in one query.
+
+    Args:
+        ids (str): Comma-separated news IDs, at most `MAX_BATCH_IDS`.
+        include (str): Optional comma-separated related data; 'details' adds
+            each entry's `summary` (None when it has no details).
+
+    Returns:
+        dict: `news` (objects keyed by news ID) and `missing` (requested IDs
+        that do not exist).
+
+    Raises:
+        ValueError: If `ids` or `include` is invalid.
+    """
+    news_ids = _parse_batch_ids(ids)
+    columns, rows = db_utils.get_news_batch(news_ids, 'details' in _parse_include(include))
+    return _build_news_batch(columns, rows, news_ids)
+
+
+# ASYNC VARIANTS
+#
+# Same contract as the functions above, backed by the async connection pool so
+# they can be awaited from `async def` endpoints without holding a thread.
+
+
+async def create_news_async(author_id, cover_link, title, subtitle, location, views=0, latitude=None, longitude=None):
+    """Async variant of `create_news`."""
+    news_id = await async_db_utils.add_news_to_db(author_id, cover_link, title, subtitle, location, views, latitude,
+                                                  longitude)
+    _list_flight.forget()
+    await events_handler.publish('news.created', id=news_id)
+    return news_id
+
+
+async def create_news_bulk_async(news_items):
+    """Async variant of `create_news_bulk`, loading the rows with COPY.
+
+    Subscribers get a single 'news.bulk_created' event with the count rather
+    than one event per row.
+    """
+    news_ids = await async_db_utils.add_news_bulk_to_db(news_items)
+    _list_flight.forget()
+    await events_handler.publish('news.bulk_created', count=len(news_ids))
+    return news_ids
+
+
+async def get_news_list_async():
+    """Async variant of `get_news_list`; concurrent calls share one query."""
+    # Requests pinned to the primary must not join a flight reading a replica.
+    return await _list_flight.do(('list', db_routing.reads_use_primary()), async_db_utils.get_news_list)
+
+
+async def get_news_page_async(limit=DEFAULT_PAGE_SIZE, cursor=None, fields=None):
+    """Async variant of `get_news_page`; concurrent calls for the same page share one query.
+
+    The returned dict may be shared with other callers and must not be modified.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = _decode_cursor(cursor) if cursor else None
+    fields = _parse_fields(fields)
+
+    async def load():
+        columns, rows = await async_db_utils.get_news_page(limit, after, fields)
+        return _build_news_page(columns, rows, limit, fields)
+
+    key = ('page', limit, after, tuple(fields) if fields else None, db_routing.reads_use_primary())
+    return await _list_flight.do(key, load)
+
+
+async def search_news_async(q, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """Search news by title, subtitle and location, best matches first.
+
+    Args:
+        q (str): Search text; supports "quoted phrases", `or` and `-excluded` words.
+        limit (int): Page size, capped at `MAX_PAGE_SIZE`.
+        cursor (str): Opaque `next_cursor` returned with the previous page.
+
+    Returns:
+        dict: `news` (objects keyed by column name, plus `rank` and a
+        `snippet` with matches wrapped in <mark>) and `next_cursor`.
+
+    Raises:
+        ValueError: If the query is empty or the cursor is malformed.
+    """
+    q = q.strip()
+    if not q:
+        raise ValueError('Search query must not be empty')
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = _decode_cursor(cursor, float) if cursor else None
+    columns, rows = await async_db_utils.search_news(q, limit, after)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = dict(zip(columns, rows[-1]))
+        next_cursor = _encode_cursor(last['rank'], last['news_id'])
+    return {'news': [dict(zip(columns, row)) for row in rows], 'next_cursor': next_cursor}
+
+
+async def get_news_nearby_async(lat, lon, radius, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """Find news located within `radius` meters of a point, nearest first.
+
+    News without coordinates never match.
+
+    Args:
+        lat (float): Latitude of the center.
+        lon (float): Longitude of the center.
+        radius (float): Search radius in meters, capped at `MAX_NEARBY_RADIUS_M`.
+        limit (int): Page size, capped at `MAX_PAGE_SIZE`.
+        cursor (str): Opaque `next_cursor` returned with the previous page.
+
+    Returns:
+        dict: `news` (objects keyed by column name, plus `distance_m`) and
+        `next_cursor`.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    radius = max(0.0, min(radius, MAX_NEARBY_RADIUS_M))
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = _decode_cursor(cursor, float) if cursor else None
+    columns, rows = await async_db_utils.get_news_nearby(lat, lon, radius, limit, after)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = dict(zip(columns, rows[-1]))
+        next_cursor = _encode_cursor(last['distance_m'], last['news_id'])
+    return {'news': [dict(zip(columns, row)) for row in rows], 'next_cursor': next_cursor}
+
+
+async def export_news_ndjson(batch_size=EXPORT_BATCH_SIZE):
+    """Export every news entry as newline-delimited JSON.
+
+    Yields:
+        bytes: One chunk per database batch, each line a JSON object keyed by
+        column name.
+    """
+    async for rows in async_db_utils.iter_news_batches(batch_size):
+        yield b''.join(responses.dumps(dict(zip(db_utils.NEWS_COLUMNS, row))) + b'\n' for row in rows)
+
+
+async def get_news_page_validators_async(limit=DEFAULT_PAGE_SIZE, cursor=None, fields=None):
+    """Return the HTTP validators of a news page without fetching it.
+
+    The validators come from the news table's change counter, so any write to
+    the table changes the ETag of every page. Buffered view counts are the
+    exception: they do not bump the counter, so the views of a page answered
+    with 304 may be behind until the next content change.
+
+    Returns:
+        tuple: `(etag, last_modified)`, or None if the table is not versioned.
+    """
+    version = await async_db_utils.get_table_version('news')
+    if version is None:
+        return None
+    number, updated_at = version
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    return make_etag('news', number, limit, cursor, fields), updated_at
+
+
+async def get_news_batch_async(ids, include=None):
+    """Async variant of `get_news_batch`."""
+    news_ids = _parse_batch_ids(ids)
+    columns, rows = await async_db_utils.get_news_batch(news_ids, 'details' in _parse_include(include))
+    return _build_news_batch(columns, rows, news_ids)
+
+
+async def get_news_with_validators_async(news_id: str):
+    """Retrieve a news entry and its HTTP validators through the news item cache.
+
+    Returns:
+        tuple: `(row, etag, last_modified)`.
+
+    Raises:
+        ValueError: If no news entry has this ID.
+    """
+    row, version, updated_at = await _news_cache.get_or_load(news_id,
+                                                             lambda: async_db_utils.get_news_with_version(news_id))
+    return row, make_etag(news_id, version), updated_at
+
+
+async def get_news_async(news_id: str):
+    """Async variant of `get_news`, served through the news item cache."""
+    row, _, _ = await get_news_with_validators_async(news_id)
+    return row
+
+
+async def update_news_async(news_id, cover_link, title, subtitle, location, views, latitude=None, longitude=None):
+    """Update an existing news entry; coordinates are kept unless given.
+
+    Drops the entry from the news item cache, shared backend included, and
+    announces the change to every worker.
 
     Returns:
         tuple: The updated news record.
     """
-    return db_utils.update_news(news_id, cover_link, title, subtitle, location, views)
+    updated = await async_db_utils.update_news(news_id, cover_link, title, subtitle, location, views, latitude,
+                                               longitude)
+    _list_flight.forget()
+    await _news_cache.invalidate(news_id)
+    await events_handler.publish('news.updated', id=news_id)
+    return updated
 
 
-def delete_news(news_id):
-    """Delete a news entry from the database.
+async def delete_news_async(news_id):
+    """Delete a news entry from the database and the news item cache.
 
     Returns:
         dict: A message confirming deletion.
     """
-    return db_utils.delete_news(news_id)
+    result = await async_db_utils.delete_news(news_id)
+    _list_flight.forget()
+    await _news_cache.invalidate(news_id)
+    await events_handler.publish('news.deleted', id=news_id)
+    return result
+
+
+def news_cache_stats():
+    """Return hit ratio, eviction and load counters of the news item cache, plus list coalescing counters."""
+    return {**_news_cache.stats(), 'list_coalescing': _list_flight.stats()}
+
+
+def record_view(news_id):
+    """Count one view of a news entry; it is written out on the next flush.
+
+    Raises:
+        ValueError: If `news_id` is not shaped like a news ID.
+    """
+    if not NEWS_ID_PATTERN.fullmatch(news_id):
+        raise ValueError(f'Invalid news ID "{news_id}"')
+    _view_counter.increment(news_id)
+
+
+def start_view_counter():
+    """Start periodically flushing buffered views to the database."""
+    _view_counter.start()
+
+
+async def stop_view_counter():
+    """Stop the periodic flush and write out every buffered view."""
+    await _view_counter.stop()
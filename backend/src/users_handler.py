@@ -1,4 +1,4 @@
-from src.utils import db_utils
+from src.utils import async_db_utils, db_utils
 
 
 def create_user(username, email, password_hash, full_name):
@@ -47,3 +47,31 @@ def delete_user(user_id):
         dict: A message confirming deletion.
     """
     return db_utils.delete_user(user_id)
+
+
+# ASYNC VARIANTS
+
+
+async def create_user_async(username, email, password_hash, full_name):
+    """Async variant of `create_user`."""
+    return await async_db_utils.add_user_to_db(username, email, password_hash, full_name)
+
+
+async def get_user_async(user_id):
+    """Async variant of `get_user`."""
+    return await async_db_utils.get_user_by_id(user_id)
+
+
+async def get_users_list_async():
+    """Async variant of `get_users_list`."""
+    return await async_db_utils.get_all_users()
+
+
+async def update_user_async(user_id, username, email, password_hash, full_name):
+    """Async variant of `update_user`."""
+    return await async_db_utils.update_user(user_id, username, email, password_hash, full_name)
+
+
+async def delete_user_async(user_id):
+    """Async variant of `delete_user`."""
+    return await async_db_utils.delete_user(user_id)
@@ -0,0 +1,589 @@
+import asyncio
+import os
+
+from psycopg import AsyncConnection, OperationalError
+from psycopg.conninfo import make_conninfo
+from psycopg.sql import SQL, Identifier
+from psycopg.types.json import Jsonb
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+from src.utils import db_routing, metrics
+from src.utils.db_utils import (NEWS_COLUMNS, _generate_id, _news_batch_query, _news_nearby_query, _news_page_query,
+                                _news_search_query, _pad_news_item)
+
+_pool = None
+_replicas = None
+_pool_lock = asyncio.Lock()
+
+metrics.register_saturation('async_db_pool', lambda: _pool.get_stats() if _pool is not None else {})
+metrics.register_saturation('async_db_replicas', lambda: _replicas.stats() if _replicas is not None else {})
+
+
+def _conninfo():
+    """Build the libpq connection string from the environment."""
+    return make_conninfo(
+        dbname=os.getenv('POSTGRES_DB'),
+        user=os.getenv('POSTGRES_USER'),
+        password=os.getenv('POSTGRES_PASSWORD'),
+        host=os.getenv('POSTGRES_HOST'),
+        port=os.getenv('POSTGRES_PORT'),
+    )
+
+
+def _create_pool(conninfo=None, min_size=None, timeout=None):
+    """Create an async pool, sized from the same variables as the sync pool.
+
+    Defaults to the primary; replica pools pass their own `conninfo`.
+    """
+    return AsyncConnectionPool(
+        conninfo or _conninfo(),
+        min_size=int(os.getenv('POSTGRES_POOL_MIN_SIZE', '1')) if min_size is None else min_size,
+        max_size=int(os.getenv('POSTGRES_POOL_MAX_SIZE', '10')),
+        timeout=float(os.getenv('POSTGRES_POOL_TIMEOUT', '30')) if timeout is None else timeout,
+        max_idle=float(os.getenv('POSTGRES_POOL_MAX_IDLE', '300')),
+        max_lifetime=float(os.getenv('POSTGRES_POOL_MAX_LIFETIME', '3600')),
+        check=AsyncConnectionPool.check_connection,
+        open=False,
+    )
+
+
+async def open_pool():
+    """Open the process-wide async pool and the replica pools; safe to call more than once."""
+    global _pool, _replicas
+    async with _pool_lock:
+        if _pool is None:
+            pool = _create_pool()
+            await pool.open(wait=False)
+            _pool = pool
+        if _replicas is None:
+            replica_pools = [
+                _create_pool(dsn, min_size=0, timeout=float(os.getenv('POSTGRES_REPLICA_POOL_TIMEOUT', '2')))
+                for dsn in db_routing.replica_dsns()
+            ]
+            for replica_pool in replica_pools:
+                await replica_pool.open(wait=False)
+            _replicas = db_routing.ReplicaSet(replica_pools)
+    return _pool
+
+
+async def wait_pool(timeout=30.0):
+    """Wait until the pool holds its minimum number of connections.
+
+    Raises:
+        psycopg_pool.PoolTimeout: If they are not ready within `timeout` seconds.
+    """
+    pool = await get_pool()
+    try:
+        await pool.wait(timeout=timeout)
+    except PoolTimeout:
+        # psycopg closes a pool whose wait() times out; replace it so requests
+        # can still connect once the database becomes reachable.
+        await close_pool()
+        await open_pool()
+        raise
+
+
+async def close_pool():
+    """Close the process-wide async pool and the replica pools, if they were opened."""
+    global _pool, _replicas
+    async with _pool_lock:
+        if _pool is not None:
+            await _pool.close()
+            _pool = None
+        if _replicas is not None:
+            for replica_pool in _replicas.pools:
+                await replica_pool.close()
+            _replicas = None
+
+
+async def get_pool():
+    """Return the primary async pool, opening it on first use.
+
+    The caller's later reads then stay on the primary, so they see its writes.
+    """
+    db_routing.use_primary()
+    if _pool is None:
+        return await open_pool()
+    return _pool
+
+
+# Returned by _run_on_replica when the statement has to run on the primary.
+_ON_PRIMARY = object()
+
+
+async def _run_on_replica(sql, params, fetch):
+    """Run a read-only statement on a replica and return `await fetch(cursor)`.
+
+    Returns `_ON_PRIMARY` instead when no replica is configured or healthy,
+    when the caller needs read-your-writes, or when the chosen replica turns
+    out to be unreachable, which also ejects it for a while.
+    """
+    choice = _replicas.choose() if _replicas is not None else None
+    if choice is None:
+        return _ON_PRIMARY
+    index, pool = choice
+    try:
+        async with pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(sql, params)
+                return await fetch(cursor)
+    except (OperationalError, PoolTimeout):
+        _replicas.eject(index)
+        return _ON_PRIMARY
+
+
+async def _execute_multiple_sqls(sql_params_list: list, *, query: str):
+    """Execute multiple SQL statements in a single transaction.
+
+    Args:
+        sql_params_list: list of tuples, each containing an SQL statement and its parameters.
+        Example: [(sql, params), (sql, params), ...]
+    """
+    results = []
+    pool = await get_pool()
+    with metrics.QueryTimer(query, 'psycopg') as timer:
+        async with pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                for sql, params in sql_params_list:
+                    await cursor.execute(sql, params)
+                    results.append(await cursor.fetchall())
+                    timer.rows += len(results[-1])
+    return results
+
+
+async def _execute_sql_fetch_one(sql: str, params: tuple, *, query: str, cursor=None, replica=False):
+    """Execute an SQL query and fetch one result; read-only queries may pass `replica=True`."""
+    with metrics.QueryTimer(query, 'psycopg') as timer:
+        if cursor:
+            await cursor.execute(sql, params)
+            result = await cursor.fetchone()
+        else:
+            result = await _run_on_replica(sql, params, lambda cursor: cursor.fetchone()) if replica else _ON_PRIMARY
+            if result is _ON_PRIMARY:
+                pool = await get_pool()
+                async with pool.connection() as conn:
+                    async with conn.cursor() as cursor:
+                        await cursor.execute(sql, params)
+                        result = await cursor.fetchone()
+        timer.rows = 1 if result is not None else 0
+    return result
+
+
+async def _execute_sql_fetch_all(sql: str, params: tuple, *, query: str, cursor=None, replica=False):
+    """Execute an SQL query and fetch all results; read-only queries may pass `replica=True`."""
+    with metrics.QueryTimer(query, 'psycopg') as timer:
+        if cursor:
+            await cursor.execute(sql, params)
+            results = await cursor.fetchall()
+        else:
+            results = await _run_on_replica(sql, params, lambda cursor: cursor.fetchall()) if replica else _ON_PRIMARY
+            if results is _ON_PRIMARY:
+                pool = await get_pool()
+                async with pool.connection() as conn:
+                    async with conn.cursor() as cursor:
+                        await cursor.execute(sql, params)
+                        results = await cursor.fetchall()
+        timer.rows = len(results)
+    return results
+
+
+# NEWS FUNCTIONS
+
+
+async def add_news_to_db(author_id, cover_link, title, subtitle, location, views=0, latitude=None, longitude=None):
+    """Add a news entry to the database with a generated ID."""
+    try:
+        news_id = _generate_id('news')
+        sql = """
+            INSERT INTO news (news_id, author_id, cover_link, title, subtitle, location, views, latitude, longitude)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            RETURNING news_id;
+        """
+        result = await _execute_sql_fetch_one(
+            sql, (news_id, author_id, cover_link, title, subtitle, location, views, latitude, longitude),
+            query='add_news_to_db')
+        return result[0] if result else None
+    except Exception as e:
+        raise Exception(f'Error adding news to the database: {e}')
+
+
+async def add_news_bulk_to_db(news_items):
+    """Add many news entries in one transaction with COPY.
+
+    Args:
+        news_items: Sequence of (author_id, cover_link, title, subtitle, location, views[, latitude, longitude])
+            tuples.
+
+    Returns:
+        list: The generated news IDs, in input order.
+    """
+    try:
+        news_ids = [_generate_id('news') for _ in news_items]
+        sql = ('COPY news (news_id, author_id, cover_link, title, subtitle, location, views, latitude, longitude) '
+               'FROM STDIN')
+        pool = await get_pool()
+        with metrics.QueryTimer('add_news_bulk_to_db', 'psycopg') as timer:
+            async with pool.connection() as conn:
+                async with conn.cursor() as cursor:
+                    async with cursor.copy(sql) as copy:
+                        for news_id, item in zip(news_ids, news_items):
+                            await copy.write_row((news_id, *_pad_news_item(item)))
+            timer.rows = len(news_ids)
+        return news_ids
+    except Exception as e:
+        raise Exception(f'Error adding news to the database: {e}')
+
+
+async def get_news_list():
+    """Retrieve a list of all news entries."""
+    sql = f'SELECT {", ".join(NEWS_COLUMNS)} FROM news;'
+    try:
+        return await _execute_sql_fetch_all(sql, (), query='get_news_list', replica=True)
+    except Exception as e:
+        raise Exception(f'Error retrieving news list: {e}')
+
+
+async def get_news_page(limit, after=None, fields=None):
+    """Retrieve one keyset-paginated page of news entries.
+
+    Returns:
+        tuple: `(columns, rows)`; see `db_utils._news_page_query`.
+    """
+    sql, params, columns = _news_page_query(limit, after, fields)
+    try:
+        return columns, await _execute_sql_fetch_all(sql, params, query='get_news_page', replica=True)
+    except Exception as e:
+        raise Exception(f'Error retrieving news page: {e}')
+
+
+async def search_news(text, limit, after=None):
+    """Full-text search over news, best matches first.
+
+    Returns:
+        tuple: `(columns, rows)`; see `db_utils._news_search_query`.
+    """
+    sql, params, columns = _news_search_query(text, limit, after)
+    try:
+        return columns, await _execute_sql_fetch_all(sql, params, query='search_news', replica=True)
+    except Exception as e:
+        raise Exception(f'Error searching news: {e}')
+
+
+async def get_news_nearby(lat, lng, radius_m, limit, after=None):
+    """Retrieve news within `radius_m` meters of a point, nearest first.
+
+    Returns:
+        tuple: `(columns, rows)`; see `db_utils._news_nearby_query`.
+    """
+    sql, params, columns = _news_nearby_query(lat, lng, radius_m, limit, after)
+    try:
+        return columns, await _execute_sql_fetch_all(sql, params, query='get_news_nearby', replica=True)
+    except Exception as e:
+        raise Exception(f'Error retrieving nearby news: {e}')
+
+
+async def iter_news_batches(batch_size=1000):
+    """Stream the whole news table through a server-side cursor.
+
+    Rows are pulled from Postgres `batch_size` at a time, so memory stays
+    bounded by one batch regardless of table size and the first batch is
+    available before the scan completes.
+
+    Yields:
+        list: Up to `batch_size` rows in `NEWS_COLUMNS` order.
+    """
+    sql = f"""
+        SELECT {', '.join(NEWS_COLUMNS)}
+        FROM news
+        ORDER BY published_at, news_id;
+    """
+    # Stays on the primary: a scan this long on a hot standby can be cancelled
+    # by replication conflicts halfway through the export.
+    pool = await get_pool()
+    async with pool.connection() as conn:
+        async with conn.cursor(name='news_export') as cursor:
+            await cursor.execute(sql)
+            while True:
+                rows = await cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+
+
+async def get_news_by_id(news_id):
+    """Retrieve a news entry by its news_id."""
+    sql = f'SELECT {", ".join(NEWS_COLUMNS)} FROM news WHERE news_id = %s;'
+    try:
+        result = await _execute_sql_fetch_one(sql, (news_id,), query='get_news_by_id', replica=True)
+    except Exception as e:
+        raise Exception(f'Error retrieving news with news_id {news_id}: {e}')
+    if not result:
+        raise ValueError(f'News with news_id {news_id} not found.')
+    return result
+
+
+async def get_news_batch(news_ids, include_details=False):
+    """Retrieve many news entries by ID in one query.
+
+    Returns:
+        tuple: `(columns, rows)`; see `db_utils._news_batch_query`.
+    """
+    sql, params, columns = _news_batch_query(news_ids, include_details)
+    try:
+        return columns, await _execute_sql_fetch_all(sql, params, query='get_news_batch', replica=True)
+    except Exception as e:
+        raise Exception(f'Error retrieving news batch: {e}')
+
+
+async def get_news_with_version(news_id):
+    """Retrieve a news entry together with its change validators.
+
+    Returns:
+        tuple: `(row, version, updated_at)`, where `row` is in `NEWS_COLUMNS`
+        order and `version` increases on every update of the entry.
+
+    Raises:
+        ValueError: If no news entry has this ID.
+    """
+    sql = f'SELECT {", ".join(NEWS_COLUMNS)}, version, updated_at FROM news WHERE news_id = %s;'
+    try:
+        result = await _execute_sql_fetch_one(sql, (news_id,), query='get_news_with_version')
+    except Exception as e:
+        raise Exception(f'Error retrieving news with news_id {news_id}: {e}')
+    if not result:
+        raise ValueError(f'News with news_id {news_id} not found.')
+    return result[:-2], result[-2], result[-1]
+
+
+async def get_table_version(table_name):
+    """Retrieve the change counter of a table.
+
+    Returns:
+        tuple: `(version, updated_at)`, or None if the table is not tracked in
+        `table_versions`.
+    """
+    sql = 'SELECT version, updated_at FROM table_versions WHERE table_name = %s;'
+    try:
+        return await _execute_sql_fetch_one(sql, (table_name,), query='get_table_version', replica=True)
+    except Exception as e:
+        raise Exception(f'Error retrieving version of table {table_name}: {e}')
+
+
+async def update_news(news_id, cover_link, title, subtitle, location, views, latitude=None, longitude=None):
+    """Update the details of an existing news entry; coordinates are kept unless given."""
+    sql = """
+        UPDATE news
+        SET cover_link = %s, title = %s, subtitle = %s, location = %s, views = %s,
+            latitude = COALESCE(%s, latitude), longitude = COALESCE(%s, longitude)
+        WHERE news_id = %s
+        RETURNING news_id, cover_link, title, subtitle, location, views;
+    """
+    try:
+        updated_news = await _execute_sql_fetch_one(
+            sql, (cover_link, title, subtitle, location, views, latitude, longitude, news_id), query='update_news')
+    except Exception as e:
+        raise Exception(f'Error updating news with news_id {news_id}: {e}')
+    if not updated_news:
+        raise ValueError(f'News with news_id {news_id} not found.')
+    return updated_news
+
+
+async def increment_news_views(deltas, chunk_size=1000):
+    """Add view deltas to many news entries with bulk UPDATE ... FROM (VALUES ...).
+
+    Args:
+        deltas (dict): Mapping of news_id to the number of views to add.
+        chunk_size (int): Maximum rows per UPDATE statement; all chunks run in
+            one transaction.
+    """
+    # Rows are locked in news_id order, so flushes of concurrent workers
+    # touching the same entries wait on each other instead of deadlocking.
+    items = sorted(deltas.items())
+    try:
+        pool = await get_pool()
+        with metrics.QueryTimer('increment_news_views', 'psycopg') as timer:
+            async with pool.connection() as conn:
+                async with conn.cursor() as cursor:
+                    for offset in range(0, len(items), chunk_size):
+                        chunk = items[offset:offset + chunk_size]
+                        values = ', '.join(['(%s, %s::integer)'] * len(chunk))
+                        sql = f"""
+                            UPDATE news AS n
+                            SET views = n.views + v.delta
+                            FROM (VALUES {values}) AS v(news_id, delta)
+                            WHERE n.news_id = v.news_id;
+                        """
+                        await cursor.execute(sql, [param for item in chunk for param in item])
+                        timer.rows += cursor.rowcount
+    except Exception as e:
+        raise Exception(f'Error incrementing news views: {e}')
+
+
+async def delete_news(news_id):
+    """Delete a news entry from the database."""
+    sql = 'DELETE FROM news WHERE news_id = %s RETURNING news_id;'
+    try:
+        deleted = await _execute_sql_fetch_one(sql, (news_id,), query='delete_news')
+    except Exception as e:
+        raise Exception(f'Error deleting news with news_id {news_id}: {e}')
+    if not deleted:
+        raise ValueError(f'News with news_id {news_id} not found.')
+    return {'message': f'News with news_id {news_id} successfully deleted.'}
+
+
+# USER FUNCTIONS
+
+
+async def add_user_to_db(username, email, password_hash, full_name):
+    """Add a user entry to the database with a generated ID."""
+    try:
+        user_id = _generate_id('user')
+        sql = """
+            INSERT INTO users (user_id, username, email, password_hash, full_name)
+            VALUES (%s, %s, %s, %s, %s)
+            RETURNING user_id;
+        """
+        result = await _execute_sql_fetch_one(sql, (user_id, username, email, password_hash, full_name),
+                                              query='add_user_to_db')
+        return result[0] if result else None
+    except Exception as e:
+        raise Exception(f'Error adding user to the database: {e}')
+
+
+async def get_user_by_id(user_id):
+    """Retrieve a user by their user_id."""
+    sql = 'SELECT * FROM users WHERE user_id = %s;'
+    try:
+        return await _execute_sql_fetch_one(sql, (user_id,), query='get_user_by_id', replica=True)
+    except Exception as e:
+        raise Exception(f'Error retrieving user with user_id {user_id}: {e}')
+
+
+async def get_all_users():
+    """Retrieve all users from the database."""
+    sql = 'SELECT * FROM users;'
+    try:
+        return await _execute_sql_fetch_all(sql, (), query='get_all_users', replica=True)
+    except Exception as e:
+        raise Exception(f'Error retrieving users: {e}')
+
+
+async def update_user(user_id, username, email, password_hash, full_name):
+    """Update user details."""
+    sql = """
+        UPDATE users
+        SET username = %s, email = %s, password_hash = %s, full_name = %s
+        WHERE user_id = %s
+        RETURNING user_id, username, email, full_name;
+    """
+    try:
+        updated_user = await _execute_sql_fetch_one(sql, (username, email, password_hash, full_name, user_id),
+                                                    query='update_user')
+    except Exception as e:
+        raise Exception(f'Error updating user with user_id {user_id}: {e}')
+    if not updated_user:
+        raise ValueError(f'User with user_id {user_id} not found.')
+    return updated_user
+
+
+async def delete_user(user_id):
+    """Delete a user from the database."""
+    sql = 'DELETE FROM users WHERE user_id = %s RETURNING user_id;'
+    try:
+        deleted = await _execute_sql_fetch_one(sql, (user_id,), query='delete_user')
+    except Exception as e:
+        raise Exception(f'Error deleting user with user_id {user_id}: {e}')
+    if not deleted:
+        raise ValueError(f'User with user_id {user_id} not found.')
+    return {'message': f'User with user_id {user_id} successfully deleted.'}
+
+
+# HAZARD FUNCTIONS
+
+
+async def add_hazard_to_db(name, polygon):
+    """Add a hazard area to the database with a generated ID."""
+    try:
+        hazard_id = _generate_id('hazard')
+        sql = """
+            INSERT INTO hazard_areas (hazard_id, name, polygon)
+            VALUES (%s, %s, %s)
+            RETURNING hazard_id;
+        """
+        result = await _execute_sql_fetch_one(sql, (hazard_id, name, Jsonb(polygon)), query='add_hazard_to_db')
+        return result[0] if result else None
+    except Exception as e:
+        raise Exception(f'Error adding hazard area to the database: {e}')
+
+
+async def get_hazard_list():
+    """Retrieve all hazard areas."""
+    sql = 'SELECT hazard_id, name, polygon, created_at, updated_at FROM hazard_areas;'
+    try:
+        return await _execute_sql_fetch_all(sql, (), query='get_hazard_list')
+    except Exception as e:
+        raise Exception(f'Error retrieving hazard areas: {e}')
+
+
+async def get_hazard_by_id(hazard_id):
+    """Retrieve a hazard area by its hazard_id."""
+    sql = 'SELECT hazard_id, name, polygon, created_at, updated_at FROM hazard_areas WHERE hazard_id = %s;'
+    try:
+        result = await _execute_sql_fetch_one(sql, (hazard_id,), query='get_hazard_by_id')
+    except Exception as e:
+        raise Exception(f'Error retrieving hazard area with hazard_id {hazard_id}: {e}')
+    if not result:
+        raise ValueError(f'Hazard area with hazard_id {hazard_id} not found.')
+    return result
+
+
+async def update_hazard(hazard_id, name, polygon):
+    """Update the name and polygon of a hazard area."""
+    sql = """
+        UPDATE hazard_areas
+        SET name = %s, polygon = %s, updated_at = CURRENT_TIMESTAMP
+        WHERE hazard_id = %s
+        RETURNING hazard_id, name, polygon, created_at, updated_at;
+    """
+    try:
+        updated = await _execute_sql_fetch_one(sql, (name, Jsonb(polygon), hazard_id), query='update_hazard')
+    except Exception as e:
+        raise Exception(f'Error updating hazard area with hazard_id {hazard_id}: {e}')
+    if not updated:
+        raise ValueError(f'Hazard area with hazard_id {hazard_id} not found.')
+    return updated
+
+
+async def delete_hazard(hazard_id):
+    """Delete a hazard area from the database."""
+    sql = 'DELETE FROM hazard_areas WHERE hazard_id = %s RETURNING hazard_id;'
+    try:
+        deleted = await _execute_sql_fetch_one(sql, (hazard_id,), query='delete_hazard')
+    except Exception as e:
+        raise Exception(f'Error deleting hazard area with hazard_id {hazard_id}: {e}')
+    if not deleted:
+        raise ValueError(f'Hazard area with hazard_id {hazard_id} not found.')
+    return {'message': f'Hazard area with hazard_id {hazard_id} successfully deleted.'}
+
+
+# NOTIFICATIONS
+
+
+async def notify(channel, payload):
+    """Send a Postgres NOTIFY with `payload` (at most 8000 bytes) on `channel`."""
+    try:
+        await _execute_sql_fetch_one('SELECT pg_notify(%s, %s);', (channel, payload), query='notify')
+    except Exception as e:
+        raise Exception(f'Error notifying channel {channel}: {e}')
+
+
+async def listen(channel):
+    """Yield None once listening, then the payload of every NOTIFY on `channel`.
+
+    Listening holds a dedicated autocommit connection outside the pool for as
+    long as the generator runs.
+    """
+    async with await AsyncConnection.connect(_conninfo(), autocommit=True) as conn:
+        await conn.execute(SQL('LISTEN {}').format(Identifier(channel)))
+        yield None
+        async for notification in conn.notifies():
+            yield notification.payload
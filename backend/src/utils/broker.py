@@ -0,0 +1,151 @@
+import asyncio
+
+# What a subscription does when an event arrives and its queue is full:
+# 'drop_oldest' discards the oldest queued event, 'drop_newest' discards the
+# new one, and 'disconnect' closes the subscription so the client reconnects
+# and resynchronizes instead of silently missing events.
+DROP_POLICIES = ('drop_oldest', 'drop_newest', 'disconnect')
+
+
+class SubscriptionClosed(Exception):
+    """Raised by `Subscription.get` once the subscription is closed."""
+
+
+_CLOSED = object()
+
+
+class Subscription:
+    """One subscriber's bounded queue of events.
+
+    Use `Broker.subscribe` to create one. Iterating it yields events until it
+    is closed.
+    """
+
+    def __init__(self, broker, topics, max_queue, policy):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f'Unknown drop policy "{policy}", expected one of {", ".join(DROP_POLICIES)}')
+        self.topics = frozenset(topics) if topics else None
+        self.policy = policy
+        self.dropped = 0
+        self.closed = False
+        self._broker = broker
+        self._queue = asyncio.Queue(max_queue)
+
+    def wants(self, event):
+        """Whether the event's topic (the part of its type before the first dot) is subscribed."""
+        return self.topics is None or event['type'].split('.', 1)[0] in self.topics
+
+    async def get(self):
+        """Wait for the next event.
+
+        Raises:
+            SubscriptionClosed: If the subscription was closed.
+        """
+        if self.closed and self._queue.empty():
+            raise SubscriptionClosed()
+        event = await self._queue.get()
+        if event is _CLOSED:
+            raise SubscriptionClosed()
+        return event
+
+    def close(self):
+        """Stop receiving events and wake up a pending `get`."""
+        if self.closed:
+            return
+        self.closed = True
+        self._broker._remove(self)
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(_CLOSED)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.get()
+        except SubscriptionClosed:
+            raise StopAsyncIteration
+
+    def _offer(self, event):
+        """Queue `event` without blocking, applying the drop policy when full.
+
+        Returns:
+            bool: Whether the event was queued.
+        """
+        if not self._queue.full():
+            self._queue.put_nowait(event)
+            return True
+        self.dropped += 1
+        self._broker._counters['dropped'] += 1
+        if self.policy == 'drop_oldest':
+            self._queue.get_nowait()
+            self._queue.put_nowait(event)
+            return True
+        if self.policy == 'disconnect':
+            self._broker._counters['disconnected'] += 1
+            self.close()
+        return False
+
+
+class Broker:
+    """An in-process publish/subscribe hub for event dicts.
+
+    `publish` never waits on subscribers: every subscription has its own
+    bounded queue, and a slow subscriber only affects itself according to its
+    drop policy. Must be used from a single event loop.
+
+    Args:
+        max_queue (int): Default queue size of a subscription.
+        policy (str): Default drop policy; see `DROP_POLICIES`.
+    """
+
+    def __init__(self, max_queue=100, policy='drop_oldest'):
+        self.max_queue = max_queue
+        self.policy = policy
+        self._subscriptions = set()
+        self._counters = {'published': 0, 'delivered': 0, 'dropped': 0, 'disconnected': 0}
+
+    def subscribe(self, topics=None, max_queue=None, policy=None):
+        """Register a subscriber.
+
+        Args:
+            topics: Optional iterable of topics such as 'news' or 'hazards';
+                all events are received when omitted.
+            max_queue (int): Queue size, defaulting to the broker's.
+            policy (str): Drop policy, defaulting to the broker's.
+
+        Returns:
+            Subscription: Close it when the subscriber goes away.
+        """
+        subscription = Subscription(self, topics, max_queue or self.max_queue, policy or self.policy)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def publish(self, event):
+        """Offer `event` (a dict with a 'type' key) to every interested subscriber.
+
+        Returns:
+            int: The number of subscriptions the event was queued for.
+        """
+        self._counters['published'] += 1
+        delivered = 0
+        for subscription in list(self._subscriptions):
+            if not subscription.wants(event):
+                continue
+            if subscription._offer(event):
+                delivered += 1
+        self._counters['delivered'] += delivered
+        return delivered
+
+    def close(self):
+        """Close every subscription, e.g. on shutdown."""
+        for subscription in list(self._subscriptions):
+            subscription.close()
+
+    def stats(self):
+        """Return subscriber count and publish/delivery/drop counters."""
+        return {'subscribers': len(self._subscriptions), **self._counters}
+
+    def _remove(self, subscription):
+        self._subscriptions.discard(subscription)
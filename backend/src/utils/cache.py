@@ -0,0 +1,360 @@
+import asyncio
+import pickle
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """A thread-safe in-memory cache with LRU eviction and per-entry TTL.
+
+    The cache is bounded both by entry count and, optionally, by an estimate
+    of the memory held by its values; whichever limit is hit first evicts the
+    least recently used entries.
+
+    Args:
+        max_entries (int): Maximum number of entries.
+        ttl (float): Default time-to-live of an entry in seconds.
+        max_bytes (int): Optional bound on the summed `sizeof` of all values.
+        sizeof: Callable estimating the size of a value in bytes. Defaults to
+            `sys.getsizeof`, which is shallow; pass a deeper estimate for
+            container values.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300.0, max_bytes=None, sizeof=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or sys.getsizeof
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def get(self, key, default=None):
+        """Return the cached value for `key`, or `default` if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return default
+            value, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove_locked(key)
+                self._counters['expirations'] += 1
+                self._counters['misses'] += 1
+                return default
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store `value` under `key`, evicting older entries if over budget."""
+        size = self._sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove_locked(key)
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (self.max_bytes is not None and
+                                                            self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove_locked(oldest)
+                self._counters['evictions'] += 1
+
+    def delete(self, key):
+        """Remove `key` from the cache if present."""
+        with self._lock:
+            if key in self._entries:
+                self._remove_locked(key)
+
+    def clear(self):
+        """Remove every entry; counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return occupancy and hit/miss/eviction counters.
+
+        Returns:
+            dict: Counters plus `entries`, `bytes` and `hit_ratio`.
+        """
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hit_ratio': self._counters['hits'] / lookups if lookups else 0.0,
+                **self._counters,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove_locked(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+
+class RedisBackend:
+    """Shared cache storage in Redis, so several workers see the same entries.
+
+    Values are pickled, so the Redis instance must only be reachable by
+    trusted processes. Requires the optional `redis` package.
+
+    Args:
+        url (str): Redis connection URL, e.g. "redis://localhost:6379/0".
+        prefix (str): Namespace prepended to every key.
+    """
+
+    def __init__(self, url, prefix='cache:'):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise ImportError('A shared cache backend requires the "redis" package')
+        self._client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key):
+        data = await self._client.get(self.prefix + str(key))
+        return None if data is None else pickle.loads(data)
+
+    async def set(self, key, value, ttl):
+        await self._client.set(self.prefix + str(key), pickle.dumps(value), px=max(1, int(ttl * 1000)))
+
+    async def delete(self, key):
+        await self._client.delete(self.prefix + str(key))
+
+
+class AsyncReadThroughCache:
+    """A read-through cache for coroutine loaders with stampede protection.
+
+    Lookups go to a local LRUCache first, then to the optional shared
+    backend, and only then to the loader. Concurrent misses for the same key
+    share a single in-flight load, so a hot key expiring costs one query per
+    process rather than one per request. TTLs are jittered so keys cached
+    together do not all expire together.
+
+    Invalidating a key while it is being loaded bumps its generation; that
+    load still answers its callers but its result is not stored.
+
+    Args:
+        local (LRUCache): The in-process cache.
+        shared: Optional backend with async `get`, `set` and `delete`, such
+            as RedisBackend. When set, local entries live at most `local_ttl`
+            seconds so workers converge quickly after another worker writes.
+        local_ttl (float): Local TTL cap used with a shared backend.
+        jitter (float): Fraction of the TTL randomly added or removed.
+    """
+
+    def __init__(self, local, shared=None, local_ttl=1.0, jitter=0.1):
+        self.local = local
+        self.shared = shared
+        self.local_ttl = local_ttl
+        self.jitter = jitter
+        self._inflight = {}
+        self._generations = {}
+        self._counters = {'loads': 0, 'coalesced': 0, 'shared_hits': 0, 'shared_misses': 0}
+
+    async def get_or_load(self, key, loader):
+        """Return the cached value for `key`, calling `loader()` on a miss."""
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        # The load runs as its own task so that a caller being cancelled
+        # (e.g. a client disconnecting) does not cancel it for the others.
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader, self._generations.get(key, 0)))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._load_done(key, done))
+        else:
+            self._counters['coalesced'] += 1
+        return await asyncio.shield(task)
+
+    async def invalidate(self, key):
+        """Drop `key` locally and from the shared backend."""
+        self.invalidate_local(key)
+        if self.shared is not None:
+            await self.shared.delete(key)
+
+    def invalidate_local(self, key):
+        """Drop `key` from this process only."""
+        if key in self._inflight:
+            self._generations[key] = self._generations.get(key, 0) + 1
+        self.local.delete(key)
+
+    def clear_local(self):
+        """Drop every key from this process only."""
+        for key in self._inflight:
+            self._generations[key] = self._generations.get(key, 0) + 1
+        self.local.clear()
+
+    def stats(self):
+        """Return local cache counters plus load, coalescing and shared-backend counters."""
+        return {**self.local.stats(), **self._counters}
+
+    async def _load(self, key, loader, generation):
+        if self.shared is not None:
+            value = await self.shared.get(key)
+            if value is not None:
+                self._counters['shared_hits'] += 1
+                self._store_local(key, value, generation)
+                return value
+            self._counters['shared_misses'] += 1
+
+        self._counters['loads'] += 1
+        value = await loader()
+        if self._generations.get(key, 0) == generation:
+            if self.shared is not None:
+                await self.shared.set(key, value, self._jittered(self.local.ttl))
+            self._store_local(key, value, generation)
+        return value
+
+    def _load_done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            self._generations.pop(key, None)
+        if not task.cancelled():
+            # Retrieve the exception so it is not reported as unhandled when
+            # every caller went away before the load finished.
+            task.exception()
+
+    def _store_local(self, key, value, generation):
+        if self._generations.get(key, 0) != generation:
+            return
+        ttl = self._jittered(self.local.ttl)
+        if self.shared is not None:
+            ttl = min(ttl, self.local_ttl)
+        self.local.set(key, value, ttl=ttl)
+
+    def _jittered(self, ttl):
+        return ttl * (1 + random.uniform(-self.jitter, self.jitter))
+
+
+class _Call:
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls from threads into one execution.
+
+    While a call for a key is running, other threads calling `do` with the
+    same key wait for it and receive its result, or its exception, instead
+    of running their own. Nothing is kept afterwards: the next call for the
+    key runs again, so pair it with a cache to also reuse results.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._counters = {'calls': 0, 'executions': 0, 'coalesced': 0}
+
+    def do(self, key, fn, *args):
+        """Return `fn(*args)`, sharing the execution with concurrent callers of the same `key`."""
+        with self._lock:
+            self._counters['calls'] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                self._counters['executions'] += 1
+                call = self._calls[key] = _Call()
+            else:
+                self._counters['coalesced'] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn(*args)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+        return call.value
+
+    def forget(self, key=None):
+        """Let later callers of `key` (of every key when None) start a new execution.
+
+        Executions already running still answer the callers waiting on them.
+        """
+        with self._lock:
+            if key is None:
+                self._calls.clear()
+            else:
+                self._calls.pop(key, None)
+
+    def stats(self):
+        """Return call, execution and coalescing counters, plus executions in flight."""
+        with self._lock:
+            return {'inflight': len(self._calls), **self._counters}
+
+
+class AsyncSingleFlight:
+    """Coalesces concurrent identical coroutine calls into one execution.
+
+    The asyncio counterpart of SingleFlight, for use from a single event
+    loop. The shared call runs as its own task so that one caller being
+    cancelled (e.g. a client disconnecting) does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self._counters = {'calls': 0, 'executions': 0, 'coalesced': 0}
+
+    async def do(self, key, loader):
+        """Return `await loader()`, sharing the execution with concurrent callers of the same `key`."""
+        self._counters['calls'] += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self._counters['executions'] += 1
+            task = asyncio.ensure_future(loader())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._done(key, done))
+        else:
+            self._counters['coalesced'] += 1
+        return await asyncio.shield(task)
+
+    def forget(self, key=None):
+        """Let later callers of `key` (of every key when None) start a new execution.
+
+        Executions already running still answer the callers waiting on them.
+        """
+        if key is None:
+            self._inflight.clear()
+        else:
+            self._inflight.pop(key, None)
+
+    def stats(self):
+        """Return call, execution and coalescing counters, plus executions in flight."""
+        return {'inflight': len(self._inflight), **self._counters}
+
+    def _done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Retrieve the exception so it is not reported as unhandled when
+            # every caller went away before the call finished.
+            task.exception()
+
+
+_MISSING = object()
@@ -0,0 +1,82 @@
+import threading
+import time
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised by `CircuitBreaker.before_call` while the circuit is open."""
+
+
+class CircuitBreaker:
+    """Stops calling a failing dependency for a while, so callers fail fast.
+
+    Closed: calls go through; `failure_threshold` consecutive failures open
+    the circuit. Open: calls are rejected until `reset_timeout` seconds have
+    passed. Half-open: one probe call goes through; its success closes the
+    circuit and its failure opens it again. Thread-safe.
+
+    Args:
+        failure_threshold (int): Consecutive failures that open the circuit.
+        reset_timeout (float): Seconds the circuit stays open before a probe.
+        clock: Monotonic time source, replaceable in tests.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._counters = {'opened': 0, 'rejected': 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state_locked()
+
+    def before_call(self):
+        """Check that a call may be made now.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a probe
+                already in flight.
+        """
+        with self._lock:
+            state = self._current_state_locked()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self._counters['rejected'] += 1
+            retry_in = max(0.0, self._opened_at + self.reset_timeout - self._clock())
+            raise CircuitOpenError(f'Circuit open, retrying upstream in {retry_in:.1f} s')
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self._probing = False
+                self._counters['opened'] += 1
+
+    def stats(self):
+        """Return the state, consecutive failures and open/reject counters."""
+        with self._lock:
+            return {'state': self._current_state_locked(), 'failures': self._failures, **self._counters}
+
+    def _current_state_locked(self):
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return self._state
@@ -0,0 +1,339 @@
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+from src.utils import db_routing, metrics
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out before the timeout."""
+
+
+class ConnectionPool:
+    """A thread-safe pool of database connections.
+
+    Connections are handed out LIFO so that a small set of hot connections
+    serves steady traffic while the rest age out through idle recycling.
+    Connections that sat idle longer than `health_check_interval` are pinged
+    before being returned to the caller, and broken ones are replaced.
+
+    Args:
+        connect: Zero-argument callable returning a new DB-API connection.
+        min_size (int): Connections kept open even when idle.
+        max_size (int): Hard upper bound of open connections.
+        timeout (float): Seconds to wait for a free connection.
+        max_idle (float): Idle seconds after which a surplus connection is closed.
+        max_lifetime (float): Seconds after which a connection is recycled.
+        health_check_interval (float): Idle seconds after which a connection is
+            pinged on checkout.
+    """
+
+    def __init__(self,
+                 connect,
+                 min_size=1,
+                 max_size=10,
+                 timeout=30.0,
+                 max_idle=300.0,
+                 max_lifetime=3600.0,
+                 health_check_interval=30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError('Invalid pool size: min_size must be in [0, max_size] and max_size >= 1')
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conn, returned_at)
+        self._created_at = {}  # id(conn) -> creation time
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._counters = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'timeouts': 0,
+            'created': 0,
+            'recycled': 0,
+            'health_check_failures': 0,
+        }
+
+    def open(self):
+        """Open connections until `min_size` are available."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._new_connection()
+            except Exception:
+                self._release_slot()
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def getconn(self):
+        """Check out a healthy connection, blocking up to `timeout` seconds."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeout('Connection pool is closed')
+                self._recycle_idle_locked()
+
+                conn = returned_at = None
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        raise PoolTimeout(f'No connection available after {self.timeout}s '
+                                          f'(pool size {self.max_size})')
+                    waited = True
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+                    continue
+
+            if conn is None:
+                try:
+                    conn = self._new_connection()
+                except Exception:
+                    self._release_slot()
+                    raise
+            elif not self._is_usable(conn, returned_at):
+                self._discard(conn)
+                continue
+
+            with self._cond:
+                self._counters['checkouts'] += 1
+                if waited:
+                    self._counters['waits'] += 1
+                    self._counters['wait_seconds'] += time.monotonic() - start
+            return conn
+
+    def putconn(self, conn, discard=False):
+        """Return a connection to the pool, closing it if it is no longer usable."""
+        if not discard and not conn.closed:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        expired = time.monotonic() - self._created_at.get(id(conn), 0) > self.max_lifetime
+        if discard or conn.closed or expired or self._closed:
+            if expired and not discard:
+                with self._cond:
+                    self._counters['recycled'] += 1
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of a `with` block.
+
+        Mirrors psycopg2's `with conn:` semantics: the transaction is committed
+        when the block exits normally and rolled back when it raises.
+        """
+        conn = self.getconn()
+        discard = False
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    def close(self):
+        """Close all idle connections; in-use ones are closed when returned."""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self):
+        """Return a snapshot of pool occupancy and saturation counters.
+
+        Returns:
+            dict: Pool sizes (`size`, `idle`, `in_use`, `waiting`) and
+            cumulative counters since the pool was created.
+        """
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': idle,
+                'in_use': self._size - idle,
+                'waiting': self._waiting,
+                **self._counters,
+            }
+
+    def _new_connection(self):
+        conn = self._connect()
+        with self._cond:
+            self._created_at[id(conn)] = time.monotonic()
+            self._counters['created'] += 1
+        return conn
+
+    def _is_usable(self, conn, returned_at):
+        if conn.closed:
+            return False
+        now = time.monotonic()
+        if now - self._created_at.get(id(conn), now) > self.max_lifetime:
+            with self._cond:
+                self._counters['recycled'] += 1
+            return False
+        if now - returned_at < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except Exception:
+            with self._cond:
+                self._counters['health_check_failures'] += 1
+            return False
+
+    def _recycle_idle_locked(self):
+        # The deque is ordered oldest-returned first, so surplus idle
+        # connections are always found at the left end.
+        now = time.monotonic()
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.max_idle:
+            conn, _ = self._idle.popleft()
+            self._size -= 1
+            self._created_at.pop(id(conn), None)
+            self._counters['recycled'] += 1
+            _close_quietly(conn)
+
+    def _discard(self, conn):
+        _close_quietly(conn)
+        with self._cond:
+            self._created_at.pop(id(conn), None)
+            self._size -= 1
+            self._cond.notify()
+
+    def _release_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def _connect_from_env():
+    return psycopg2.connect(
+        dbname=os.getenv('POSTGRES_DB'),
+        user=os.getenv('POSTGRES_USER'),
+        password=os.getenv('POSTGRES_PASSWORD'),
+        host=os.getenv('POSTGRES_HOST'),
+        port=os.getenv('POSTGRES_PORT'),
+    )
+
+
+_pool = None
+_replicas = None
+_pool_lock = threading.Lock()
+
+metrics.register_saturation('db_pool', lambda: _pool.stats() if _pool is not None else {})
+metrics.register_saturation('db_replicas', lambda: _replicas.stats() if _replicas is not None else {})
+
+
+def get_pool():
+    """Return the process-wide pool, creating it from the environment on first use.
+
+    Pool sizing is read from `POSTGRES_POOL_MIN_SIZE`, `POSTGRES_POOL_MAX_SIZE`,
+    `POSTGRES_POOL_TIMEOUT`, `POSTGRES_POOL_MAX_IDLE`, `POSTGRES_POOL_MAX_LIFETIME`
+    and `POSTGRES_POOL_HEALTH_CHECK_INTERVAL`.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    _connect_from_env,
+                    min_size=int(os.getenv('POSTGRES_POOL_MIN_SIZE', '1')),
+                    max_size=int(os.getenv('POSTGRES_POOL_MAX_SIZE', '10')),
+                    timeout=float(os.getenv('POSTGRES_POOL_TIMEOUT', '30')),
+                    max_idle=float(os.getenv('POSTGRES_POOL_MAX_IDLE', '300')),
+                    max_lifetime=float(os.getenv('POSTGRES_POOL_MAX_LIFETIME', '3600')),
+                    health_check_interval=float(os.getenv('POSTGRES_POOL_HEALTH_CHECK_INTERVAL', '30')),
+                )
+    return _pool
+
+
+def get_replicas():
+    """Return the ReplicaSet of read replica pools, creating it on first use.
+
+    One pool per DSN in `POSTGRES_REPLICA_DSNS`, sized like the primary pool
+    but waiting at most `POSTGRES_REPLICA_POOL_TIMEOUT` seconds, so an
+    unreachable replica is ejected quickly. Empty when no replica is set.
+    """
+    global _replicas
+    if _replicas is None:
+        with _pool_lock:
+            if _replicas is None:
+                _replicas = db_routing.ReplicaSet([
+                    ConnectionPool(
+                        functools.partial(psycopg2.connect, dsn),
+                        min_size=0,
+                        max_size=int(os.getenv('POSTGRES_POOL_MAX_SIZE', '10')),
+                        timeout=float(os.getenv('POSTGRES_REPLICA_POOL_TIMEOUT', '2')),
+                        max_idle=float(os.getenv('POSTGRES_POOL_MAX_IDLE', '300')),
+                        max_lifetime=float(os.getenv('POSTGRES_POOL_MAX_LIFETIME', '3600')),
+                        health_check_interval=float(os.getenv('POSTGRES_POOL_HEALTH_CHECK_INTERVAL', '30')),
+                    ) for dsn in db_routing.replica_dsns()
+                ])
+    return _replicas
+
+
+def close_pool():
+    """Close the process-wide pool and the replica pools, if they were created."""
+    global _pool, _replicas
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+        if _replicas is not None:
+            for pool in _replicas.pools:
+                pool.close()
+            _replicas = None
@@ -0,0 +1,165 @@
+import os
+import threading
+import time
+from contextvars import ContextVar
+from http.cookies import SimpleCookie
+
+# Read replicas: POSTGRES_REPLICA_DSNS is a comma-separated list of libpq
+# connection strings or URLs. Read-only helpers of db_utils and async_db_utils
+# run on them in round robin; everything else stays on the primary
+# (POSTGRES_*). To try it locally, start a primary and a streaming replica
+# (`pg_basebackup -R`) on two ports and point POSTGRES_PORT and
+# POSTGRES_REPLICA_DSNS at them.
+#
+# Replicas lag the primary, so reads that must see a write go to the primary:
+# once a request ran a statement on the primary its later reads stay there,
+# and ReadYourWritesMiddleware keeps a client on the primary for a few
+# seconds after each of its writes.
+
+# Seconds a client keeps reading from the primary after one of its writes;
+# should exceed the usual replication lag.
+READ_PRIMARY_AFTER_WRITE = float(os.getenv('READ_PRIMARY_AFTER_WRITE', '5'))
+
+# Seconds an unhealthy replica is left out of the rotation.
+REPLICA_EJECT_SECONDS = float(os.getenv('POSTGRES_REPLICA_EJECT_SECONDS', '30'))
+
+READ_PRIMARY_COOKIE = 'read_primary'
+READ_PRIMARY_HEADER = b'x-read-primary'
+
+_UNSAFE_METHODS = frozenset(('POST', 'PUT', 'PATCH', 'DELETE'))
+
+_read_primary = ContextVar('read_primary', default=False)
+# Per-request memo of the replica picked for it, so all of a request's reads
+# see the same snapshot of replication.
+_request_replicas = ContextVar('request_replicas', default=None)
+
+
+def replica_dsns():
+    """Return the replica connection strings configured in POSTGRES_REPLICA_DSNS."""
+    return [dsn.strip() for dsn in os.getenv('POSTGRES_REPLICA_DSNS', '').split(',') if dsn.strip()]
+
+
+def use_primary():
+    """Send the remaining reads of the current request or task to the primary."""
+    _read_primary.set(True)
+
+
+def reads_use_primary():
+    """Whether reads of the current request or task must go to the primary."""
+    return _read_primary.get()
+
+
+class ReplicaSet:
+    """Round-robin load balancing over replica pools with temporary ejection.
+
+    Works with any pool type; the caller runs the query and reports failures
+    with `eject`. Thread-safe.
+
+    Args:
+        pools (list): One connection pool per replica.
+        eject_seconds (float): How long an ejected replica is skipped.
+        clock: Monotonic time source, replaceable in tests.
+    """
+
+    def __init__(self, pools, eject_seconds=REPLICA_EJECT_SECONDS, clock=time.monotonic):
+        self.pools = list(pools)
+        self.eject_seconds = eject_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._ejected_until = [0.0] * len(self.pools)
+        self._next = 0
+        self._counters = {'replica_reads': 0, 'primary_reads': 0, 'ejections': 0}
+
+    def choose(self):
+        """Pick the replica for a read.
+
+        Returns:
+            tuple: `(index, pool)` of a healthy replica, or None when the read
+            must go to the primary: the current request wrote or asked for the
+            primary, or every replica is ejected.
+        """
+        if not self.pools or reads_use_primary():
+            with self._lock:
+                self._counters['primary_reads'] += 1
+            return None
+
+        memo = _request_replicas.get()
+        with self._lock:
+            now = self._clock()
+            index = memo.get(id(self)) if memo is not None else None
+            if index is None or self._ejected_until[index] > now:
+                index = self._next_healthy_locked(now)
+            if index is None:
+                self._counters['primary_reads'] += 1
+                return None
+            self._counters['replica_reads'] += 1
+        if memo is not None:
+            memo[id(self)] = index
+        return index, self.pools[index]
+
+    def eject(self, index):
+        """Leave replica `index` out of the rotation for `eject_seconds`."""
+        with self._lock:
+            self._ejected_until[index] = self._clock() + self.eject_seconds
+            self._counters['ejections'] += 1
+
+    def stats(self):
+        """Return replica count, how many are ejected and read/ejection counters."""
+        with self._lock:
+            now = self._clock()
+            return {
+                'replicas': len(self.pools),
+                'ejected': sum(1 for until in self._ejected_until if until > now),
+                **self._counters,
+            }
+
+    def _next_healthy_locked(self, now):
+        for offset in range(len(self.pools)):
+            index = (self._next + offset) % len(self.pools)
+            if self._ejected_until[index] <= now:
+                self._next = index + 1
+                return index
+        return None
+
+
+def _wants_primary(headers):
+    for name, value in headers:
+        if name == READ_PRIMARY_HEADER:
+            return True
+        if name == b'cookie' and READ_PRIMARY_COOKIE in SimpleCookie(value.decode('latin-1')):
+            return True
+    return False
+
+
+class ReadYourWritesMiddleware:
+    """Pure ASGI middleware keeping a client on the primary right after it writes.
+
+    Requests with the `read_primary` cookie or an `X-Read-Primary` header read
+    from the primary. Successful writes set that cookie for
+    `READ_PRIMARY_AFTER_WRITE` seconds.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] not in ('http', 'websocket'):
+            await self.app(scope, receive, send)
+            return
+
+        primary_token = _read_primary.set(_wants_primary(scope.get('headers', ())))
+        replicas_token = _request_replicas.set({})
+        is_write = scope['type'] == 'http' and scope['method'] in _UNSAFE_METHODS
+
+        async def send_with_cookie(message):
+            if is_write and message['type'] == 'http.response.start' and message['status'] < 400:
+                cookie = (f'{READ_PRIMARY_COOKIE}=1; Max-Age={int(READ_PRIMARY_AFTER_WRITE)}; Path=/; HttpOnly; '
+                          'SameSite=Lax')
+                message = {**message, 'headers': [*message.get('headers', ()), (b'set-cookie', cookie.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            _request_replicas.reset(replicas_token)
+            _read_primary.reset(primary_token)
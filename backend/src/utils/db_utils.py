@@ -1,33 +1,65 @@
-import os
-import uuid
 from datetime import datetime, timezone
 
 import psycopg2
+from psycopg2.extras import execute_values
+from src.utils import db_pool, db_routing, metrics
+from src.utils.ids import time_ordered_key
 
 
 def _get_connection():
-    """Establish a connection to the database."""
-    return psycopg2.connect(
-        dbname=os.getenv('POSTGRES_DB'),
-        user=os.getenv('POSTGRES_USER'),
-        password=os.getenv('POSTGRES_PASSWORD'),
-        host=os.getenv('POSTGRES_HOST'),
-        port=os.getenv('POSTGRES_PORT'),
-    )
+    """Check out a pooled connection to the database.
 
+    Use as `with _get_connection() as conn:`; the transaction is committed on
+    success and the connection is returned to the pool afterwards. The
+    caller's later reads then stay on the primary, so they see its writes.
+    """
+    db_routing.use_primary()
+    return db_pool.get_pool().connection()
+
+
+# Returned by _run_on_replica when the statement has to run on the primary.
+_ON_PRIMARY = object()
 
-# This will return "user_{UUID}" or "news_{UUID}" depending on type.
+
+def _run_on_replica(sql, params, fetch):
+    """Run a read-only statement on a replica and return `fetch(cursor)`.
+
+    Returns `_ON_PRIMARY` instead when no replica is configured or healthy,
+    when the caller needs read-your-writes, or when the chosen replica turns
+    out to be unreachable, which also ejects it for a while.
+    """
+    replicas = db_pool.get_replicas()
+    choice = replicas.choose()
+    if choice is None:
+        return _ON_PRIMARY
+    index, pool = choice
+    try:
+        with pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                return fetch(cursor)
+    except (psycopg2.OperationalError, db_pool.PoolTimeout):
+        replicas.eject(index)
+        return _ON_PRIMARY
+
+
+# This will return "user_{key}", "news_{key}" or "hazard_{key}" depending on type,
+# where key is a UUIDv7 in 26 base32 characters. Keys grow with time, so new
+# rows land at the right edge of the primary key index (see
+# database/migrations/006_time_ordered_ids.sql) instead of on random pages.
+# IDs created before the switch keep their `uuid1().hex` form.
 def _generate_id(type):
-    """Generate a unique ID with a prefix."""
+    """Generate a unique, time-ordered ID with a prefix."""
     prefixes = {
         'user': 'user_',
         'news': 'news_',
+        'hazard': 'hazard_',
     }
 
     if type not in prefixes:
         raise ValueError('ID type is not supported')
 
-    return prefixes[type] + uuid.uuid1().hex
+    return prefixes[type] + time_ordered_key()
 
 
 def _current_utc_time():
@@ -35,7 +67,7 @@ def _current_utc_time():
     return datetime.now(timezone.utc)
 
 
-def _execute_multiple_sqls(sql_params_list: list):
+def _execute_multiple_sqls(sql_params_list: list, *, query: str):
     """Execute multiple SQL statements in a single transaction.
 
     Args:
@@ -43,98 +75,330 @@ def _execute_multiple_sqls(sql_params_list: list):
         Example: [(sql, params), (sql, params), ...]
     """
     results = []
-    with _get_connection() as conn:
+    with metrics.QueryTimer(query, 'psycopg2') as timer, _get_connection() as conn:
         with conn.cursor() as cursor:
             for sql, params in sql_params_list:
                 cursor.execute(sql, params)
                 results.append(cursor.fetchall())
+                timer.rows += len(results[-1])
         conn.commit()
     return results
 
 
-def _execute_sql_fetch_one(sql: str, params: tuple, *, cursor=None):
-    """Execute an SQL query and fetch one result."""
-    if cursor:
-        cursor.execute(sql, params)
-        return cursor.fetchone()
-
-    with _get_connection() as conn:
-        with conn.cursor() as cursor:
+def _execute_sql_fetch_one(sql: str, params: tuple, *, query: str, cursor=None, replica=False):
+    """Execute an SQL query and fetch one result; read-only queries may pass `replica=True`."""
+    with metrics.QueryTimer(query, 'psycopg2') as timer:
+        if cursor:
+            cursor.execute(sql, params)
+            result = cursor.fetchone()
+        else:
+            result = _run_on_replica(sql, params, lambda cursor: cursor.fetchone()) if replica else _ON_PRIMARY
+            if result is _ON_PRIMARY:
+                with _get_connection() as conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute(sql, params)
+                        result = cursor.fetchone()
+        timer.rows = 1 if result is not None else 0
+    return result
+
+
+def _execute_sql_fetch_all(sql: str, params: tuple, *, query: str, cursor=None, replica=False):
+    """Execute an SQL query and fetch all results; read-only queries may pass `replica=True`."""
+    with metrics.QueryTimer(query, 'psycopg2') as timer:
+        if cursor:
             cursor.execute(sql, params)
-            return cursor.fetchone()
+            results = cursor.fetchall()
+        else:
+            results = _run_on_replica(sql, params, lambda cursor: cursor.fetchall()) if replica else _ON_PRIMARY
+            if results is _ON_PRIMARY:
+                with _get_connection() as conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute(sql, params)
+                        results = cursor.fetchall()
+        timer.rows = len(results)
+    return results
 
 
-def _execute_sql_fetch_all(sql: str, params: tuple, *, cursor=None):
-    """Execute an SQL query and fetch all results."""
-    if cursor:
-        cursor.execute(sql, params)
-        return cursor.fetchall()
+def _batch_execute_sql_fetch_all(sql: str, params: list, *, query: str, cursor=None, returning=True, page_size=1000):
+    """Execute a multi-row statement for many parameter tuples and fetch the results.
 
-    with _get_connection() as conn:
-        with conn.cursor() as cursor:
-            cursor.execute(sql, params)
-            return cursor.fetchall()
-
-
-def _batch_execute_sql_fetch_all(sql: str, params: list, *, cursor=None, returning=True):
-    """Execute multiple SQL queries in a batch and fetch all results."""
-    if cursor:
-        cursor.executemany(sql, params, returning=returning)
-        rows = []
-        row_count = cursor.rowcount
-        if row_count > 0 and returning:
-            while True:
-                rows.append(cursor.fetchone())
-                if not cursor.nextset():
-                    break
-        return rows
-
-    with _get_connection() as conn:
-        with conn.cursor() as cursor:
-            cursor.executemany(sql, params, returning=returning)
-            rows = []
-            row_count = cursor.rowcount
-            if row_count > 0 and returning:
-                while True:
-                    rows.append(cursor.fetchone())
-                    if not cursor.nextset():
-                        break
-            return rows
+    `sql` must contain a single `VALUES %s` placeholder, which is expanded into
+    multi-row VALUES lists of up to `page_size` rows per round trip.
+
+    Example: INSERT INTO t (a, b) VALUES %s RETURNING a
+    """
+    with metrics.QueryTimer(query, 'psycopg2') as timer:
+        if cursor:
+            results = execute_values(cursor, sql, params, page_size=page_size, fetch=returning) or []
+        else:
+            with _get_connection() as conn:
+                with conn.cursor() as cursor:
+                    results = execute_values(cursor, sql, params, page_size=page_size, fetch=returning) or []
+        timer.rows = len(results)
+    return results
 
 
 # NEWS FUNCTIONS
 
 
-def add_news_to_db(author_id, cover_link, title, subtitle, location, views=0):
+def add_news_to_db(author_id, cover_link, title, subtitle, location, views=0, latitude=None, longitude=None):
     """Add a news entry to the database with a generated ID."""
     try:
         news_id = _generate_id('news')
         sql = """
-            INSERT INTO news (news_id, author_id, cover_link, title, subtitle, location, views)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            INSERT INTO news (news_id, author_id, cover_link, title, subtitle, location, views, latitude, longitude)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
             RETURNING news_id;
         """
-        result = _execute_sql_fetch_one(sql, (news_id, author_id, cover_link, title, subtitle, location, views))
+        result = _execute_sql_fetch_one(
+            sql, (news_id, author_id, cover_link, title, subtitle, location, views, latitude, longitude),
+            query='add_news_to_db')
         return result[0] if result else None
     except Exception as e:
         raise Exception(f'Error adding news to the database: {e}')
 
 
+def _pad_news_item(item):
+    """Extend a bulk news tuple without coordinates with NULL latitude and longitude."""
+    return tuple(item) + (None,) * (8 - len(item))
+
+
+def add_news_bulk_to_db(news_items):
+    """Add many news entries in one transaction with multi-row INSERTs.
+
+    Args:
+        news_items: Sequence of (author_id, cover_link, title, subtitle, location, views[, latitude, longitude])
+            tuples.
+
+    Returns:
+        list: The generated news IDs, in input order.
+    """
+    try:
+        news_ids = [_generate_id('news') for _ in news_items]
+        sql = """
+            INSERT INTO news (news_id, author_id, cover_link, title, subtitle, location, views, latitude, longitude)
+            VALUES %s;
+        """
+        rows = [(news_id, *_pad_news_item(item)) for news_id, item in zip(news_ids, news_items)]
+        _batch_execute_sql_fetch_all(sql, rows, query='add_news_bulk_to_db', returning=False)
+        return news_ids
+    except Exception as e:
+        raise Exception(f'Error adding news to the database: {e}')
+
+
+# Public columns of the news table, in table order. Unprojected rows keep this
+# order so positional clients keep working; bookkeeping columns such as
+# `version` are never returned.
+NEWS_COLUMNS = ('news_id', 'author_id', 'cover_link', 'title', 'subtitle', 'published_at', 'location', 'views',
+                'latitude', 'longitude')
+
+
 def get_news_list():
     """Retrieve a list of all news entries using helper functions."""
-    sql = 'SELECT * FROM news;'
+    sql = f'SELECT {", ".join(NEWS_COLUMNS)} FROM news;'
     try:
-        news_list = _execute_sql_fetch_all(sql, ())
+        news_list = _execute_sql_fetch_all(sql, (), query='get_news_list', replica=True)
         return news_list
     except Exception as e:
         raise Exception(f'Error retrieving news list: {e}')
 
 
+# Columns of the keyset used to paginate the news feed, newest first.
+NEWS_PAGE_KEY = ('published_at', 'news_id')
+
+
+def _news_page_query(limit, after=None, fields=None):
+    """Build a keyset-paginated query over the news table.
+
+    Args:
+        limit (int): Maximum number of rows in the page. One extra row is
+            requested so the caller can tell whether another page exists.
+        after (tuple): Optional `(published_at, news_id)` of the last row of the
+            previous page.
+        fields (list): Optional subset of `NEWS_COLUMNS` to project.
+
+    Returns:
+        tuple: `(sql, params, columns)` where `columns` names the selected
+        columns, which always include the keyset columns.
+    """
+    columns = list(NEWS_COLUMNS) if not fields else list(dict.fromkeys(fields))
+    unknown = [column for column in columns if column not in NEWS_COLUMNS]
+    if unknown:
+        raise ValueError(f'Unknown news fields: {", ".join(unknown)}')
+    columns += [column for column in NEWS_PAGE_KEY if column not in columns]
+
+    params = []
+    where = ''
+    if after is not None:
+        where = 'WHERE (published_at, news_id) < (%s, %s)'
+        params.extend(after)
+    params.append(limit + 1)
+
+    sql = f"""
+        SELECT {', '.join(columns)}
+        FROM news
+        {where}
+        ORDER BY published_at DESC, news_id DESC
+        LIMIT %s;
+    """
+    return sql, tuple(params), tuple(columns)
+
+
+def get_news_page(limit, after=None, fields=None):
+    """Retrieve one keyset-paginated page of news entries.
+
+    Returns:
+        tuple: `(columns, rows)`; see `_news_page_query`.
+    """
+    sql, params, columns = _news_page_query(limit, after, fields)
+    try:
+        return columns, _execute_sql_fetch_all(sql, params, query='get_news_page', replica=True)
+    except Exception as e:
+        raise Exception(f'Error retrieving news page: {e}')
+
+
+# Text search configuration of `news.search_vector`; queries must use the same.
+NEWS_SEARCH_CONFIG = 'english'
+
+# ts_headline options for search snippets; matched terms are wrapped in <mark>.
+NEWS_SNIPPET_OPTIONS = 'StartSel=<mark>, StopSel=</mark>, MaxWords=20, MinWords=8, MaxFragments=2'
+
+
+def _news_search_query(text, limit, after=None):
+    """Build a ranked, keyset-paginated full-text search over news.
+
+    Matches come from the GIN index on `search_vector`; only the rows of the
+    requested page are passed to `ts_headline`, which has to re-parse the
+    text and is the expensive part of a search.
+
+    Args:
+        text (str): User query in web-search syntax ("quoted phrases", -not, or).
+        limit (int): Maximum number of rows in the page. One extra row is
+            requested so the caller can tell whether another page exists.
+        after (tuple): Optional `(rank, news_id)` of the last row of the
+            previous page.
+
+    Returns:
+        tuple: `(sql, params, columns)` where `columns` are `NEWS_COLUMNS`
+        followed by `rank` and `snippet`.
+    """
+    params = [NEWS_SEARCH_CONFIG, text, NEWS_SEARCH_CONFIG, NEWS_SNIPPET_OPTIONS]
+    where = ''
+    if after is not None:
+        where = 'WHERE (rank, news_id) < (%s, %s)'
+        params.extend(after)
+    params.append(limit + 1)
+
+    sql = f"""
+        WITH query AS (
+            SELECT websearch_to_tsquery(%s::regconfig, %s) AS q
+        ),
+        matches AS (
+            SELECT {', '.join(NEWS_COLUMNS)}, ts_rank_cd(search_vector, query.q)::float8 AS rank
+            FROM news, query
+            WHERE search_vector @@ query.q
+        )
+        SELECT page.*,
+               ts_headline(%s::regconfig, concat_ws(' - ', page.title, page.subtitle, page.location), query.q, %s)
+        FROM (
+            SELECT * FROM matches
+            {where}
+            ORDER BY rank DESC, news_id DESC
+            LIMIT %s
+        ) AS page, query
+        ORDER BY page.rank DESC, page.news_id DESC;
+    """
+    return sql, tuple(params), NEWS_COLUMNS + ('rank', 'snippet')
+
+
+def _news_nearby_query(lat, lng, radius_m, limit, after=None):
+    """Build a distance-ordered, keyset-paginated radius query over news.
+
+    `earth_box` is a bounding cube of the circle and is answered by the GiST
+    index on `ll_to_earth(latitude, longitude)`; the exact great-circle
+    distance then trims the corners and orders the page.
+
+    Args:
+        lat (float): Latitude of the center.
+        lng (float): Longitude of the center.
+        radius_m (float): Search radius in meters.
+        limit (int): Maximum number of rows in the page. One extra row is
+            requested so the caller can tell whether another page exists.
+        after (tuple): Optional `(distance_m, news_id)` of the last row of the
+            previous page.
+
+    Returns:
+        tuple: `(sql, params, columns)` where `columns` are `NEWS_COLUMNS`
+        followed by `distance_m`.
+    """
+    params = [lat, lng, lat, lng, radius_m, radius_m]
+    keyset = ''
+    if after is not None:
+        keyset = 'AND (distance_m, news_id) > (%s, %s)'
+        params.extend(after)
+    params.append(limit + 1)
+
+    sql = f"""
+        SELECT *
+        FROM (
+            SELECT {', '.join(NEWS_COLUMNS)},
+                   earth_distance(ll_to_earth(latitude, longitude), ll_to_earth(%s, %s)) AS distance_m
+            FROM news
+            WHERE earth_box(ll_to_earth(%s, %s), %s) @> ll_to_earth(latitude, longitude)
+        ) AS nearby
+        WHERE distance_m <= %s {keyset}
+        ORDER BY distance_m, news_id
+        LIMIT %s;
+    """
+    return sql, tuple(params), NEWS_COLUMNS + ('distance_m',)
+
+
+def _news_batch_query(news_ids, include_details=False):
+    """Build a query fetching many news entries by ID in one round trip.
+
+    Args:
+        news_ids (list): IDs to fetch; unknown IDs simply return no row.
+        include_details (bool): Also select `news_details.summary`, which is
+            NULL for entries without details.
+
+    Returns:
+        tuple: `(sql, params, columns)` where `columns` are `NEWS_COLUMNS`,
+        followed by `summary` when details are included.
+    """
+    columns = NEWS_COLUMNS + ('summary',) if include_details else NEWS_COLUMNS
+    select = ', '.join(f'news.{column}' for column in NEWS_COLUMNS)
+    join = ''
+    if include_details:
+        select += ', news_details.summary'
+        join = 'LEFT JOIN news_details ON news_details.news_id = news.news_id'
+    sql = f"""
+        SELECT {select}
+        FROM news
+        {join}
+        WHERE news.news_id = ANY(%s);
+    """
+    return sql, (list(news_ids),), columns
+
+
+def get_news_batch(news_ids, include_details=False):
+    """Retrieve many news entries by ID.
+
+    Returns:
+        tuple: `(columns, rows)`; see `_news_batch_query`. Rows come in no
+        particular order.
+    """
+    sql, params, columns = _news_batch_query(news_ids, include_details)
+    try:
+        return columns, _execute_sql_fetch_all(sql, params, query='get_news_batch', replica=True)
+    except Exception as e:
+        raise Exception(f'Error retrieving news batch: {e}')
+
+
 def get_news_by_id(news_id):
     """Retrieve a news entry by its news_id using helper functions."""
-    sql = 'SELECT * FROM news WHERE news_id = %s;'
+    sql = f'SELECT {", ".join(NEWS_COLUMNS)} FROM news WHERE news_id = %s;'
     try:
-        result = _execute_sql_fetch_one(sql, (news_id,))
+        result = _execute_sql_fetch_one(sql, (news_id,), query='get_news_by_id', replica=True)
         if result:
             return result
         else:
@@ -143,16 +407,22 @@ def get_news_by_id(news_id):
         raise Exception(f'Error retrieving news with news_id{news_id}: {e}')
 
 
-def update_news(news_id, cover_link, title, subtitle, location, views):
-    """Update the details of an existing news entry using a helper function."""
+def update_news(news_id, cover_link, title, subtitle, location, views, latitude=None, longitude=None):
+    """Update the details of an existing news entry using a helper function.
+
+    Coordinates are only replaced when given, so clients that do not send them
+    keep the stored ones.
+    """
     sql = """
         UPDATE news
-        SET cover_link = %s, title = %s, subtitle = %s, location = %s, views = %s
+        SET cover_link = %s, title = %s, subtitle = %s, location = %s, views = %s,
+            latitude = COALESCE(%s, latitude), longitude = COALESCE(%s, longitude)
         WHERE news_id = %s
         RETURNING news_id, cover_link, title, subtitle, location, views;
     """
     try:
-        updated_news = _execute_sql_fetch_one(sql, (cover_link, title, subtitle, location, views, news_id))
+        updated_news = _execute_sql_fetch_one(
+            sql, (cover_link, title, subtitle, location, views, latitude, longitude, news_id), query='update_news')
         if updated_news:
             return updated_news
         else:
@@ -165,7 +435,7 @@ def delete_news(news_id):
     """Delete a news entry from the database using a helper function."""
     sql = 'DELETE FROM news WHERE news_id = %s RETURNING news_id;'
     try:
-        deleted = _execute_sql_fetch_one(sql, (news_id,))
+        deleted = _execute_sql_fetch_one(sql, (news_id,), query='delete_news')
         if not deleted:
             raise ValueError(f'News with news_id {news_id} not found.')
         return {'message': f'News with news_id {news_id} successfully deleted.'}
@@ -185,7 +455,8 @@ def add_user_to_db(username, email, password_hash, full_name):
             VALUES (%s, %s, %s, %s, %s)
             RETURNING user_id;
         """
-        result = _execute_sql_fetch_one(sql, (user_id, username, email, password_hash, full_name))
+        result = _execute_sql_fetch_one(sql, (user_id, username, email, password_hash, full_name),
+                                        query='add_user_to_db')
         return result[0] if result else None
     except Exception as e:
         raise Exception(f'Error adding user to the database: {e}')
@@ -195,7 +466,7 @@ def get_user_by_id(user_id):
     """Retrieve a user by their user_id."""
     sql = 'SELECT * FROM users WHERE user_id = %s;'
     try:
-        return _execute_sql_fetch_one(sql, (user_id,))
+        return _execute_sql_fetch_one(sql, (user_id,), query='get_user_by_id', replica=True)
     except Exception as e:
         raise Exception(f'Error retrieving user with user_id {user_id}: {e}')
 
@@ -204,7 +475,7 @@ def get_all_users():
     """Retrieve all users from the database."""
     sql = 'SELECT * FROM users;'
     try:
-        return _execute_sql_fetch_all(sql, ())
+        return _execute_sql_fetch_all(sql, (), query='get_all_users', replica=True)
     except Exception as e:
         raise Exception(f'Error retrieving users: {e}')
 
@@ -218,7 +489,8 @@ def update_user(user_id, username, email, password_hash, full_name):
         RETURNING user_id, username, email, full_name;
     """
     try:
-        updated_user = _execute_sql_fetch_one(sql, (username, email, password_hash, full_name, user_id))
+        updated_user = _execute_sql_fetch_one(sql, (username, email, password_hash, full_name, user_id),
+                                              query='update_user')
         if updated_user:
             return updated_user
         else:
@@ -231,7 +503,7 @@ def delete_user(user_id):
     """Delete a user from the database."""
     sql = 'DELETE FROM users WHERE user_id = %s RETURNING user_id;'
     try:
-        deleted = _execute_sql_fetch_one(sql, (user_id,))
+        deleted = _execute_sql_fetch_one(sql, (user_id,), query='delete_user')
         if not deleted:
             raise ValueError(f'User with user_id {user_id} not found.')
         return {'message': f'User with user_id {user_id} successfully deleted.'}
@@ -0,0 +1,130 @@
+import math
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2)**2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def point_in_polygon(lat, lng, polygon):
+    """Ray-casting test of a point against a closed ring of (lat, lng) points."""
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        lat_i, lng_i = polygon[i]
+        lat_j, lng_j = polygon[j]
+        if (lat_i > lat) != (lat_j > lat):
+            cross = (lng_j - lng_i) * (lat - lat_i) / (lat_j - lat_i) + lng_i
+            if lng < cross:
+                inside = not inside
+        j = i
+    return inside
+
+
+def _orientation(ax, ay, bx, by, cx, cy):
+    value = (by - ay) * (cx - bx) - (bx - ax) * (cy - by)
+    return (value > 0) - (value < 0)
+
+
+def segments_intersect(p1, p2, q1, q2):
+    """Whether segment p1-p2 properly crosses segment q1-q2."""
+    o1 = _orientation(*p1, *p2, *q1)
+    o2 = _orientation(*p1, *p2, *q2)
+    o3 = _orientation(*q1, *q2, *p1)
+    o4 = _orientation(*q1, *q2, *p2)
+    return o1 != o2 and o3 != o4
+
+
+def polygon_bbox(polygon):
+    """Return (min_lat, min_lng, max_lat, max_lng) of a ring."""
+    lats = [lat for lat, _ in polygon]
+    lngs = [lng for _, lng in polygon]
+    return min(lats), min(lngs), max(lats), max(lngs)
+
+
+def bboxes_overlap(a, b):
+    """Whether two (min_lat, min_lng, max_lat, max_lng) boxes overlap."""
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def segment_intersects_polygon(p1, p2, polygon):
+    """Whether a segment enters, crosses or lies inside a closed ring."""
+    if point_in_polygon(*p1, polygon) or point_in_polygon(*p2, polygon):
+        return True
+    return any(segments_intersect(p1, p2, polygon[i], polygon[i + 1]) for i in range(len(polygon) - 1))
+
+
+def polygon_intersects_bbox(polygon, bbox):
+    """Whether a closed ring overlaps a (min_lat, min_lng, max_lat, max_lng) box."""
+    min_lat, min_lng, max_lat, max_lng = bbox
+    if any(min_lat <= lat <= max_lat and min_lng <= lng <= max_lng for lat, lng in polygon):
+        return True
+    corners = [(min_lat, min_lng), (min_lat, max_lng), (max_lat, max_lng), (max_lat, min_lng), (min_lat, min_lng)]
+    if any(point_in_polygon(lat, lng, polygon) for lat, lng in corners[:4]):
+        return True
+    return any(
+        segments_intersect(polygon[i], polygon[i + 1], corners[j], corners[j + 1])
+        for i in range(len(polygon) - 1)
+        for j in range(4))
+
+
+def meters_per_pixel(zoom, lat):
+    """Ground resolution of a 256-px Web Mercator tile at `zoom` and latitude `lat`."""
+    return 156543.03392 * math.cos(math.radians(lat)) / (2**zoom)
+
+
+def simplify_path(points, tolerance_m):
+    """Simplify a polyline of (lat, lng) points with Douglas-Peucker.
+
+    Points are projected onto a local equirectangular plane, which is accurate
+    to well under a meter over city distances.
+
+    Args:
+        points: Sequence of (lat, lng) tuples.
+        tolerance_m (float): Maximum distance in meters a dropped point may lie
+            from the simplified line.
+
+    Returns:
+        list: The retained points, always including the first and last.
+    """
+    if len(points) < 3 or tolerance_m <= 0:
+        return list(points)
+
+    lat0 = math.radians(points[0][0])
+    meters_per_deg_lat = 110540.0
+    meters_per_deg_lng = 111320.0 * math.cos(lat0)
+    xs = [lng * meters_per_deg_lng for _, lng in points]
+    ys = [lat * meters_per_deg_lat for lat, _ in points]
+
+    keep = bytearray(len(points))
+    keep[0] = keep[-1] = 1
+    tolerance_sq = tolerance_m * tolerance_m
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = xs[first], ys[first]
+        dx, dy = xs[last] - ax, ys[last] - ay
+        length_sq = dx * dx + dy * dy
+
+        farthest, max_sq = None, tolerance_sq
+        for i in range(first + 1, last):
+            px, py = xs[i] - ax, ys[i] - ay
+            if length_sq:
+                t = max(0.0, min(1.0, (px * dx + py * dy) / length_sq))
+                px, py = px - t * dx, py - t * dy
+            distance_sq = px * px + py * py
+            if distance_sq > max_sq:
+                farthest, max_sq = i, distance_sq
+
+        if farthest is not None:
+            keep[farthest] = 1
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+
+    return [point for point, kept in zip(points, keep) if kept]
@@ -0,0 +1,153 @@
+import random
+import threading
+import time
+
+import requests
+from src.utils import metrics
+from src.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class RoutingUnavailable(requests.RequestException):
+    """Raised when HERE is down, too slow for the latency budget, or the circuit is open."""
+
+
+class HereRoutingClient:
+    """A latency-bounded client of the HERE routes endpoint.
+
+    Every call gets `budget` seconds in total: attempts use the connect/read
+    timeouts, cut down to what is left of the budget, and failed attempts are
+    retried after a jittered exponential backoff while budget remains.
+    Connection errors, timeouts, 429 and 5xx responses count as failures of
+    the circuit breaker; while it is open, calls fail immediately instead of
+    tying up a worker thread on an upstream that is down.
+
+    Args:
+        url (str): Routes endpoint.
+        session (requests.Session): Session holding the keep-alive pool.
+        connect_timeout (float): Connect timeout of one attempt, in seconds.
+        read_timeout (float): Read timeout of one attempt, in seconds.
+        budget (float): Upper bound on the time spent in `get_route`, in seconds.
+        retries (int): Attempts after the first one.
+        backoff (float): Base delay of the retry backoff, in seconds.
+        breaker (CircuitBreaker): Breaker shared by every call.
+    """
+
+    def __init__(self,
+                 url,
+                 session,
+                 connect_timeout=3.0,
+                 read_timeout=10.0,
+                 budget=10.0,
+                 retries=2,
+                 backoff=0.2,
+                 breaker=None):
+        self.url = url
+        self.session = session
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.budget = budget
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self._lock = threading.Lock()
+        self._counters = {'calls': 0, 'retries': 0, 'budget_exhausted': 0}
+
+    def get_route(self, params):
+        """Request a route and return the decoded JSON response.
+
+        Raises:
+            RoutingUnavailable: If the circuit is open, or every attempt the
+                budget allowed timed out, failed to connect or got a 429/5xx.
+            requests.HTTPError: At once on other 4xx responses, which are not
+                retried.
+        """
+        self._count('calls')
+        deadline = time.monotonic() + self.budget
+        attempt = 0
+        while True:
+            # The backoff sleep can overshoot the deadline, and requests
+            # rejects timeouts that are not positive.
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._count('budget_exhausted')
+                raise RoutingUnavailable(f'HERE did not answer within {self.budget} s')
+
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError as e:
+                metrics.HERE_REQUESTS.labels('circuit_open').inc()
+                raise RoutingUnavailable(str(e)) from e
+
+            try:
+                return self._attempt(params, remaining)
+            except requests.RequestException as e:
+                if not _is_retryable(e):
+                    raise
+                if attempt >= self.retries:
+                    raise RoutingUnavailable(f'HERE failed {attempt + 1} times, last with {describe_error(e)}') from e
+                # Full jitter, so clients that failed together do not retry together.
+                delay = random.uniform(0, self.backoff * 2**attempt)
+                if time.monotonic() + delay >= deadline:
+                    self._count('budget_exhausted')
+                    raise RoutingUnavailable(
+                        f'HERE did not answer within {self.budget} s, last with {describe_error(e)}') from e
+            attempt += 1
+            self._count('retries')
+            time.sleep(delay)
+
+    def stats(self):
+        """Return call and retry counters and the circuit breaker state."""
+        with self._lock:
+            counters = dict(self._counters)
+        return {**counters, 'circuit': self.breaker.stats()}
+
+    def _count(self, name):
+        # Batch routing calls the client from many threads at once.
+        with self._lock:
+            self._counters[name] += 1
+
+    def _attempt(self, params, remaining):
+        timeout = (min(self.connect_timeout, remaining), min(self.read_timeout, remaining))
+        started = time.perf_counter()
+        try:
+            response = self.session.get(self.url, params=params, timeout=timeout)
+        except requests.Timeout:
+            metrics.HERE_REQUESTS.labels('timeout').inc()
+            self.breaker.record_failure()
+            raise
+        except requests.RequestException:
+            metrics.HERE_REQUESTS.labels('error').inc()
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Never leave a half-open probe unresolved.
+            self.breaker.record_failure()
+            raise
+        finally:
+            metrics.HERE_LATENCY.observe(time.perf_counter() - started)
+
+        metrics.HERE_REQUESTS.labels(str(response.status_code)).inc()
+        if response.status_code == 429 or response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            # Any other answer, 4xx included, shows HERE is up.
+            self.breaker.record_success()
+        response.raise_for_status()
+        return response.json()
+
+
+def describe_error(error):
+    """Describe a failed HERE call without its message.
+
+    The messages of requests' exceptions contain the request URL, and with it
+    the API key, so only the HTTP status or the exception type is kept.
+    """
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return f'HTTP {error.response.status_code}'
+    return type(error).__name__
+
+
+def _is_retryable(error):
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return not isinstance(error, RoutingUnavailable)
@@ -0,0 +1,58 @@
+import hashlib
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+
+def make_etag(*parts):
+    """Build a weak entity tag from the values that identify a representation."""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _as_utc(value):
+    # Timestamps are stored without a time zone and written in UTC.
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def validator_headers(etag, last_modified=None):
+    """Return the ETag / Last-Modified headers for a response.
+
+    `Cache-Control: no-cache` lets clients store the response but makes them
+    revalidate it on every use, which is what turns repeat reads into 304s.
+    """
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if last_modified is not None:
+        headers['Last-Modified'] = format_datetime(_as_utc(last_modified).replace(microsecond=0), usegmt=True)
+    return headers
+
+
+def is_not_modified(request_headers, etag, last_modified=None):
+    """Whether a conditional GET can be answered with 304 Not Modified.
+
+    If-None-Match is compared with weak comparison and, as RFC 9110 requires,
+    takes precedence over If-Modified-Since when both are sent.
+
+    Args:
+        request_headers: The request's headers mapping.
+        etag (str): Current entity tag of the representation.
+        last_modified (datetime): Time of the last change, if known.
+    """
+    if_none_match = request_headers.get('if-none-match')
+    if if_none_match is not None:
+        if if_none_match.strip() == '*':
+            return True
+        current = etag.removeprefix('W/')
+        return any(tag.strip().removeprefix('W/') == current for tag in if_none_match.split(','))
+
+    if_modified_since = request_headers.get('if-modified-since')
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return _as_utc(last_modified).replace(microsecond=0) <= since
@@ -0,0 +1,58 @@
+import os
+import threading
+import time
+import uuid
+
+# Crockford's base32 alphabet, lowercased. Its characters are in ASCII order,
+# so fixed-length encodings sort like the numbers they encode.
+_ALPHABET = '0123456789abcdefghjkmnpqrstvwxyz'
+
+# A 128-bit value takes 26 base32 characters.
+ENCODED_LENGTH = 26
+
+_RANDOM_BITS = 74  # The 12-bit rand_a and 62-bit rand_b fields of a UUIDv7.
+
+_lock = threading.Lock()
+_last_ms = 0
+_last_random = 0
+
+
+def uuid7():
+    """Return a UUIDv7 (RFC 9562): a 48-bit Unix millisecond timestamp followed by random bits.
+
+    UUIDs generated by this process are strictly increasing: within one
+    millisecond, the random part of the previous UUID is incremented instead
+    of drawn again.
+    """
+    global _last_ms, _last_random
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms <= _last_ms:
+            ms, random_part = _last_ms, _last_random + 1
+            if random_part >> _RANDOM_BITS:
+                ms, random_part = ms + 1, _fresh_random()
+        else:
+            random_part = _fresh_random()
+        _last_ms, _last_random = ms, random_part
+
+    rand_a, rand_b = random_part >> 62, random_part & ((1 << 62) - 1)
+    return uuid.UUID(int=(ms & ((1 << 48) - 1)) << 80 | 0x7 << 76 | rand_a << 64 | 0b10 << 62 | rand_b)
+
+
+def _fresh_random():
+    # The top bit stays clear, leaving room for 2**73 increments per millisecond.
+    return int.from_bytes(os.urandom(10), 'big') >> (80 - _RANDOM_BITS + 1)
+
+
+def encode_base32(value, length=ENCODED_LENGTH):
+    """Encode a non-negative integer as fixed-length lowercase Crockford base32."""
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(_ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def time_ordered_key():
+    """Return a UUIDv7 as 26 base32 characters, which sort in creation order."""
+    return encode_base32(uuid7().int)
@@ -0,0 +1,128 @@
+import os
+import time
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from prometheus_client.core import REGISTRY, GaugeMetricFamily
+from prometheus_client.exposition import CONTENT_TYPE_LATEST
+
+# With several uvicorn workers, point PROMETHEUS_MULTIPROC_DIR at an empty
+# directory shared by them so /metrics aggregates every worker, not just the
+# one that answers the scrape.
+MULTIPROCESS = bool(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+
+_FAST_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'HTTP request latency by route template.',
+                            ['method', 'route', 'status'])
+
+QUERY_LATENCY = Histogram('db_query_duration_seconds',
+                          'SQL statement latency by the db helper that issued it.', ['query', 'driver'],
+                          buckets=_FAST_BUCKETS)
+QUERY_ROWS = Counter('db_query_rows_total', 'Rows returned or written by SQL statements.', ['query', 'driver'])
+QUERY_ERRORS = Counter('db_query_errors_total', 'SQL statements that raised.', ['query', 'driver'])
+
+HERE_LATENCY = Histogram('here_request_duration_seconds', 'Latency of HERE routing API calls.')
+HERE_REQUESTS = Counter('here_requests_total', 'HERE routing API calls by HTTP status or failure kind.', ['status'])
+ROUTE_FALLBACKS = Counter('route_fallbacks_total', 'Routes served by a fallback while HERE was unavailable.', ['kind'])
+
+# Name -> zero-argument callable returning {gauge suffix: value}; sampled at
+# scrape time so saturation gauges cost nothing per request.
+_saturation_sources = {}
+
+
+def register_saturation(name, sample):
+    """Expose the numbers returned by `sample()` as `<name>_<key>` gauges on /metrics."""
+    _saturation_sources[name] = sample
+
+
+class _SaturationCollector:
+
+    def collect(self):
+        for name, sample in list(_saturation_sources.items()):
+            try:
+                values = sample()
+            except Exception:
+                continue
+            for key, value in values.items():
+                gauge = GaugeMetricFamily(f'{name}_{key}', f'{key} of {name}, sampled at scrape time.')
+                gauge.add_metric([], value)
+                yield gauge
+
+
+REGISTRY.register(_SaturationCollector())
+
+
+class QueryTimer:
+    """Context manager recording the latency, row count and failure of SQL statements.
+
+    Metrics are labelled with `query`, the name of the db helper running the
+    statements (e.g. `get_news_page`), and the `driver`. Set `rows` inside
+    the block to count returned rows.
+    """
+
+    __slots__ = ('query', 'driver', 'rows', '_started')
+
+    def __init__(self, query, driver):
+        self.query = query
+        self.driver = driver
+        self.rows = 0
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        QUERY_LATENCY.labels(self.query, self.driver).observe(time.perf_counter() - self._started)
+        if exc_type is not None:
+            QUERY_ERRORS.labels(self.query, self.driver).inc()
+        elif self.rows:
+            QUERY_ROWS.labels(self.query, self.driver).inc(self.rows)
+
+
+def render():
+    """Return `(body, content_type)` of the Prometheus text exposition."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        # Saturation gauges are per process and only meaningful live.
+        registry.register(_SaturationCollector())
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead():
+    """Drop this worker's live gauges from the shared multiprocess directory on exit."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request by its route template.
+
+    Labels use the matched path template (e.g. /news/{news_id}) rather than
+    the raw path, so cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get('route')
+            REQUEST_LATENCY.labels(scope['method'], route.path if route is not None else 'unmatched',
+                                   status).observe(time.perf_counter() - started)
@@ -0,0 +1,202 @@
+import heapq
+import json
+import math
+from array import array
+
+from src.utils.geometry import haversine_m, point_in_polygon, segments_intersect
+
+# Edge length of the nearest-node lookup grid, in degrees (~1 km in Dublin).
+GRID_CELL_DEG = 0.01
+
+
+class _BlockedAreas:
+    """Per-query view of restricted polygons with bbox prefiltering and memoization."""
+
+    def __init__(self, polygons):
+        self.polygons = []
+        for polygon in polygons or ():
+            lats = [lat for lat, _ in polygon]
+            lngs = [lng for _, lng in polygon]
+            self.polygons.append((list(polygon), min(lats), max(lats), min(lngs), max(lngs)))
+        self._nodes = {}
+
+    def node_blocked(self, graph, node):
+        blocked = self._nodes.get(node)
+        if blocked is None:
+            lat, lng = graph.lat[node], graph.lng[node]
+            blocked = any(
+                min_lat <= lat <= max_lat and min_lng <= lng <= max_lng and point_in_polygon(lat, lng, polygon)
+                for polygon, min_lat, max_lat, min_lng, max_lng in self.polygons)
+            self._nodes[node] = blocked
+        return blocked
+
+    def edge_blocked(self, graph, u, v):
+        # Endpoints are checked by the search itself; this catches segments
+        # that cut through a polygon without a vertex inside it.
+        lat_u, lng_u, lat_v, lng_v = graph.lat[u], graph.lng[u], graph.lat[v], graph.lng[v]
+        for polygon, min_lat, max_lat, min_lng, max_lng in self.polygons:
+            if max(lat_u, lat_v) < min_lat or min(lat_u, lat_v) > max_lat:
+                continue
+            if max(lng_u, lng_v) < min_lng or min(lng_u, lng_v) > max_lng:
+                continue
+            for i in range(len(polygon) - 1):
+                if segments_intersect((lat_u, lng_u), (lat_v, lng_v), polygon[i], polygon[i + 1]):
+                    return True
+        return False
+
+
+class RoadGraph:
+    """A directed road graph in compressed sparse row (CSR) form.
+
+    Node coordinates and edges live in flat `array` buffers, so a city-sized
+    graph costs a few bytes per edge instead of a Python object per edge.
+
+    Args:
+        coordinates: Sequence of (lat, lng) node positions.
+        edges: Sequence of (from, to, length_m) directed edges.
+    """
+
+    def __init__(self, coordinates, edges):
+        node_count = len(coordinates)
+        self.lat = array('d', (lat for lat, _ in coordinates))
+        self.lng = array('d', (lng for _, lng in coordinates))
+
+        degree = array('i', bytes(4 * (node_count + 1)))
+        for source, _, _ in edges:
+            degree[source + 1] += 1
+        for node in range(node_count):
+            degree[node + 1] += degree[node]
+        self.offsets = degree
+
+        cursor = array('i', degree[:-1])
+        self.targets = array('i', bytes(4 * len(edges)))
+        self.weights = array('f', bytes(4 * len(edges)))
+        for source, target, length in edges:
+            slot = cursor[source]
+            self.targets[slot] = target
+            self.weights[slot] = length
+            cursor[source] += 1
+
+        self._grid = {}
+        for node in range(node_count):
+            self._grid.setdefault(self._cell(self.lat[node], self.lng[node]), []).append(node)
+        rows = [row for row, _ in self._grid] or [0]
+        cols = [col for _, col in self._grid] or [0]
+        self._grid_bounds = (min(rows), max(rows), min(cols), max(cols))
+
+    @classmethod
+    def load(cls, path):
+        """Load a graph from a JSON file.
+
+        The file holds `nodes`, a list of [lat, lng], and `edges`, a list of
+        [from, to] or [from, to, length_m] node indexes. Edges are two-way
+        unless the top-level `oneway` list marks their index or a fourth
+        element of the edge is true. Missing lengths are computed from the
+        node coordinates.
+        """
+        with open(path) as f:
+            data = json.load(f)
+
+        coordinates = [(float(lat), float(lng)) for lat, lng in data['nodes']]
+        oneway = set(data.get('oneway', ()))
+        edges = []
+        for index, edge in enumerate(data['edges']):
+            source, target = int(edge[0]), int(edge[1])
+            if len(edge) > 2 and edge[2] is not None:
+                length = float(edge[2])
+            else:
+                length = haversine_m(*coordinates[source], *coordinates[target])
+            edges.append((source, target, length))
+            if not (index in oneway or (len(edge) > 3 and edge[3])):
+                edges.append((target, source, length))
+        return cls(coordinates, edges)
+
+    def __len__(self):
+        return len(self.lat)
+
+    def nearest_node(self, lat, lng, blocked=None):
+        """Return the closest node to a point that is not inside a blocked area."""
+        if not self._grid:
+            return None
+        row, col = self._cell(lat, lng)
+        min_row, max_row, min_col, max_col = self._grid_bounds
+        max_radius = max(row - min_row, max_row - row, col - min_col, max_col - col)
+
+        best, best_distance, found_at = None, math.inf, None
+        for radius in range(max_radius + 1):
+            for r in range(row - radius, row + radius + 1):
+                for c in range(col - radius, col + radius + 1):
+                    if abs(r - row) != radius and abs(c - col) != radius:
+                        continue
+                    for node in self._grid.get((r, c), ()):
+                        if blocked is not None and blocked.node_blocked(self, node):
+                            continue
+                        distance = haversine_m(lat, lng, self.lat[node], self.lng[node])
+                        if distance < best_distance:
+                            best, best_distance = node, distance
+            if best is not None and found_at is None:
+                found_at = radius
+            # A node in a ring further out than one past the first hit is at
+            # least a full cell away, farther than anything already found.
+            if found_at is not None and radius > found_at:
+                break
+        return best
+
+    def shortest_path(self, start, end, restricted_areas=None):
+        """Find the shortest drivable path between two points with A*.
+
+        Args:
+            start: (lat, lng) of the origin.
+            end: (lat, lng) of the destination.
+            restricted_areas: Optional list of closed (lat, lng) rings that the
+                path must not enter or cross.
+
+        Returns:
+            list: (lat, lng) tuples from origin to destination, or None if the
+            destination cannot be reached.
+        """
+        blocked = _BlockedAreas(restricted_areas)
+        source = self.nearest_node(*start, blocked=blocked)
+        target = self.nearest_node(*end, blocked=blocked)
+        if source is None or target is None:
+            return None
+
+        lat, lng, offsets, targets, weights = self.lat, self.lng, self.offsets, self.targets, self.weights
+        goal_lat, goal_lng = lat[target], lng[target]
+
+        distances = {source: 0.0}
+        previous = {}
+        queue = [(haversine_m(lat[source], lng[source], goal_lat, goal_lng), source)]
+        settled = set()
+        while queue:
+            _, node = heapq.heappop(queue)
+            if node == target:
+                break
+            if node in settled:
+                continue
+            settled.add(node)
+            base = distances[node]
+            for slot in range(offsets[node], offsets[node + 1]):
+                neighbour = targets[slot]
+                if neighbour in settled or blocked.node_blocked(self, neighbour):
+                    continue
+                distance = base + weights[slot]
+                if distance < distances.get(neighbour, math.inf):
+                    if blocked.polygons and blocked.edge_blocked(self, node, neighbour):
+                        continue
+                    distances[neighbour] = distance
+                    previous[neighbour] = node
+                    estimate = distance + haversine_m(lat[neighbour], lng[neighbour], goal_lat, goal_lng)
+                    heapq.heappush(queue, (estimate, neighbour))
+        else:
+            return None
+
+        path = [target]
+        while path[-1] != source:
+            path.append(previous[path[-1]])
+        path.reverse()
+        return [(lat[node], lng[node]) for node in path]
+
+    @staticmethod
+    def _cell(lat, lng):
+        return int(math.floor(lat / GRID_CELL_DEG)), int(math.floor(lng / GRID_CELL_DEG))
@@ -0,0 +1,143 @@
+import math
+import threading
+from collections import namedtuple
+
+from src.utils.geometry import bboxes_overlap, polygon_bbox, polygon_intersects_bbox, segment_intersects_polygon
+
+# An indexed polygon. `revision` increases every time the key is (re)inserted,
+# so (key, revision) identifies one version of an area.
+IndexedArea = namedtuple('IndexedArea', 'key revision polygon bbox')
+
+
+class GridIndex:
+    """A uniform-grid spatial index of polygons.
+
+    Each polygon is registered in every grid cell its bounding box touches, so
+    a query only inspects polygons in the cells it overlaps. Inserts and
+    removals update just the affected cells; there is no global rebuild.
+    Polygons spanning more than `max_cells` cells are kept aside and checked
+    by every query, and queries covering more cells than are occupied scan
+    the occupied ones instead, so neither costs more than the index size.
+
+    Args:
+        cell_deg (float): Edge length of a grid cell in degrees.
+        max_cells (int): Most cells a single polygon is registered in.
+    """
+
+    def __init__(self, cell_deg=0.005, max_cells=4096):
+        self.cell_deg = cell_deg
+        self.max_cells = max_cells
+        self._lock = threading.RLock()
+        self._areas = {}  # key -> IndexedArea
+        self._cells = {}  # (row, col) -> set of keys
+        self._large = set()  # Keys of areas too big to register cell by cell.
+        self._revision = 0
+
+    def insert(self, key, polygon):
+        """Add `polygon` under `key`, replacing any previous polygon for it."""
+        polygon = [(float(lat), float(lng)) for lat, lng in polygon]
+        bbox = polygon_bbox(polygon)
+        with self._lock:
+            self._remove_locked(key)
+            self._revision += 1
+            self._areas[key] = IndexedArea(key, self._revision, polygon, bbox)
+            if self._cell_count(bbox) > self.max_cells:
+                self._large.add(key)
+                return
+            for cell in self._cells_for(bbox):
+                self._cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key):
+        """Remove `key` from the index if present."""
+        with self._lock:
+            self._remove_locked(key)
+
+    def rebuild(self, items):
+        """Replace the index contents with `(key, polygon)` pairs."""
+        with self._lock:
+            self._areas.clear()
+            self._cells.clear()
+            self._large.clear()
+            for key, polygon in items:
+                self.insert(key, polygon)
+
+    def get(self, key):
+        """Return the IndexedArea for `key`, or None."""
+        return self._areas.get(key)
+
+    def __len__(self):
+        return len(self._areas)
+
+    def query_bbox(self, min_lat, min_lng, max_lat, max_lng):
+        """Return the areas whose polygon overlaps a bounding box.
+
+        Returns:
+            list: IndexedArea entries, ordered by key.
+        """
+        bbox = (min_lat, min_lng, max_lat, max_lng)
+        with self._lock:
+            candidates = self._candidates(bbox)
+            areas = [self._areas[key] for key in candidates]
+        matches = [
+            area for area in areas if bboxes_overlap(area.bbox, bbox) and polygon_intersects_bbox(area.polygon, bbox)
+        ]
+        return sorted(matches, key=lambda area: str(area.key))
+
+    def query_path(self, points):
+        """Return the areas a polyline of (lat, lng) points enters or crosses.
+
+        Returns:
+            list: IndexedArea entries, ordered by key.
+        """
+        matches = {}
+        with self._lock:
+            for p1, p2 in zip(points, points[1:] or points):
+                segment_bbox = (min(p1[0], p2[0]), min(p1[1], p2[1]), max(p1[0], p2[0]), max(p1[1], p2[1]))
+                for key in self._candidates(segment_bbox):
+                    if key in matches:
+                        continue
+                    area = self._areas[key]
+                    if bboxes_overlap(area.bbox, segment_bbox) and segment_intersects_polygon(p1, p2, area.polygon):
+                        matches[key] = area
+        return sorted(matches.values(), key=lambda area: str(area.key))
+
+    def _candidates(self, bbox):
+        keys = set(self._large)
+        if self._cell_count(bbox) <= len(self._cells):
+            for cell in self._cells_for(bbox):
+                keys.update(self._cells.get(cell, ()))
+            return keys
+        min_row, min_col, max_row, max_col = self._cell_range(bbox)
+        for (row, col), cell_keys in self._cells.items():
+            if min_row <= row <= max_row and min_col <= col <= max_col:
+                keys.update(cell_keys)
+        return keys
+
+    def _cell_range(self, bbox):
+        min_lat, min_lng, max_lat, max_lng = bbox
+        return (math.floor(min_lat / self.cell_deg), math.floor(min_lng / self.cell_deg),
+                math.floor(max_lat / self.cell_deg), math.floor(max_lng / self.cell_deg))
+
+    def _cell_count(self, bbox):
+        min_row, min_col, max_row, max_col = self._cell_range(bbox)
+        return (max_row - min_row + 1) * (max_col - min_col + 1)
+
+    def _cells_for(self, bbox):
+        min_row, min_col, max_row, max_col = self._cell_range(bbox)
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                yield row, col
+
+    def _remove_locked(self, key):
+        area = self._areas.pop(key, None)
+        if area is None:
+            return
+        if key in self._large:
+            self._large.discard(key)
+            return
+        for cell in self._cells_for(area.bbox):
+            keys = self._cells.get(cell)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._cells[cell]
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import threading
+
+
+class ViewCounter:
+    """Aggregates view increments in memory and writes them out in bulk.
+
+    `increment` only touches a dict, so counting a view never waits on the
+    database. A background task hands the accumulated deltas to `flush` every
+    `interval` seconds; deltas that fail to flush are merged back so they are
+    retried on the next run instead of being lost. At most `max_pending`
+    distinct IDs are buffered; views of further IDs are dropped and counted
+    in `dropped` until the next flush makes room.
+
+    Args:
+        flush: Coroutine function taking a dict of `{news_id: delta}`.
+        interval (float): Seconds between flushes.
+        max_pending (int): Most distinct IDs buffered between flushes.
+    """
+
+    def __init__(self, flush, interval=5.0, max_pending=100000):
+        self._flush = flush
+        self.interval = interval
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._task = None
+        self._flush_lock = asyncio.Lock()
+
+    def increment(self, news_id, count=1):
+        """Record `count` views of `news_id`.
+
+        Returns:
+            bool: False if the views were dropped because the buffer is full.
+        """
+        with self._lock:
+            if news_id not in self._pending and len(self._pending) >= self.max_pending:
+                self.dropped += count
+                return False
+            self._pending[news_id] = self._pending.get(news_id, 0) + count
+            return True
+
+    def pending(self):
+        """Return the number of news items with unflushed views."""
+        return len(self._pending)
+
+    async def flush(self):
+        """Write all pending deltas now.
+
+        Returns:
+            int: The number of news items flushed.
+        """
+        async with self._flush_lock:
+            with self._lock:
+                deltas, self._pending = self._pending, {}
+            if not deltas:
+                return 0
+            try:
+                await self._flush(deltas)
+            except BaseException:
+                # Including cancellation by `stop`, whose final flush then
+                # writes these deltas.
+                with self._lock:
+                    for news_id, count in deltas.items():
+                        self._pending[news_id] = self._pending.get(news_id, 0) + count
+                raise
+            return len(deltas)
+
+    def start(self):
+        """Start the periodic flush task on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the periodic task and flush whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logging.exception('Failed to flush view counts; will retry')
@@ -0,0 +1,56 @@
+import pytest
+
+fp = pytest.importorskip("flexpolyline")
+requests = pytest.importorskip("requests")
+pytest.importorskip("httpx")
+
+from benchmarks.fake_here import FakeHereServer
+from benchmarks.workload import Workload, parse_mix, percentile, summarize
+from src.data_models import NewsUpdate
+
+
+def test_parse_mix():
+    assert parse_mix("list=40, item=60,route") == {"list": 40.0, "item": 60.0, "route": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("list=40,delete=10")
+    with pytest.raises(ValueError):
+        parse_mix("list=0")
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.50) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([7], 0.95) == 7
+    assert percentile([], 0.5) is None
+
+
+def test_summarize_reports_per_operation_and_total():
+    report = summarize({"item": [(0.010, 200), (0.030, None)], "list": [(0.020, 200), (0.040, 422)]}, elapsed=2)
+    assert report["item"]["endpoint"] == "GET /news/{news_id}"
+    assert report["item"]["requests"] == 2
+    assert report["item"]["errors"] == 1
+    assert report["item"]["statuses"] == {"200": 1, "none": 1}
+    assert report["list"]["errors"] == 1
+    assert report["item"]["p50_ms"] == 10.0
+    assert report["item"]["p99_ms"] == 30.0
+    assert report["total"]["requests"] == 4
+    assert report["total"]["errors"] == 2
+    assert report["total"]["rps"] == 2.0
+
+
+def test_update_requests_are_valid_news_updates():
+    workload = Workload("http://server", {"update": 1}, ["1"], ["news_1"])
+    method, url, body = workload._request("update")
+    assert (method, url) == ("PUT", "/news/news_1")
+    NewsUpdate(**body)
+
+
+def test_fake_here_returns_a_decodable_route():
+    with FakeHereServer(latency=0) as here:
+        response = requests.get(here.url, params={"origin": "53.34,-6.25", "destination": "53.35,-6.27"})
+        route = fp.decode(response.json()["routes"][0]["sections"][0]["polyline"])
+        assert here.requests == 1
+        assert route[0] == pytest.approx((53.34, -6.25), abs=1e-5)
+        assert route[-1] == pytest.approx((53.35, -6.27), abs=1e-5)
+        assert requests.get(here.url, params={"origin": "nowhere"}).status_code == 400
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from src import events_handler
+from src.utils.broker import Broker, SubscriptionClosed
+
+
+def _event(event_type, event_id):
+    return {"type": event_type, "id": event_id}
+
+
+def test_publish_fans_out_by_topic():
+    async def run():
+        broker = Broker()
+        everything = broker.subscribe()
+        hazards = broker.subscribe(["hazards"])
+        broker.publish(_event("news.created", "news1"))
+        broker.publish(_event("hazards.deleted", "hazard1"))
+        return [await everything.get(), await everything.get()], await hazards.get(), broker.stats()
+
+    received, hazard_event, stats = asyncio.run(run())
+    assert [event["id"] for event in received] == ["news1", "hazard1"]
+    assert hazard_event["id"] == "hazard1"
+    assert stats["published"] == 2
+    assert stats["delivered"] == 3
+
+
+def test_drop_policies_bound_slow_subscribers():
+    async def run():
+        broker = Broker(max_queue=2)
+        oldest = broker.subscribe(policy="drop_oldest")
+        newest = broker.subscribe(policy="drop_newest")
+        disconnect = broker.subscribe(policy="disconnect")
+        for i in range(3):
+            broker.publish(_event("news.updated", f"news{i}"))
+
+        kept_oldest = [(await oldest.get())["id"], (await oldest.get())["id"]]
+        kept_newest = [(await newest.get())["id"], (await newest.get())["id"]]
+        with pytest.raises(SubscriptionClosed):
+            await disconnect.get()
+        return kept_oldest, kept_newest, broker.stats()
+
+    kept_oldest, kept_newest, stats = asyncio.run(run())
+    assert kept_oldest == ["news1", "news2"]
+    assert kept_newest == ["news0", "news1"]
+    assert stats["dropped"] == 3
+    assert stats["disconnected"] == 1
+    assert stats["subscribers"] == 2
+
+
+def test_close_wakes_pending_get():
+    async def run():
+        broker = Broker()
+        subscription = broker.subscribe()
+        waiter = asyncio.ensure_future(subscription.get())
+        await asyncio.sleep(0)
+        subscription.close()
+        with pytest.raises(SubscriptionClosed):
+            await waiter
+        return broker.stats()["subscribers"]
+
+    assert asyncio.run(run()) == 0
+
+
+def test_sse_stream_formats_events():
+    async def run():
+        subscription = events_handler.subscribe("news")
+        await events_handler.publish("news.created", id="news1")
+        stream = events_handler.sse_stream(subscription)
+        chunk = await stream.__anext__()
+        await stream.aclose()
+        return chunk, subscription.closed
+
+    chunk, closed = asyncio.run(run())
+    assert chunk.startswith(b"event: news.created\ndata: {")
+    assert b'"id":"news1"' in chunk
+    assert closed
@@ -0,0 +1,202 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from src.utils.cache import AsyncReadThroughCache, AsyncSingleFlight, LRUCache, SingleFlight
+
+
+def test_get_and_set():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire():
+    cache = LRUCache(ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_memory_bound():
+    cache = LRUCache(max_entries=100, max_bytes=10, sizeof=len)
+    cache.set("a", "xxxx")
+    cache.set("b", "xxxx")
+    cache.set("c", "xxxx")
+
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 8
+    cache.set("huge", "x" * 11)
+    assert cache.get("huge") is None
+
+
+class FakeSharedBackend:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ttl):
+        self.data[key] = value
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+def test_concurrent_misses_share_one_load():
+    cache = AsyncReadThroughCache(LRUCache())
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load("key", loader) for _ in range(20)))
+
+    assert asyncio.run(run()) == ["value"] * 20
+    assert len(loads) == 1
+    assert cache.stats()["coalesced"] == 19
+
+
+def test_invalidation_during_load_is_not_cached():
+    cache = AsyncReadThroughCache(LRUCache())
+
+    async def run():
+        async def loader():
+            await asyncio.sleep(0.01)
+            return "stale"
+
+        pending = asyncio.ensure_future(cache.get_or_load("key", loader))
+        await asyncio.sleep(0)
+        await cache.invalidate("key")
+        assert await pending == "stale"
+
+        async def fresh_loader():
+            return "fresh"
+
+        return await cache.get_or_load("key", fresh_loader)
+
+    assert asyncio.run(run()) == "fresh"
+
+
+def test_shared_backend_serves_other_workers():
+    shared = FakeSharedBackend()
+    worker1 = AsyncReadThroughCache(LRUCache(), shared=shared)
+    worker2 = AsyncReadThroughCache(LRUCache(), shared=shared)
+
+    async def loader():
+        return "value"
+
+    async def failing_loader():
+        raise AssertionError("should have been served from the shared backend")
+
+    async def run():
+        await worker1.get_or_load("key", loader)
+        return await worker2.get_or_load("key", failing_loader)
+
+    assert asyncio.run(run()) == "value"
+    assert worker2.stats()["shared_hits"] == 1
+
+
+def test_single_flight_shares_one_execution_between_threads():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def compute(value):
+        calls.append(value)
+        release.wait(1)
+        return value * 2
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", compute, 21))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()["calls"] < 10:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == [42] * 10
+    assert len(calls) == 1
+    assert flight.stats() == {"inflight": 0, "calls": 10, "executions": 1, "coalesced": 9}
+
+    # Nothing is kept once the execution finished.
+    assert flight.do("key", compute, 1) == 2
+    assert len(calls) == 2
+
+
+def test_single_flight_shares_exceptions():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        flight.do("key", fail)
+    assert flight.stats()["inflight"] == 0
+
+
+def test_async_single_flight_survives_caller_cancellation():
+    flight = AsyncSingleFlight()
+    loads = []
+
+    async def run():
+        async def loader():
+            loads.append(1)
+            await asyncio.sleep(0.01)
+            return "value"
+
+        first = asyncio.ensure_future(flight.do("key", loader))
+        others = [asyncio.ensure_future(flight.do("key", loader)) for _ in range(5)]
+        await asyncio.sleep(0)
+        first.cancel()
+        return await asyncio.gather(*others)
+
+    assert asyncio.run(run()) == ["value"] * 5
+    assert len(loads) == 1
+    assert flight.stats()["coalesced"] == 5
+
+
+def test_async_single_flight_forget_starts_a_new_execution():
+    flight = AsyncSingleFlight()
+
+    async def run():
+        async def old():
+            await asyncio.sleep(0.01)
+            return "before write"
+
+        async def new():
+            return "after write"
+
+        pending = asyncio.ensure_future(flight.do("key", old))
+        await asyncio.sleep(0)
+        flight.forget()
+        assert await flight.do("key", new) == "after write"
+        return await pending
+
+    assert asyncio.run(run()) == "before write"
@@ -0,0 +1,145 @@
+import threading
+
+import pytest
+from src.utils import db_pool
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if self.conn.broken:
+            raise Exception("server closed the connection unexpectedly")
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        if self.broken:
+            raise Exception("connection already closed")
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+def make_pool(**kwargs):
+    created = []
+
+    def connect():
+        conn = FakeConnection()
+        created.append(conn)
+        return conn
+
+    options = {"min_size": 0, "max_size": 2, "timeout": 0.05}
+    options.update(kwargs)
+    return db_pool.ConnectionPool(connect, **options), created
+
+
+def test_connections_are_reused():
+    pool, created = make_pool()
+
+    with pool.connection():
+        pass
+    with pool.connection():
+        pass
+
+    assert len(created) == 1
+    assert created[0].commits == 2
+    assert pool.stats()["checkouts"] == 2
+
+
+def test_rollback_on_error():
+    pool, created = make_pool()
+
+    with pytest.raises(RuntimeError):
+        with pool.connection():
+            raise RuntimeError("boom")
+
+    assert created[0].commits == 0
+    assert created[0].rollbacks >= 1
+    assert pool.stats()["idle"] == 1
+
+
+def test_timeout_when_saturated():
+    pool, _ = make_pool(max_size=1)
+    conn = pool.getconn()
+
+    with pytest.raises(db_pool.PoolTimeout):
+        pool.getconn()
+
+    stats = pool.stats()
+    assert stats["in_use"] == 1
+    assert stats["timeouts"] == 1
+    pool.putconn(conn)
+
+
+def test_waiter_gets_returned_connection():
+    pool, created = make_pool(max_size=1, timeout=1.0)
+    conn = pool.getconn()
+    result = {}
+
+    def worker():
+        result["conn"] = pool.getconn()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    pool.putconn(conn)
+    thread.join()
+
+    assert result["conn"] is conn
+    assert len(created) == 1
+    assert pool.stats()["waits"] == 1
+
+
+def test_broken_connection_replaced_on_checkout():
+    pool, created = make_pool(health_check_interval=0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.broken = True
+
+    replacement = pool.getconn()
+
+    assert replacement is not conn
+    assert conn.closed
+    assert pool.stats()["health_check_failures"] == 1
+    assert pool.stats()["size"] == 1
+
+
+def test_idle_connections_recycled_down_to_min_size():
+    pool, created = make_pool(min_size=1, max_idle=0)
+    first, second = pool.getconn(), pool.getconn()
+    pool.putconn(first)
+    pool.putconn(second)
+
+    pool.getconn()
+
+    stats = pool.stats()
+    assert stats["size"] == 1
+    assert stats["recycled"] == 1
+
+
+def test_open_prefills_min_size():
+    pool, created = make_pool(min_size=2)
+    pool.open()
+
+    assert len(created) == 2
+    assert pool.stats()["idle"] == 2
@@ -0,0 +1,223 @@
+import asyncio
+import contextvars
+from contextlib import asynccontextmanager, contextmanager
+
+import psycopg
+import psycopg2
+from src.utils import async_db_utils, db_pool, db_routing, db_utils
+from src.utils.db_routing import ReadYourWritesMiddleware, ReplicaSet
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeCursor:
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if self.pool.error is not None:
+            raise self.pool.error
+        self.pool.queries.append(sql)
+
+    def fetchone(self):
+        return (self.pool.name,)
+
+    def fetchall(self):
+        return [(self.pool.name,)]
+
+
+class FakeConnection:
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self):
+        return FakeCursor(self.pool)
+
+
+class FakePool:
+
+    def __init__(self, name, error=None):
+        self.name = name
+        self.error = error
+        self.queries = []
+
+    @contextmanager
+    def connection(self):
+        yield FakeConnection(self)
+
+
+class FakeAsyncCursor(FakeCursor):
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, params=None):
+        super().execute(sql, params)
+
+    async def fetchone(self):
+        return super().fetchone()
+
+    async def fetchall(self):
+        return super().fetchall()
+
+
+class FakeAsyncPool(FakePool):
+
+    @asynccontextmanager
+    async def connection(self):
+        conn = FakeConnection(self)
+        conn.cursor = lambda: FakeAsyncCursor(self)
+        yield conn
+
+
+def in_request(fn, *args, **kwargs):
+    """Run `fn` in a fresh context, as the middleware does for every request."""
+    context = contextvars.copy_context()
+    context.run(db_routing._read_primary.set, False)
+    context.run(db_routing._request_replicas.set, {})
+    return context.run(fn, *args, **kwargs)
+
+
+def test_replica_set_round_robins_and_skips_ejected_replicas():
+    clock = FakeClock()
+    replicas = ReplicaSet(["a", "b", "c"], eject_seconds=10, clock=clock)
+
+    assert [replicas.choose()[1] for _ in range(4)] == ["a", "b", "c", "a"]
+
+    replicas.eject(1)
+    assert [replicas.choose()[1] for _ in range(3)] == ["c", "a", "c"]
+    assert replicas.stats()["ejected"] == 1
+
+    clock.now = 10
+    assert [replicas.choose()[1] for _ in range(3)] == ["a", "b", "c"]
+
+
+def test_replica_set_falls_back_to_primary():
+    replicas = ReplicaSet(["a"], eject_seconds=10, clock=FakeClock())
+    replicas.eject(0)
+    assert replicas.choose() is None
+
+    assert ReplicaSet([]).choose() is None
+
+    def after_write():
+        db_routing.use_primary()
+        return ReplicaSet(["a"]).choose()
+
+    assert in_request(after_write) is None
+
+
+def test_replica_choice_is_sticky_within_a_request():
+    clock = FakeClock()
+    replicas = ReplicaSet(["a", "b"], eject_seconds=10, clock=clock)
+
+    def two_reads():
+        return replicas.choose()[1], replicas.choose()[1]
+
+    assert in_request(two_reads) == ("a", "a")
+    assert in_request(two_reads) == ("b", "b")
+
+    def read_after_ejection():
+        first = replicas.choose()[1]
+        replicas.eject(0)
+        return first, replicas.choose()[1]
+
+    assert in_request(read_after_ejection) == ("a", "b")
+
+
+def test_sync_reads_go_to_replica_and_writes_pin_the_primary(monkeypatch):
+    primary, replica = FakePool("primary"), FakePool("replica")
+    monkeypatch.setattr(db_pool, "get_pool", lambda: primary)
+    monkeypatch.setattr(db_pool, "get_replicas", lambda: ReplicaSet([replica]))
+
+    def read_write_read():
+        first = db_utils._execute_sql_fetch_one("SELECT 1", (), query="test", replica=True)
+        db_utils._execute_sql_fetch_one("UPDATE news SET views = 1", (), query="test")
+        return first, db_utils._execute_sql_fetch_one("SELECT 1", (), query="test", replica=True)
+
+    assert in_request(read_write_read) == (("replica",), ("primary",))
+
+
+def test_sync_read_falls_back_to_primary_and_ejects_unreachable_replica(monkeypatch):
+    primary = FakePool("primary")
+    replicas = ReplicaSet([FakePool("replica", error=psycopg2.OperationalError("connection refused"))])
+    monkeypatch.setattr(db_pool, "get_pool", lambda: primary)
+    monkeypatch.setattr(db_pool, "get_replicas", lambda: replicas)
+
+    assert in_request(db_utils._execute_sql_fetch_all, "SELECT 1", (), query="test", replica=True) == [("primary",)]
+    assert replicas.stats()["ejected"] == 1
+    assert replicas.stats()["ejections"] == 1
+
+
+def test_async_read_falls_back_to_primary_and_ejects_unreachable_replica(monkeypatch):
+    primary = FakeAsyncPool("primary")
+    healthy = FakeAsyncPool("healthy")
+    replicas = ReplicaSet([FakeAsyncPool("down", error=psycopg.OperationalError("connection refused")), healthy])
+
+    async def get_pool():
+        db_routing.use_primary()
+        return primary
+
+    monkeypatch.setattr(async_db_utils, "_replicas", replicas)
+    monkeypatch.setattr(async_db_utils, "get_pool", get_pool)
+
+    async def reads():
+        first = await async_db_utils._execute_sql_fetch_one("SELECT 1", (), query="test", replica=True)
+        second = await async_db_utils._execute_sql_fetch_all("SELECT 1", (), query="test", replica=True)
+        return first, second
+
+    assert in_request(asyncio.run, reads()) == (("primary",), [("primary",)])
+    assert replicas.stats()["ejected"] == 1
+    # The next request goes to the replica still in the rotation.
+    assert in_request(asyncio.run, reads()) == (("healthy",), [("healthy",)])
+    assert len(healthy.queries) == 2
+
+
+async def run_middleware(method, status=200, headers=()):
+    seen = {}
+    sent = []
+
+    async def app(scope, receive, send):
+        seen["read_primary"] = db_routing.reads_use_primary()
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "headers": list(headers)}
+    await ReadYourWritesMiddleware(app)(scope, None, send)
+    return seen["read_primary"], dict(sent[0]["headers"]).get(b"set-cookie")
+
+
+def test_middleware_sets_cookie_after_successful_writes():
+    read_primary, cookie = asyncio.run(run_middleware("POST"))
+    assert not read_primary
+    assert cookie.startswith(b"read_primary=1; Max-Age=")
+
+    assert asyncio.run(run_middleware("DELETE", status=404))[1] is None
+    assert asyncio.run(run_middleware("GET"))[1] is None
+
+
+def test_middleware_reads_primary_for_cookie_or_header():
+    assert asyncio.run(run_middleware("GET", headers=[(b"cookie", b"theme=dark; read_primary=1")]))[0]
+    assert asyncio.run(run_middleware("GET", headers=[(b"x-read-primary", b"1")]))[0]
+    assert not asyncio.run(run_middleware("GET", headers=[(b"cookie", b"theme=dark")]))[0]
+    assert not db_routing.reads_use_primary()
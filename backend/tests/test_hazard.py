@@ -0,0 +1,124 @@
+import asyncio
+import multiprocessing
+
+import pytest
+from src import events_handler, hazard_handler, map_handler
+
+SQUARE = [[53.3460, -6.2700], [53.3460, -6.2500], [53.3420, -6.2500], [53.3420, -6.2700]]
+
+
+@pytest.fixture(autouse=True)
+def empty_index(monkeypatch):
+    monkeypatch.setattr(hazard_handler, "_index", hazard_handler.GridIndex())
+    map_handler._route_cache.clear()
+
+
+def test_create_hazard_indexes_closed_ring(monkeypatch):
+    stored = {}
+
+    async def fake_add_hazard_to_db(name, polygon):
+        stored["polygon"] = polygon
+        return "hazard_test_id"
+
+    monkeypatch.setattr(hazard_handler.async_db_utils, "add_hazard_to_db", fake_add_hazard_to_db)
+
+    hazard_id = asyncio.run(hazard_handler.create_hazard("Flood", SQUARE))
+
+    assert hazard_id == "hazard_test_id"
+    assert stored["polygon"][0] == stored["polygon"][-1]
+    assert [area.key for area in hazard_handler.hazards_near((53.344, -6.26), (53.344, -6.26))] == ["hazard_test_id"]
+
+
+def test_delete_hazard_removes_from_index(monkeypatch):
+    hazard_handler._index.insert("hazard1", SQUARE)
+
+    async def fake_delete_hazard(hazard_id):
+        return {"message": "deleted"}
+
+    monkeypatch.setattr(hazard_handler.async_db_utils, "delete_hazard", fake_delete_hazard)
+
+    asyncio.run(hazard_handler.delete_hazard("hazard1"))
+    assert hazard_handler.hazards_near((53.344, -6.26), (53.344, -6.26)) == []
+
+
+def test_route_map_avoids_indexed_hazards(monkeypatch):
+    hazard_handler._index.insert("hazard1", SQUARE + [SQUARE[0]])
+    calls = []
+
+    def fake_fetch_route_from_api(origin, destination, hazards=()):
+        calls.append(map_handler._here_avoid_areas(hazards, (0, 0), (0, 0)))
+        return [(53.3441, -6.2573), (53.3430, -6.2672)]
+
+    monkeypatch.setattr(map_handler, "fetch_route_from_api", fake_fetch_route_from_api)
+
+    result = map_handler.get_evacuate_map("53.3441,-6.2573", "53.3430,-6.2672")
+
+    assert calls == ["bbox:-6.27,53.342,-6.25,53.346"]
+    assert result["restrict_areas"][0] == (53.3460, -6.2700)
+    assert result["route_hazards"] == ["hazard1"]
+
+
+def _second_worker(conn, hazards_db, ready):
+    """A forked worker whose only link to the first one is the NOTIFY channel, played by `conn`."""
+
+    async def listen(channel):
+        yield None
+        ready.set()
+        while True:
+            if conn.poll():
+                yield conn.recv()
+            else:
+                await asyncio.sleep(0.01)
+
+    async def get_hazard_list():
+        return [(hazard_id, "Flood", polygon, None, None) for hazard_id, polygon in hazards_db.items()]
+
+    async def get_hazard_by_id(hazard_id):
+        return hazard_id, "Flood", hazards_db[hazard_id], None, None
+
+    hazard_handler.async_db_utils.listen = listen
+    hazard_handler.async_db_utils.get_hazard_list = get_hazard_list
+    hazard_handler.async_db_utils.get_hazard_by_id = get_hazard_by_id
+
+    async def run():
+        listener = asyncio.create_task(events_handler._listen())
+        for _ in range(500):
+            if hazard_handler.hazards_near((53.344, -6.26), (53.344, -6.26)):
+                break
+            await asyncio.sleep(0.01)
+        listener.cancel()
+        return [area.key for area in hazard_handler.hazards_near((53.344, -6.26), (53.344, -6.26))]
+
+    conn.send(asyncio.run(run()))
+
+
+def test_hazard_created_on_one_worker_is_indexed_by_another(monkeypatch):
+    context = multiprocessing.get_context("fork")
+    with context.Manager() as manager:
+        hazards_db = manager.dict()
+        ready = context.Event()
+        channel, worker_end = context.Pipe()
+        worker = context.Process(target=_second_worker, args=(worker_end, hazards_db, ready))
+        worker.start()
+        try:
+            assert ready.wait(10)
+
+            async def fake_add_hazard_to_db(name, polygon):
+                hazards_db["hazard_test_id"] = polygon
+                return "hazard_test_id"
+
+            async def fake_notify(channel_name, payload):
+                channel.send(payload)
+
+            monkeypatch.setattr(hazard_handler.async_db_utils, "add_hazard_to_db", fake_add_hazard_to_db)
+            monkeypatch.setattr(events_handler.async_db_utils, "notify", fake_notify)
+            monkeypatch.setattr(events_handler, "_listener", object())  # Cross-worker delivery is on.
+
+            asyncio.run(hazard_handler.create_hazard("Flood", SQUARE))
+
+            assert channel.poll(10)
+            assert channel.recv() == ["hazard_test_id"]
+        finally:
+            worker.join(10)
+            if worker.is_alive():
+                worker.terminate()
@@ -0,0 +1,126 @@
+import pytest
+import requests
+from src.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from src.utils.here_client import HereRoutingClient, RoutingUnavailable
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeResponse:
+
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self._payload = payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error", response=self)
+
+    def json(self):
+        return self._payload
+
+
+class FakeSession:
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.timeouts = []
+
+    def get(self, url, params=None, timeout=None):
+        self.timeouts.append(timeout)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def test_breaker_opens_after_consecutive_failures_and_probes_after_reset():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+
+    breaker.before_call()
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now = 10
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # Only one probe at a time.
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now = 20
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.stats() == {"state": "closed", "failures": 0, "opened": 2, "rejected": 2}
+
+
+def test_client_retries_server_errors_then_succeeds(monkeypatch):
+    monkeypatch.setattr("src.utils.here_client.time.sleep", lambda seconds: None)
+    session = FakeSession([requests.ConnectionError("refused"), FakeResponse(503), FakeResponse(200, {"ok": 1})])
+    client = HereRoutingClient("http://here", session, retries=2, backoff=0.01)
+
+    assert client.get_route({}) == {"ok": 1}
+    assert client.stats()["retries"] == 2
+    assert client.stats()["circuit"]["state"] == "closed"
+
+
+def test_client_does_not_retry_client_errors():
+    client = HereRoutingClient("http://here", FakeSession([FakeResponse(401)]), retries=2)
+
+    with pytest.raises(requests.HTTPError):
+        client.get_route({})
+    assert client.stats()["retries"] == 0
+
+
+def test_client_fails_fast_while_circuit_is_open(monkeypatch):
+    monkeypatch.setattr("src.utils.here_client.time.sleep", lambda seconds: None)
+    session = FakeSession([requests.Timeout("slow")] * 2)
+    client = HereRoutingClient("http://here", session, retries=1, breaker=CircuitBreaker(failure_threshold=2))
+
+    with pytest.raises(RoutingUnavailable):
+        client.get_route({})
+    with pytest.raises(RoutingUnavailable):
+        client.get_route({})
+    assert len(session.timeouts) == 2
+    assert client.stats()["circuit"]["rejected"] == 1
+
+
+def test_client_timeouts_are_capped_by_the_budget():
+    session = FakeSession([FakeResponse(200, {})])
+    client = HereRoutingClient("http://here", session, connect_timeout=3, read_timeout=10, budget=1)
+
+    client.get_route({})
+    connect, read = session.timeouts[0]
+    assert connect <= 1 and read <= 1
+
+
+def test_client_gives_up_when_the_backoff_overshoots_the_budget(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr("src.utils.here_client.time.monotonic", clock)
+    monkeypatch.setattr("src.utils.here_client.random.uniform", lambda low, high: 0.5)
+
+    def oversleep(seconds):
+        clock.now += 2
+
+    monkeypatch.setattr("src.utils.here_client.time.sleep", oversleep)
+    session = FakeSession([requests.Timeout("slow"), FakeResponse(200, {})])
+    client = HereRoutingClient("http://here", session, budget=1, retries=2)
+
+    with pytest.raises(RoutingUnavailable):
+        client.get_route({})
+    assert len(session.timeouts) == 1
+    assert client.stats()["budget_exhausted"] == 1
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from src.utils.http_cache import is_not_modified, make_etag, validator_headers
+
+
+def test_validator_headers_format_last_modified_in_gmt():
+    headers = validator_headers('W/"abc"', datetime(2025, 3, 1, 12, 30, 15, 123456))
+    assert headers["ETag"] == 'W/"abc"'
+    assert headers["Last-Modified"] == "Sat, 01 Mar 2025 12:30:15 GMT"
+    assert headers["Cache-Control"] == "no-cache"
+
+
+def test_if_none_match_uses_weak_comparison():
+    etag = make_etag("news", 3)
+    assert is_not_modified({"if-none-match": etag}, etag)
+    assert is_not_modified({"if-none-match": f'"other", {etag.removeprefix("W/")}'}, etag)
+    assert is_not_modified({"if-none-match": "*"}, etag)
+    assert not is_not_modified({"if-none-match": make_etag("news", 4)}, etag)
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    modified = datetime(2025, 3, 1, 12, 0, 0)
+    headers = {"if-none-match": '"stale"', "if-modified-since": "Sat, 01 Mar 2025 13:00:00 GMT"}
+    assert not is_not_modified(headers, make_etag("news", 1), modified)
+
+
+def test_if_modified_since():
+    modified = datetime(2025, 3, 1, 12, 0, 0, 500000)
+    etag = make_etag("news", 1)
+    assert is_not_modified({"if-modified-since": "Sat, 01 Mar 2025 12:00:00 GMT"}, etag, modified)
+    assert not is_not_modified({"if-modified-since": "Sat, 01 Mar 2025 11:59:59 GMT"}, etag, modified)
+    assert not is_not_modified({"if-modified-since": "not a date"}, etag, modified)
+    assert not is_not_modified({}, etag, modified)
@@ -0,0 +1,33 @@
+import time
+import uuid
+
+from src.utils import ids
+from src.utils.db_utils import _generate_id
+
+
+def test_uuid7_layout():
+    value = ids.uuid7()
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+    assert abs((value.int >> 80) / 1000 - time.time()) < 5
+
+
+def test_keys_sort_in_creation_order():
+    keys = [ids.time_ordered_key() for _ in range(10000)]
+    assert keys == sorted(keys)
+    assert len(set(keys)) == len(keys)
+    assert all(len(key) == ids.ENCODED_LENGTH for key in keys)
+
+
+def test_encode_base32_preserves_order():
+    values = [0, 1, 31, 32, 2**64, 2**127, 2**128 - 1]
+    encoded = [ids.encode_base32(value) for value in values]
+    assert encoded == sorted(encoded)
+    assert encoded[0] == "0" * 26
+
+
+def test_generated_ids_keep_prefixes_and_order():
+    first, second = _generate_id("news"), _generate_id("news")
+    assert first.startswith("news_") and len(first) <= 50
+    assert first < second
+    assert _generate_id("user").startswith("user_")
@@ -0,0 +1,176 @@
+import json
+import threading
+import time
+
+import flexpolyline as fp
+import pytest
+import requests
+from src import map_handler
+from src.utils.here_client import RoutingUnavailable
+
+
+@pytest.fixture(autouse=True)
+def clear_route_cache():
+    map_handler._route_cache.clear()
+    map_handler._last_good_routes.clear()
+
+
+def test_route_cache_shares_nearby_requests(monkeypatch):
+    calls = []
+
+    def fake_fetch_route_from_api(origin, destination, hazards=()):
+        calls.append((origin, destination))
+        return [(53.3441, -6.2573), (53.3430, -6.2672)]
+
+    monkeypatch.setattr(map_handler, "fetch_route_from_api", fake_fetch_route_from_api)
+
+    first = map_handler.get_evacuate_map("53.34411,-6.25731", "53.3430,-6.2672")
+    second = map_handler.get_evacuate_map("53.34409,-6.25729", "53.3430,-6.2672")
+
+    assert len(calls) == 1
+    assert first["route_map"] == second["route_map"]
+    assert map_handler.route_cache_stats()["hits"] == 1
+
+
+def test_concurrent_identical_requests_share_one_upstream_call(monkeypatch):
+    calls = []
+
+    def fake_fetch_route_from_api(origin, destination, hazards=()):
+        calls.append((origin, destination))
+        time.sleep(0.05)
+        return [(53.3441, -6.2573), (53.3430, -6.2672)]
+
+    monkeypatch.setattr(map_handler, "fetch_route_from_api", fake_fetch_route_from_api)
+
+    results = []
+
+    def request():
+        results.append(map_handler.get_evacuate_map("53.3441,-6.2573", "53.3430,-6.2672"))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 8
+    assert map_handler.route_cache_stats()["coalescing"]["inflight"] == 0
+
+
+def test_last_good_route_served_stale_while_here_is_down(monkeypatch):
+    route = [(53.3441, -6.2573), (53.3430, -6.2672)]
+    monkeypatch.setattr(map_handler, "fetch_route_from_api", lambda origin, destination, hazards=(): route)
+    fresh = map_handler.get_evacuate_map("53.3441,-6.2573", "53.3430,-6.2672")
+    assert fresh["stale"] is False
+
+    def unavailable(origin, destination, hazards=()):
+        raise RoutingUnavailable("circuit open")
+
+    monkeypatch.setattr(map_handler, "fetch_route_from_api", unavailable)
+    map_handler._route_cache.clear()
+
+    stale = map_handler.get_evacuate_map("53.3441,-6.2573", "53.3430,-6.2672", encoded=True)
+    assert stale["stale"] is True
+    assert fp.decode(stale["route_polyline"]) == pytest.approx(route, abs=1e-5)
+
+    # Stale routes are not cached, and unknown trips still fail.
+    assert len(map_handler._route_cache) == 0
+    with pytest.raises(RoutingUnavailable):
+        map_handler.get_evacuate_map("53.3500,-6.2500", "53.3430,-6.2672")
+
+
+def test_invalid_coordinates_rejected():
+    with pytest.raises(ValueError):
+        map_handler.get_evacuate_map("not-a-point", "53.3430,-6.2672")
+    with pytest.raises(ValueError):
+        map_handler.get_evacuate_map("91,0", "53.3430,-6.2672")
+    with pytest.raises(ValueError):
+        map_handler.get_evacuate_map("-89,-179", "89,179")  # Beyond MAX_TRIP_SPAN_DEG.
+
+
+def test_batch_deduplicates_and_keeps_order(monkeypatch):
+    calls = []
+
+    def fake_fetch_route_from_api(origin, destination, hazards=()):
+        calls.append((origin, destination))
+        time.sleep(0.05)
+        return [tuple(map(float, origin.split(","))), tuple(map(float, destination.split(",")))]
+
+    monkeypatch.setattr(map_handler, "fetch_route_from_api", fake_fetch_route_from_api)
+    pairs = [(f"53.{3400 + i},-6.2573", "53.3430,-6.2672") for i in range(10)]
+    pairs += [pairs[0], ("bad", "53.3430,-6.2672")]
+
+    started = time.monotonic()
+    results = map_handler.get_evacuate_maps(pairs)
+    elapsed = time.monotonic() - started
+
+    assert len(calls) == 10
+    assert elapsed < 0.3
+    assert results[3]["route_map"][0] == (53.3403, -6.2573)
+    assert results[10] == results[0]
+    assert "error" in results[11]
+
+
+def test_zoom_simplifies_and_polyline_encodes(monkeypatch):
+    # A straight east-west street sampled every ~7 m with one real corner.
+    straight = [(53.3440, round(-6.2700 + 0.0001 * i, 4)) for i in range(100)]
+    route = straight + [(round(53.3440 + 0.0001 * i, 4), straight[-1][1]) for i in range(1, 50)]
+
+    def fake_fetch_route_from_api(origin, destination, hazards=()):
+        return route
+
+    monkeypatch.setattr(map_handler, "fetch_route_from_api", fake_fetch_route_from_api)
+
+    full = map_handler.get_evacuate_map("53.3440,-6.2700", "53.3489,-6.2601")
+    simplified = map_handler.get_evacuate_map("53.3440,-6.2700", "53.3489,-6.2601", zoom=14)
+    encoded = map_handler.get_evacuate_map("53.3440,-6.2700", "53.3489,-6.2601", encoded=True)
+
+    assert full["route_map"] == route
+    assert simplified["route_map"] == [route[0], straight[-1], route[-1]]
+    assert "route_map" not in encoded
+    assert fp.decode(encoded["route_polyline"]) == route
+
+
+def test_batch_errors_never_contain_the_here_api_key(monkeypatch):
+    monkeypatch.setenv("API_KEY", "secret-here-key")
+
+    class RejectingSession:
+
+        def get(self, url, params=None, timeout=None):
+            # requests puts the full URL, query string included, in HTTPError messages.
+            response = requests.Response()
+            response.status_code = 401
+            response.url = requests.Request("GET", url, params=params).prepare().url
+            return response
+
+    monkeypatch.setattr(map_handler._here_client, "session", RejectingSession())
+    monkeypatch.setattr(map_handler, "ROAD_GRAPH_PATH", None)
+
+    results = map_handler.get_evacuate_maps([("53.3441,-6.2573", "53.3430,-6.2672")])
+
+    assert results == [{"error": "HTTP 401"}]
+    assert "secret-here-key" not in json.dumps(results)
+
+
+def test_rejected_route_is_not_served_stale_and_never_logs_the_here_api_key(monkeypatch, caplog):
+    route = [(53.3441, -6.2573), (53.3430, -6.2672)]
+    monkeypatch.setattr(map_handler, "ROAD_GRAPH_PATH", None)
+    map_handler._last_good_routes.set((map_handler._quantize("53.3441,-6.2573"), map_handler._quantize("53.3430,-6.2672")),
+                                      route)
+    monkeypatch.setenv("API_KEY", "secret-here-key")
+
+    class RejectingSession:
+
+        def get(self, url, params=None, timeout=None):
+            response = requests.Response()
+            response.status_code = 403
+            response.url = requests.Request("GET", url, params=params).prepare().url
+            return response
+
+    monkeypatch.setattr(map_handler._here_client, "session", RejectingSession())
+
+    with caplog.at_level("DEBUG"), pytest.raises(requests.HTTPError):
+        map_handler.get_evacuate_map("53.3441,-6.2573", "53.3430,-6.2672")
+
+    assert "secret-here-key" not in caplog.text
@@ -0,0 +1,41 @@
+from prometheus_client import REGISTRY
+from src.utils import db_utils, metrics
+
+
+class _FakeCursor:
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, sql, params):
+        pass
+
+    def fetchall(self):
+        return self.rows
+
+
+def _sample(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_db_helpers_label_queries_with_the_given_name():
+    labels = {"query": "get_recent_reports", "driver": "psycopg2"}
+    count = _sample("db_query_duration_seconds_count", labels)
+    rows = _sample("db_query_rows_total", labels)
+
+    def fetch_reports():
+        return db_utils._execute_sql_fetch_all("SELECT 1", (),
+                                               query="get_recent_reports",
+                                               cursor=_FakeCursor([(1,), (2,), (3,)]))
+
+    assert fetch_reports() == [(1,), (2,), (3,)]
+    assert _sample("db_query_duration_seconds_count", labels) == count + 1
+    assert _sample("db_query_rows_total", labels) == rows + 3
+
+
+def test_saturation_gauges_are_sampled_at_scrape_time():
+    state = {"in_use": 2}
+    metrics.register_saturation("test_pool", lambda: dict(state))
+    assert REGISTRY.get_sample_value("test_pool_in_use") == 2
+    state["in_use"] = 5
+    assert REGISTRY.get_sample_value("test_pool_in_use") == 5
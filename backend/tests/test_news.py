@@ -1,9 +1,14 @@
+import asyncio
+import json
+from datetime import datetime
+
 import pytest
 from src import news_handler
+from src.utils import db_utils
 
 def test_create_news(monkeypatch):
     # Fake db_utils.add_news_to_db returns a dummy news_id.
-    def fake_add_news_to_db(author_id, cover_link, title, subtitle, location, views=0):
+    def fake_add_news_to_db(author_id, cover_link, title, subtitle, location, views=0, latitude=None, longitude=None):
         return "news_test_id"
     
     monkeypatch.setattr(news_handler.db_utils, "add_news_to_db", fake_add_news_to_db)
@@ -41,25 +46,362 @@ def test_get_news(monkeypatch):
     assert result == fake_news
 
 
-def test_update_news(monkeypatch):
+def test_update_news_async(monkeypatch):
     fake_updated_news = ("news1", "link_updated", "title_updated", "subtitle_updated", "location_updated", 5)
-    
-    def fake_update_news(news_id, cover_link, title, subtitle, location, views):
+
+    async def fake_update_news(news_id, cover_link, title, subtitle, location, views, latitude=None, longitude=None):
         return fake_updated_news
-    
-    monkeypatch.setattr(news_handler.db_utils, "update_news", fake_update_news)
-    
-    result = news_handler.update_news("news1", "link_updated", "title_updated", "subtitle_updated", "location_updated", 5)
+
+    monkeypatch.setattr(news_handler.async_db_utils, "update_news", fake_update_news)
+
+    result = asyncio.run(
+        news_handler.update_news_async("news1", "link_updated", "title_updated", "subtitle_updated",
+                                       "location_updated", 5))
     assert result == fake_updated_news
 
 
-def test_delete_news(monkeypatch):
+def test_delete_news_async(monkeypatch):
     fake_delete_message = {"message": "News with news1 successfully deleted."}
-    
-    def fake_delete_news(news_id):
+
+    async def fake_delete_news(news_id):
         return fake_delete_message
-    
-    monkeypatch.setattr(news_handler.db_utils, "delete_news", fake_delete_news)
-    
-    result = news_handler.delete_news("news1")
-    assert result == fake_delete_message
\ No newline at end of file
+
+    monkeypatch.setattr(news_handler.async_db_utils, "delete_news", fake_delete_news)
+
+    result = asyncio.run(news_handler.delete_news_async("news1"))
+    assert result == fake_delete_message
+
+def test_get_news_list_async(monkeypatch):
+    fake_news_list = [("news1", "author1", "link1", "title1", "subtitle1", "location1", 0)]
+
+    async def fake_get_news_list():
+        return fake_news_list
+
+    monkeypatch.setattr(news_handler.async_db_utils, "get_news_list", fake_get_news_list)
+
+    result = asyncio.run(news_handler.get_news_list_async())
+    assert result == fake_news_list
+
+
+def test_get_news_async_not_found(monkeypatch):
+    async def fake_get_news_with_version(news_id):
+        raise ValueError(f"News with news_id {news_id} not found.")
+
+    monkeypatch.setattr(news_handler.async_db_utils, "get_news_with_version", fake_get_news_with_version)
+
+    with pytest.raises(ValueError):
+        asyncio.run(news_handler.get_news_async("missing"))
+
+
+def test_get_news_page_returns_cursor(monkeypatch):
+    published = [datetime(2025, 3, 1, 12, 0, i) for i in range(3)]
+    fake_rows = [(f"news{i}", "author", "link", "title", "sub", published[i], "loc", 0) for i in (2, 1, 0)]
+    calls = []
+
+    def fake_get_news_page(limit, after=None, fields=None):
+        calls.append(after)
+        return db_utils.NEWS_COLUMNS, fake_rows[:limit + 1]
+
+    monkeypatch.setattr(news_handler.db_utils, "get_news_page", fake_get_news_page)
+
+    page = news_handler.get_news_page(limit=2)
+    assert page["news"] == fake_rows[:2]
+    assert page["next_cursor"]
+
+    news_handler.get_news_page(limit=2, cursor=page["next_cursor"])
+    assert calls[-1] == (published[1], "news1")
+
+
+def test_get_news_page_projects_fields(monkeypatch):
+    published = datetime(2025, 3, 1, 12, 0, 0)
+
+    def fake_get_news_page(limit, after=None, fields=None):
+        return ("title", "published_at", "news_id"), [("title1", published, "news1")]
+
+    monkeypatch.setattr(news_handler.db_utils, "get_news_page", fake_get_news_page)
+
+    page = news_handler.get_news_page(limit=10, fields="title")
+    assert page == {"news": [{"title": "title1"}], "next_cursor": None}
+
+
+def test_concurrent_identical_news_pages_share_one_query(monkeypatch):
+    published = datetime(2025, 3, 1, 12, 0, 0)
+    calls = []
+
+    async def fake_get_news_page(limit, after=None, fields=None):
+        calls.append((limit, after, fields))
+        await asyncio.sleep(0.01)
+        return db_utils.NEWS_COLUMNS, [("news1", "author", "link", "title", "sub", published, "loc", 0)]
+
+    async def fake_add_news_to_db(*args):
+        return "news_new"
+
+    async def fake_publish(event_type, **data):
+        pass
+
+    monkeypatch.setattr(news_handler.async_db_utils, "get_news_page", fake_get_news_page)
+    monkeypatch.setattr(news_handler.async_db_utils, "add_news_to_db", fake_add_news_to_db)
+    monkeypatch.setattr(news_handler.events_handler, "publish", fake_publish)
+
+    async def run():
+        pages = await asyncio.gather(*(news_handler.get_news_page_async(limit=10) for _ in range(20)),
+                                     news_handler.get_news_page_async(limit=20))
+        # A page requested after a write does not join a query started before it.
+        pending = asyncio.ensure_future(news_handler.get_news_page_async(limit=10))
+        await asyncio.sleep(0)
+        await news_handler.create_news_async(1, "link", "title", "sub", "loc")
+        await asyncio.gather(pending, news_handler.get_news_page_async(limit=10))
+        return pages
+
+    pages = asyncio.run(run())
+    assert all(page == pages[0] for page in pages)
+    assert [limit for limit, _, _ in calls] == [10, 20, 10, 10]
+
+
+def test_get_news_batch_keys_by_id_and_reports_missing(monkeypatch):
+    calls = []
+
+    async def fake_get_news_batch(news_ids, include_details=False):
+        calls.append((news_ids, include_details))
+        columns = db_utils.NEWS_COLUMNS + ("summary",)
+        return columns, [("news2", "a", "l", "t2", "s", None, "loc", 0, None, None, None),
+                         ("news1", "a", "l", "t1", "s", None, "loc", 0, None, None, "Summary 1")]
+
+    monkeypatch.setattr(news_handler.async_db_utils, "get_news_batch", fake_get_news_batch)
+
+    batch = asyncio.run(news_handler.get_news_batch_async("news1, news2,news3,news1", include="details"))
+
+    assert calls == [(["news1", "news2", "news3"], True)]
+    assert batch["news"]["news1"]["summary"] == "Summary 1"
+    assert batch["news"]["news2"]["title"] == "t2"
+    assert batch["missing"] == ["news3"]
+
+
+def test_get_news_batch_rejects_bad_input():
+    with pytest.raises(ValueError):
+        asyncio.run(news_handler.get_news_batch_async(" , "))
+    with pytest.raises(ValueError):
+        asyncio.run(news_handler.get_news_batch_async("news1", include="comments"))
+    with pytest.raises(ValueError):
+        asyncio.run(news_handler.get_news_batch_async(",".join(f"news{i}" for i in range(news_handler.MAX_BATCH_IDS + 1))))
+
+
+def test_news_batch_query_joins_details_with_any():
+    sql, params, columns = db_utils._news_batch_query(["news1", "news2"], include_details=True)
+    assert "= ANY(%s)" in sql and "LEFT JOIN news_details" in sql
+    assert params == (["news1", "news2"],)
+    assert columns[-1] == "summary"
+    sql, _, columns = db_utils._news_batch_query(["news1"])
+    assert "news_details" not in sql and columns == db_utils.NEWS_COLUMNS
+
+
+def test_get_news_page_rejects_bad_input():
+    with pytest.raises(ValueError):
+        news_handler.get_news_page(cursor="not-a-cursor")
+    with pytest.raises(ValueError):
+        db_utils._news_page_query(10, fields=["password"])
+
+
+def test_export_news_ndjson(monkeypatch):
+    published = datetime(2025, 3, 1, 12, 0, 0)
+    batches = [
+        [("news1", "author1", "link1", "title1", "sub1", published, "loc1", 0)],
+        [("news2", "author2", "link2", "title2", "sub2", published, "loc2", 3)],
+    ]
+
+    async def fake_iter_news_batches(batch_size=1000):
+        for batch in batches:
+            yield batch
+
+    monkeypatch.setattr(news_handler.async_db_utils, "iter_news_batches", fake_iter_news_batches)
+
+    async def collect():
+        return [chunk async for chunk in news_handler.export_news_ndjson()]
+
+    chunks = asyncio.run(collect())
+    lines = b"".join(chunks).decode().splitlines()
+    assert len(chunks) == 2
+    assert json.loads(lines[1]) == {
+        "news_id": "news2",
+        "author_id": "author2",
+        "cover_link": "link2",
+        "title": "title2",
+        "subtitle": "sub2",
+        "published_at": "2025-03-01T12:00:00",
+        "location": "loc2",
+        "views": 3,
+    }
+
+
+def test_add_news_bulk_keeps_input_order(monkeypatch):
+    captured = {}
+
+    def fake_batch_execute(sql, params, *, query, cursor=None, returning=True, page_size=1000):
+        captured["params"] = params
+        return []
+
+    monkeypatch.setattr(db_utils, "_batch_execute_sql_fetch_all", fake_batch_execute)
+    items = [("author1", "link", f"title{i}", "sub", "loc", 0) for i in range(3)]
+
+    news_ids = news_handler.create_news_bulk(items)
+
+    assert len(set(news_ids)) == 3
+    assert [row[0] for row in captured["params"]] == news_ids
+    assert [row[3] for row in captured["params"]] == ["title0", "title1", "title2"]
+
+
+def test_get_news_async_is_cached_until_update(monkeypatch):
+    news_handler._news_cache.local.clear()
+    reads = []
+
+    async def fake_get_news_with_version(news_id):
+        reads.append(news_id)
+        return (news_id, "author1", "link1", f"title{len(reads)}", "subtitle1", "location1", 0), len(reads), None
+
+    async def fake_update_news(news_id, cover_link, title, subtitle, location, views, latitude=None, longitude=None):
+        return (news_id, cover_link, title, subtitle, location, views)
+
+    monkeypatch.setattr(news_handler.async_db_utils, "get_news_with_version", fake_get_news_with_version)
+    monkeypatch.setattr(news_handler.async_db_utils, "update_news", fake_update_news)
+
+    async def run():
+        first = await news_handler.get_news_async("news_cached")
+        second = await news_handler.get_news_async("news_cached")
+        await news_handler.update_news_async("news_cached", "link", "new title", "sub", "loc", 0)
+        third = await news_handler.get_news_async("news_cached")
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert first == second
+    assert third[3] == "title2"
+    assert len(reads) == 2
+
+
+def test_news_item_etag_changes_with_version(monkeypatch):
+    news_handler._news_cache.local.clear()
+    versions = iter([1, 2])
+
+    async def fake_get_news_with_version(news_id):
+        return (news_id, "author1", "link1", "title", "sub", "loc", 0), next(versions), datetime(2025, 3, 1, 12)
+
+    async def fake_update_news(news_id, cover_link, title, subtitle, location, views, latitude=None, longitude=None):
+        return (news_id, cover_link, title, subtitle, location, views)
+
+    monkeypatch.setattr(news_handler.async_db_utils, "get_news_with_version", fake_get_news_with_version)
+    monkeypatch.setattr(news_handler.async_db_utils, "update_news", fake_update_news)
+
+    async def run():
+        _, first, _ = await news_handler.get_news_with_validators_async("news_etag")
+        _, cached, _ = await news_handler.get_news_with_validators_async("news_etag")
+        await news_handler.update_news_async("news_etag", "link", "new", "sub", "loc", 0)
+        _, updated, _ = await news_handler.get_news_with_validators_async("news_etag")
+        return first, cached, updated
+
+    first, cached, updated = asyncio.run(run())
+    assert first == cached
+    assert first != updated
+
+
+def test_news_page_etag_depends_on_table_version_and_query(monkeypatch):
+    versions = iter([(7, datetime(2025, 3, 1))] * 3 + [(8, datetime(2025, 3, 2))])
+
+    async def fake_get_table_version(table_name):
+        return next(versions)
+
+    monkeypatch.setattr(news_handler.async_db_utils, "get_table_version", fake_get_table_version)
+
+    async def run():
+        return [
+            await news_handler.get_news_page_validators_async(10),
+            await news_handler.get_news_page_validators_async(10),
+            await news_handler.get_news_page_validators_async(20),
+            await news_handler.get_news_page_validators_async(10),
+        ]
+
+    same, again, other_limit, changed = [etag for etag, _ in asyncio.run(run())]
+    assert same == again
+    assert same != other_limit
+    assert same != changed
+
+
+def test_search_news_pages_by_rank(monkeypatch):
+    published = datetime(2025, 3, 1, 12, 0, 0)
+    columns = db_utils.NEWS_COLUMNS + ("rank", "snippet")
+    fake_rows = [(f"news{i}", "author", "link", "Flood on Dame Street", "sub", published, "Dublin", 0, None, None, rank,
+                  "Flood on <mark>Dame</mark> Street") for i, rank in ((3, 0.9), (2, 0.5), (1, 0.5))]
+    calls = []
+
+    async def fake_search_news(text, limit, after=None):
+        calls.append((text, after))
+        return columns, fake_rows[:limit + 1]
+
+    monkeypatch.setattr(news_handler.async_db_utils, "search_news", fake_search_news)
+
+    page = asyncio.run(news_handler.search_news_async("  dame street ", limit=2))
+    assert [item["news_id"] for item in page["news"]] == ["news3", "news2"]
+    assert page["news"][0]["snippet"] == "Flood on <mark>Dame</mark> Street"
+
+    asyncio.run(news_handler.search_news_async("dame street", limit=2, cursor=page["next_cursor"]))
+    assert calls == [("dame street", None), ("dame street", (0.5, "news2"))]
+
+    with pytest.raises(ValueError):
+        asyncio.run(news_handler.search_news_async("   "))
+
+
+def test_news_search_query_orders_params_like_placeholders():
+    sql, params, columns = db_utils._news_search_query("flood", 10, after=(0.5, "news2"))
+    assert sql.count("%s") == len(params)
+    assert params[1] == "flood"
+    assert params[-3:] == (0.5, "news2", 11)
+    assert columns[-2:] == ("rank", "snippet")
+
+
+def test_get_news_nearby_pages_by_distance(monkeypatch):
+    published = datetime(2025, 3, 1, 12, 0, 0)
+    columns = db_utils.NEWS_COLUMNS + ("distance_m",)
+    fake_rows = [(f"news{i}", "author", "link", "title", "sub", published, "loc", 0, 53.34, -6.26, distance)
+                 for i, distance in ((1, 10.0), (2, 250.5), (3, 900.0))]
+    calls = []
+
+    async def fake_get_news_nearby(lat, lng, radius_m, limit, after=None):
+        calls.append((radius_m, after))
+        return columns, fake_rows[:limit + 1]
+
+    monkeypatch.setattr(news_handler.async_db_utils, "get_news_nearby", fake_get_news_nearby)
+
+    page = asyncio.run(news_handler.get_news_nearby_async(53.34, -6.26, 10 ** 9, limit=2))
+    assert [item["distance_m"] for item in page["news"]] == [10.0, 250.5]
+
+    asyncio.run(news_handler.get_news_nearby_async(53.34, -6.26, 2000, limit=2, cursor=page["next_cursor"]))
+    assert calls == [(news_handler.MAX_NEARBY_RADIUS_M, None), (2000, (250.5, "news2"))]
+
+
+def test_news_nearby_query_orders_params_like_placeholders():
+    sql, params, columns = db_utils._news_nearby_query(53.34, -6.26, 2000, 10, after=(250.5, "news2"))
+    assert sql.count("%s") == len(params)
+    assert params == (53.34, -6.26, 53.34, -6.26, 2000, 2000, 250.5, "news2", 11)
+    assert columns[-1] == "distance_m"
+
+
+def test_news_changes_from_other_workers_invalidate_the_item_cache(monkeypatch):
+    news_handler._news_cache.local.clear()
+    reads = []
+
+    async def fake_get_news_with_version(news_id):
+        reads.append(news_id)
+        return (news_id, "author1", "link1", f"title{len(reads)}", "subtitle1", "location1", 0), len(reads), None
+
+    monkeypatch.setattr(news_handler.async_db_utils, "get_news_with_version", fake_get_news_with_version)
+
+    async def run():
+        first = await news_handler.get_news_async("news_remote")
+        # Another worker updated the item; its NOTIFY reaches this worker's listener.
+        await news_handler.events_handler._dispatch({"type": "news.updated", "id": "news_remote"})
+        second = await news_handler.get_news_async("news_remote")
+        await news_handler._clear_news_cache()  # The listener reconnected.
+        third = await news_handler.get_news_async("news_remote")
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert [first[3], second[3], third[3]] == ["title1", "title2", "title3"]
+    assert reads == ["news_remote"] * 3
@@ -0,0 +1,41 @@
+import gzip
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+from src.utils import responses
+
+
+def _request(accept_encoding=None):
+    return SimpleNamespace(headers={"accept-encoding": accept_encoding} if accept_encoding else {})
+
+
+def test_dumps_writes_rows_and_datetimes_natively():
+    row = ("news1", "author1", "link", "title", None, datetime(2025, 3, 1, 12, 0, 0), "loc", 3)
+    assert json.loads(responses.dumps({"news": [row]})) == {
+        "news": [["news1", "author1", "link", "title", None, "2025-03-01T12:00:00", "loc", 3]]
+    }
+
+
+def test_small_bodies_are_not_compressed():
+    response = responses.json_response(_request("gzip"), {"ok": True})
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert json.loads(response.body) == {"ok": True}
+
+
+def test_large_bodies_are_gzipped_when_accepted(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", None)
+    route = [(53.3441 + i * 1e-4, -6.2573) for i in range(500)]
+
+    response = responses.json_response(_request("gzip, deflate"), {"route_map": route}, headers={"ETag": 'W/"x"'})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == 'W/"x"'
+    assert json.loads(gzip.decompress(response.body))["route_map"][1] == [53.3442, -6.2573]
+
+
+def test_codings_with_zero_quality_are_refused():
+    body = b"x" * (responses.COMPRESS_MIN_SIZE + 1)
+    assert responses.compress(body, "gzip;q=0") == (body, None)
+    assert responses.compress(body, None) == (body, None)
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+from src import map_handler
+from src.utils.road_graph import RoadGraph
+
+# A 3x3 street grid around Dame Street, nodes numbered row by row:
+#
+#   0 - 1 - 2
+#   |   |   |
+#   3 - 4 - 5
+#   |   |   |
+#   6 - 7 - 8
+NODES = [[53.346 - 0.002 * row, -6.270 + 0.002 * col] for row in range(3) for col in range(3)]
+EDGES = [[0, 1], [1, 2], [3, 4], [4, 5], [6, 7], [7, 8], [0, 3], [3, 6], [1, 4], [4, 7], [2, 5], [5, 8]]
+
+
+@pytest.fixture
+def graph_path(tmp_path):
+    path = tmp_path / "dublin.json"
+    path.write_text(json.dumps({"nodes": NODES, "edges": EDGES}))
+    return str(path)
+
+
+def test_shortest_path_follows_grid(graph_path):
+    graph = RoadGraph.load(graph_path)
+
+    route = graph.shortest_path(tuple(NODES[3]), tuple(NODES[5]))
+
+    assert route == [tuple(NODES[3]), tuple(NODES[4]), tuple(NODES[5])]
+
+
+def test_shortest_path_avoids_restricted_area(graph_path):
+    graph = RoadGraph.load(graph_path)
+    around_center = [(53.3445, -6.2685), (53.3445, -6.2675), (53.3435, -6.2675), (53.3435, -6.2685),
+                     (53.3445, -6.2685)]
+
+    route = graph.shortest_path(tuple(NODES[3]), tuple(NODES[5]), [around_center])
+
+    assert tuple(NODES[4]) not in route
+    assert route[0] == tuple(NODES[3]) and route[-1] == tuple(NODES[5])
+    assert len(route) == 5
+
+
+def test_unreachable_destination(graph_path):
+    graph = RoadGraph.load(graph_path)
+    wall = [(53.3445, -6.2705), (53.3445, -6.2655), (53.3435, -6.2655), (53.3435, -6.2705), (53.3445, -6.2705)]
+
+    assert graph.shortest_path(tuple(NODES[0]), tuple(NODES[8]), [wall]) is None
+
+
+def test_offline_backend_used_when_configured(graph_path, monkeypatch):
+    monkeypatch.setattr(map_handler, "ROAD_GRAPH_PATH", graph_path)
+    monkeypatch.setattr(map_handler, "ROUTING_BACKEND", "local")
+    monkeypatch.setattr(map_handler, "_road_graph", None)
+    map_handler._route_cache.clear()
+
+    route = map_handler.get_cached_route("53.344,-6.270", "53.344,-6.266")
+
+    assert route[0] == tuple(NODES[3])
+    assert route[-1] == tuple(NODES[5])
@@ -0,0 +1,60 @@
+import time
+
+from src.utils.spatial_index import GridIndex
+
+# Roughly Temple Bar and St Stephen's Green.
+TEMPLE_BAR = [(53.3460, -6.2670), (53.3460, -6.2620), (53.3440, -6.2620), (53.3440, -6.2670), (53.3460, -6.2670)]
+STEPHENS_GREEN = [(53.3395, -6.2615), (53.3395, -6.2565), (53.3370, -6.2565), (53.3370, -6.2615), (53.3395, -6.2615)]
+
+
+def make_index():
+    index = GridIndex()
+    index.insert("temple_bar", TEMPLE_BAR)
+    index.insert("stephens_green", STEPHENS_GREEN)
+    return index
+
+
+def test_query_bbox():
+    index = make_index()
+
+    assert [area.key for area in index.query_bbox(53.3450, -6.2650, 53.3455, -6.2640)] == ["temple_bar"]
+    assert [area.key for area in index.query_bbox(53.3300, -6.2800, 53.3500, -6.2500)] == [
+        "stephens_green", "temple_bar"
+    ]
+    assert index.query_bbox(53.3500, -6.3000, 53.3600, -6.2900) == []
+
+
+def test_query_path():
+    index = make_index()
+    through_temple_bar = [(53.3450, -6.2700), (53.3450, -6.2600)]
+    around_everything = [(53.3480, -6.2700), (53.3480, -6.2500)]
+
+    assert [area.key for area in index.query_path(through_temple_bar)] == ["temple_bar"]
+    assert index.query_path(around_everything) == []
+
+
+def test_incremental_updates():
+    index = make_index()
+    revision = index.get("temple_bar").revision
+
+    index.insert("temple_bar", STEPHENS_GREEN)
+    assert index.get("temple_bar").revision > revision
+    assert index.query_bbox(53.3450, -6.2650, 53.3455, -6.2640) == []
+
+    index.remove("stephens_green")
+    assert len(index) == 1
+    assert [area.key for area in index.query_bbox(53.3380, -6.2600, 53.3385, -6.2590)] == ["temple_bar"]
+
+
+def test_world_sized_queries_and_areas_stay_cheap():
+    index = make_index()
+    index.insert("ireland", [(51.4, -10.5), (55.4, -10.5), (55.4, -5.4), (51.4, -5.4)])
+
+    started = time.perf_counter()
+    everything = index.query_bbox(-89, -179, 89, 179)
+    assert time.perf_counter() - started < 0.1
+    assert [area.key for area in everything] == ["ireland", "stephens_green", "temple_bar"]
+    assert [area.key for area in index.query_bbox(53.3450, -6.2650, 53.3455, -6.2640)] == ["ireland", "temple_bar"]
+
+    index.remove("ireland")
+    assert [area.key for area in index.query_bbox(-89, -179, 89, 179)] == ["stephens_green", "temple_bar"]
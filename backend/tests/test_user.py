@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 from src import users_handler
 
@@ -63,3 +65,15 @@ def test_delete_user(monkeypatch):
     
     result = users_handler.delete_user("user1")
     assert result == fake_delete_message
+
+
+def test_get_user_async(monkeypatch):
+    fake_user = ("user1", "username1", "user1@example.com")
+
+    async def fake_get_user_by_id(user_id):
+        return fake_user
+
+    monkeypatch.setattr(users_handler.async_db_utils, "get_user_by_id", fake_get_user_by_id)
+
+    result = asyncio.run(users_handler.get_user_async("user1"))
+    assert result == fake_user
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+from src import news_handler
+from src.utils.view_counter import ViewCounter
+
+
+def test_increments_are_aggregated_per_news():
+    flushed = []
+
+    async def flush(deltas):
+        flushed.append(deltas)
+
+    counter = ViewCounter(flush)
+    for _ in range(3):
+        counter.increment("news1")
+    counter.increment("news2", 5)
+
+    assert asyncio.run(counter.flush()) == 2
+    assert flushed == [{"news1": 3, "news2": 5}]
+    assert counter.pending() == 0
+
+
+def test_failed_flush_keeps_deltas():
+    async def flush(deltas):
+        raise Exception("database unavailable")
+
+    counter = ViewCounter(flush)
+    counter.increment("news1")
+
+    with pytest.raises(Exception):
+        asyncio.run(counter.flush())
+    counter.increment("news1")
+
+    assert counter._pending == {"news1": 2}
+
+
+def test_stop_flushes_pending_views():
+    flushed = []
+
+    async def flush(deltas):
+        flushed.append(deltas)
+
+    async def run():
+        counter = ViewCounter(flush, interval=3600)
+        counter.start()
+        counter.increment("news1")
+        await counter.stop()
+
+    asyncio.run(run())
+    assert flushed == [{"news1": 1}]
+
+
+def test_stop_during_a_flush_keeps_its_deltas():
+    flushed = []
+    started = None
+
+    async def flush(deltas):
+        if not flushed:
+            flushed.append(None)
+            started.set()
+            await asyncio.sleep(3600)  # Cancelled by stop().
+        flushed.append(deltas)
+
+    async def run():
+        nonlocal started
+        started = asyncio.Event()
+        counter = ViewCounter(flush, interval=0)
+        counter.increment("news1")
+        counter.start()
+        await started.wait()
+        counter.increment("news2")
+        await counter.stop()
+
+    asyncio.run(run())
+    assert flushed == [None, {"news1": 1, "news2": 1}]
+
+
+def test_views_of_new_ids_are_dropped_when_the_buffer_is_full():
+    counter = ViewCounter(None, max_pending=2)
+
+    assert counter.increment("news1")
+    assert counter.increment("news2")
+    assert not counter.increment("news3")
+    assert counter.increment("news1")
+
+    assert counter._pending == {"news1": 2, "news2": 1}
+    assert counter.dropped == 1
+
+
+def test_record_view_rejects_malformed_ids():
+    with pytest.raises(ValueError):
+        news_handler.record_view("x" * 10000)